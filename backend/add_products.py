@@ -1,5 +1,11 @@
 #  to generate some mock product data
 import sqlite3
+import sys
+
+sys.path.insert(0, "./src")
+
+from cache_stamps import touch  # noqa: E402
+from marketplace.indexes import create_indexes  # noqa: E402
 
 DB_PATH = "./database.db"  # Change path if needed
 
@@ -118,7 +124,11 @@ def insert_farmer_products():
         products,
     )
     conn.commit()
+    # Listing and search indexes, so the server finds them ready.
+    create_indexes(conn)
     conn.close()
+    # Running servers drop their cached product responses.
+    touch("products")
     print(
         f"Inserted {len(products)} farmer products with ratings, reviews, and sold count into the database."
     )
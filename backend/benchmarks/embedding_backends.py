@@ -0,0 +1,95 @@
+# Compare embedding backends on the knowledge base:
+# recall@3 (does a row's own question retrieve that row?) and query latency.
+#
+#   python benchmarks/embedding_backends.py --rows 500
+#   python benchmarks/embedding_backends.py --configs torch:BAAI/bge-large-en onnx:BAAI/bge-large-en
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+QDRANT_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "model", "qdrant")
+sys.path.insert(0, QDRANT_DIR)
+
+from embedding_backend import load_embeddings  # noqa: E402
+from processor import load_knowledge  # noqa: E402
+
+DEFAULT_CONFIGS = [
+    "torch:BAAI/bge-large-en",
+    "onnx:BAAI/bge-large-en",
+    "torch:BAAI/bge-base-en",
+    "torch:BAAI/bge-small-en",
+]
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000 if values else 0.0
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def run(config, corpus, questions, k):
+    backend, model_name = config.split(":", 1)
+    started = time.perf_counter()
+    embeddings = load_embeddings(backend=backend, model_name=model_name)
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    doc_vectors = normalize(embeddings.embed_documents(corpus))
+    index_s = time.perf_counter() - started
+
+    latencies = []
+    query_vectors = []
+    for question in questions:
+        t = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(question))
+        latencies.append(time.perf_counter() - t)
+
+    scores = normalize(query_vectors) @ doc_vectors.T
+    top_k = np.argsort(-scores, axis=1)[:, :k]
+    hits = sum(1 for i, row in enumerate(top_k) if i in row)
+
+    return {
+        "config": config,
+        "dim": doc_vectors.shape[1],
+        "load_s": load_s,
+        "index_s": index_s,
+        f"recall@{k}": hits / len(questions),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--excel", default=os.path.join(QDRANT_DIR, "knowledge.xlsx"))
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    args = parser.parse_args()
+
+    df = load_knowledge(args.excel)
+    df = df[df["Question"] != ""].head(args.rows)
+    corpus = df["content"].tolist()
+    questions = df["Question"].tolist()
+    print(f"Benchmarking on {len(corpus)} rows\n")
+
+    results = [run(config, corpus, questions, args.k) for config in args.configs]
+
+    header = f"{'config':<32}{'dim':>6}{'load s':>9}{'index s':>9}{'recall@' + str(args.k):>11}{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['config']:<32}{r['dim']:>6}{r['load_s']:>9.1f}{r['index_s']:>9.1f}"
+            f"{r[f'recall@{args.k}']:>11.3f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Compare plain top-k retrieval with metadata-filtered retrieval against the
+# live Qdrant collection. Each sampled knowledge row asks its own Question,
+# with "District, State" of that row standing in for the user's location.
+#
+#   python benchmarks/filtered_retrieval.py --rows 300
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+QDRANT_DIR = os.path.join(BACKEND_DIR, "src", "model", "qdrant")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+sys.path.insert(0, QDRANT_DIR)
+
+from langchain_qdrant import QdrantVectorStore  # noqa: E402
+
+from embedding_backend import load_embeddings  # noqa: E402
+from model.units.filter_unit import MetadataHints, search_with_relaxation  # noqa: E402
+from processor import load_knowledge  # noqa: E402
+from vector_backend import VECTOR_BACKEND, make_client  # noqa: E402
+
+
+def is_own_row(doc, row):
+    meta = doc.metadata
+    return (
+        meta.get("Crop") == row["Crop"]
+        and meta.get("District") == row["District"]
+        and meta.get("Sl No.-Q") == row["Sl No.-Q"]
+    )
+
+
+def summarize(name, latencies, own_hits, crop_precision, n):
+    print(
+        f"{name:<12}{np.percentile(latencies, 50) * 1000:>9.1f}"
+        f"{np.percentile(latencies, 95) * 1000:>9.1f}"
+        f"{own_hits / n:>11.3f}{np.mean(crop_precision):>12.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered vs unfiltered retrieval")
+    parser.add_argument("--excel", default=os.path.join(QDRANT_DIR, "knowledge.xlsx"))
+    parser.add_argument("--backend", default=VECTOR_BACKEND, choices=["http", "grpc", "local"])
+    parser.add_argument("--collection", default=os.getenv("QDRANT_COLLECTION", "agriculture_knowledge"))
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    df = load_knowledge(args.excel)
+    df = df[df["Question"] != ""]
+    rows = df.sample(min(args.rows, len(df)), random_state=args.seed).to_dict(orient="records")
+
+    client = make_client(args.backend)
+    embeddings = load_embeddings()
+    store = QdrantVectorStore(client=client, collection_name=args.collection, embedding=embeddings)
+    hints = MetadataHints(client, args.collection)
+
+    results = {"plain": ([], 0, []), "filtered": ([], 0, [])}
+    random.seed(args.seed)
+    for row in rows:
+        vector = embeddings.embed_query(row["Question"])
+        location = f"{row['District']}, {row['State']}"
+        for name in results:
+            started = time.perf_counter()
+            if name == "plain":
+                docs = store.similarity_search_by_vector(vector, k=args.k)
+            else:
+                docs = search_with_relaxation(
+                    lambda k, filter: store.similarity_search_by_vector(vector, k=k, filter=filter),
+                    hints.hints(row["Question"], location),
+                    args.k,
+                )
+            elapsed = time.perf_counter() - started
+            latencies, own, precision = results[name]
+            latencies.append(elapsed)
+            precision.append(
+                sum(d.metadata.get("Crop") == row["Crop"] for d in docs) / max(1, len(docs))
+            )
+            results[name] = (latencies, own + any(is_own_row(d, row) for d in docs), precision)
+
+    print(f"{len(rows)} questions, k={args.k}\n")
+    print(f"{'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'own@' + str(args.k):>11}{'crop prec':>12}")
+    for name, (latencies, own, precision) in results.items():
+        summarize(name, latencies, own, precision, len(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Offline relevance benchmark: dense vs hybrid (dense + BM25, fused with RRF).
+# Builds a throwaway in-memory Qdrant collection from a sample of
+# knowledge.xlsx, then asks every sampled Question and checks where a row
+# with the matching Answer lands in the results. No Qdrant server needed.
+#
+#   python benchmarks/hybrid_retrieval.py --corpus 3000 --queries 300
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+QDRANT_DIR = os.path.join(BACKEND_DIR, "src", "model", "qdrant")
+sys.path.insert(0, QDRANT_DIR)
+
+from langchain_qdrant import QdrantVectorStore, RetrievalMode  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.models import (  # noqa: E402
+    Distance,
+    Modifier,
+    PointStruct,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from embedding_backend import (  # noqa: E402
+    SPARSE_VECTOR_NAME,
+    embedding_dimension,
+    load_embeddings,
+    load_sparse_embeddings,
+)
+from processor import load_knowledge, point_id  # noqa: E402
+
+COLLECTION = "hybrid_benchmark"
+CUTOFFS = [1, 2, 3, 5]
+
+
+def build_collection(client, corpus, dense, sparse, batch_size):
+    client.create_collection(
+        COLLECTION,
+        vectors_config=VectorParams(
+            size=embedding_dimension(dense), distance=Distance.COSINE
+        ),
+        sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+    )
+    rows = corpus.to_dict(orient="records")
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        texts = [row["content"] for row in batch]
+        points = [
+            PointStruct(
+                id=point_id(row["content"], row["metadata"]),
+                vector={
+                    "": vector,
+                    SPARSE_VECTOR_NAME: SparseVector(indices=s.indices, values=s.values),
+                },
+                payload={
+                    "page_content": row["content"],
+                    "metadata": {**row["metadata"], "Answer": row["Answer"]},
+                },
+            )
+            for row, vector, s in zip(
+                batch, dense.embed_documents(texts), sparse.embed_documents(texts)
+            )
+        ]
+        client.upsert(COLLECTION, points=points)
+
+
+def evaluate(store, queries, depth):
+    """Reciprocal rank and context size for each query at every cutoff."""
+    ranks, chars, latencies = [], {k: [] for k in CUTOFFS}, []
+    for row in queries:
+        started = time.perf_counter()
+        docs = store.similarity_search(row["Question"], k=depth)
+        latencies.append(time.perf_counter() - started)
+        # Any row with the same answer counts: the sheets repeat Q/A pairs.
+        hits = [d.metadata.get("Answer") == row["Answer"] for d in docs]
+        ranks.append(hits.index(True) + 1 if True in hits else None)
+        for k in CUTOFFS:
+            chars[k].append(sum(len(d.page_content) for d in docs[:k]))
+    return ranks, chars, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs hybrid retrieval relevance")
+    parser.add_argument("--excel", default=os.path.join(QDRANT_DIR, "knowledge.xlsx"))
+    parser.add_argument("--corpus", type=int, default=3000, help="rows indexed")
+    parser.add_argument("--queries", type=int, default=300, help="questions asked")
+    parser.add_argument("--depth", type=int, default=10, help="results fetched for MRR")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    df = load_knowledge(args.excel)
+    df = df[(df["Question"] != "") & (df["Answer"] != "")]
+    corpus = df.sample(min(args.corpus, len(df)), random_state=args.seed)
+    queries = corpus.sample(min(args.queries, len(corpus)), random_state=args.seed)
+    queries = queries.to_dict(orient="records")
+
+    dense = load_embeddings()
+    sparse = load_sparse_embeddings()
+    client = QdrantClient(":memory:")
+    started = time.perf_counter()
+    build_collection(client, corpus, dense, sparse, args.batch_size)
+    print(
+        f"Indexed {len(corpus)} rows in {time.perf_counter() - started:.1f}s; "
+        f"{len(queries)} questions, MRR@{args.depth}\n"
+    )
+
+    stores = {
+        "dense": QdrantVectorStore(
+            client=client, collection_name=COLLECTION, embedding=dense
+        ),
+        "hybrid": QdrantVectorStore(
+            client=client,
+            collection_name=COLLECTION,
+            embedding=dense,
+            sparse_embedding=sparse,
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+            retrieval_mode=RetrievalMode.HYBRID,
+        ),
+    }
+
+    header = f"{'mode':<8}" + "".join(f"{'R@' + str(k):>7}" for k in CUTOFFS)
+    header += f"{'MRR':>7}{'p50 ms':>9}" + "".join(f"{'chars@' + str(k):>9}" for k in CUTOFFS)
+    print(header)
+    for name, store in stores.items():
+        ranks, chars, latencies = evaluate(store, queries, args.depth)
+        line = f"{name:<8}"
+        for k in CUTOFFS:
+            line += f"{np.mean([r is not None and r <= k for r in ranks]):>7.3f}"
+        line += f"{np.mean([1 / r if r else 0 for r in ranks]):>7.3f}"
+        line += f"{np.percentile(latencies, 50) * 1000:>9.1f}"
+        line += "".join(f"{np.mean(chars[k]):>9.0f}" for k in CUTOFFS)
+        print(line)
+    print(
+        "\nPick RETRIEVAL_K as the smallest k whose hybrid recall matches dense "
+        "recall at the current k; chars@k is the context that goes into the prompt."
+    )
+
+
+if __name__ == "__main__":
+    main()
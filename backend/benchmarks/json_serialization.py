@@ -0,0 +1,135 @@
+# Serialization time and allocations for the payloads the server writes most:
+#   listing   a /products/ page of N rows, three ways:
+#               stdlib   dict per sqlite3.Row + Flask's default provider
+#               orjson   dict per sqlite3.Row + OrjsonProvider
+#               sqlite   json_object() per row in SQL + orjson.Fragment (no dicts)
+#   chat      a Socket.IO reply packet: the old json.dumps-then-send double
+#             encoding against the orjson packet serializer
+# Time covers fetching the rows and building the response body; "peak KiB" is
+# tracemalloc's peak traced memory during one call.
+#
+#   python benchmarks/json_serialization.py --rows 50 200 2000 --repeat 50
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from json_provider import OrjsonProvider, SocketIOJson, json_object_sql, row_objects  # noqa: E402
+
+COLUMNS = ["id", "name", "price", "description", "image_url", "rating", "reviews", "sold"]
+
+
+def build_database(rows, seed=7):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL, description TEXT, "
+        "image_url TEXT, rating REAL, reviews REAL, sold INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                i,
+                f"Product {i} — organic",
+                round(rng.uniform(10, 100000), 2),
+                "Durable farm equipment for small holdings, with a one-year warranty.",
+                "https://picsum.photos/200/300",
+                round(rng.uniform(1, 5), 1),
+                rng.randint(0, 500),
+                rng.randint(0, 5000),
+            )
+            for i in range(1, rows + 1)
+        ],
+    )
+    return conn
+
+
+def chat_payload(words):
+    answer = " ".join(random.choice(["Water", "the", "wheat", "crop", "every", "morning,"])
+                      for _ in range(words))
+    return {"answer": answer, "status": "success", "userID": "TEST001"}
+
+
+def measure(fn, repeat):
+    fn()  # warm up
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return np.percentile(times, 50) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stdlib json vs orjson serialization")
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 200, 2000])
+    parser.add_argument("--words", type=int, nargs="+", default=[50, 400])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    stdlib_app = Flask("stdlib")
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    orjson_app = Flask("orjson")
+    orjson_app.json = OrjsonProvider(orjson_app)
+
+    conn = build_database(max(args.rows))
+    plain_sql = f"SELECT {', '.join(COLUMNS)} FROM products ORDER BY id LIMIT ?"
+    json_sql = f"SELECT {json_object_sql(COLUMNS)} FROM products ORDER BY id LIMIT ?"
+
+    def listing(app, rows):
+        def run():
+            with app.app_context():
+                items = [dict(row) for row in conn.execute(plain_sql, (rows,))]
+                return app.json.response({"items": items, "next_cursor": None}).get_data()
+        return run
+
+    def listing_sqlite(rows):
+        def run():
+            with orjson_app.app_context():
+                items = row_objects(conn.execute(json_sql, (rows,)))
+                return orjson_app.json.response({"items": items, "next_cursor": None}).get_data()
+        return run
+
+    print(f"{'payload':<16}{'mode':<10}{'p50 ms':>9}{'peak KiB':>10}{'bytes':>10}")
+    for rows in args.rows:
+        for mode, fn in (
+            ("stdlib", listing(stdlib_app, rows)),
+            ("orjson", listing(orjson_app, rows)),
+            ("sqlite", listing_sqlite(rows)),
+        ):
+            p50, peak = measure(fn, args.repeat)
+            print(f"{f'listing {rows}':<16}{mode:<10}{p50:>9.3f}{peak:>10.1f}{len(fn()):>10}")
+
+    for words in args.words:
+        payload = chat_payload(words)
+        # python-socketio encodes the event as ["message", data].
+        for mode, fn in (
+            ("stdlib", lambda: json.dumps(["message", json.dumps(payload)], separators=(",", ":"))),
+            ("orjson", lambda: SocketIOJson.dumps(["message", payload], separators=(",", ":"))),
+        ):
+            p50, peak = measure(fn, args.repeat * 20)
+            print(f"{f'chat {words}w':<16}{mode:<10}{p50:>9.4f}{peak:>10.1f}{len(fn()):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Local LLM throughput and latency at 1, 8 and 32 concurrent chat sessions,
+# through the OpenAICompatibleBackend and SlotScheduler the chat server uses
+# with LLM_BACKEND=openai. Every session streams --turns completions back to
+# back. Per concurrency level this prints aggregate tokens/s (streamed
+# deltas; llama.cpp and vLLM send one token per delta), tokens/s seen by one
+# session, time to first token, whole-turn latency and the mean batch size
+# the scheduler admitted.
+#
+#   llama-server -m qwen2.5-1.5b-instruct-q4_k_m.gguf --parallel 8 --ctx-size 16384 --port 8080
+#   python benchmarks/llm_batching.py --base-url http://127.0.0.1:8080/v1 --slots 8
+#   python benchmarks/llm_batching.py --stub    # offline smoke run against stub_llm.py
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+import stub_llm
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from model.units.llm_backend import BATCH_SLOTS, OpenAICompatibleBackend  # noqa: E402
+
+CROPS = ["cauliflower", "brinjal", "paddy", "tomato", "okra", "chilli", "onion", "pumpkin"]
+PROBLEMS = ["yellow leaves", "aphids", "fruit borer", "wilting", "leaf curl", "poor flowering"]
+# Roughly the size of a RAG prompt: instructions plus three retrieved chunks.
+CONTEXT = " ".join(
+    f"Advice {i}: for {crop} with {problem}, check the field, remove affected plants and "
+    f"spray as recommended by the block agriculture office."
+    for i, (crop, problem) in enumerate(zip(CROPS * 2, PROBLEMS * 3))
+)
+
+
+def prompt(rng):
+    return (
+        "You are a professional farming advisor. Answer briefly.\n\n"
+        f"Context:\n{CONTEXT}\n\n"
+        f"Question: my {rng.choice(CROPS)} has {rng.choice(PROBLEMS)}, what should I do?"
+    )
+
+
+def session(backend, turns, seed, results):
+    rng = random.Random(seed)
+    for _ in range(turns):
+        started = time.perf_counter()
+        first = None
+        tokens = 0
+        for _ in backend.stream(prompt(rng)):
+            if first is None:
+                first = time.perf_counter() - started
+            tokens += 1
+        results.append((first or 0.0, time.perf_counter() - started, tokens))
+
+
+def run(backend, sessions, turns, seed):
+    results = []
+    threads = [
+        threading.Thread(target=session, args=(backend, turns, seed + i, results), daemon=True)
+        for i in range(sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local LLM batching: tokens/s and latency")
+    parser.add_argument("--base-url", default=os.getenv("LLM_BASE_URL", "http://127.0.0.1:8080/v1"))
+    parser.add_argument("--model", default=os.getenv("CHAT_MODEL", "local"))
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=4, help="completions per session")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--slots", type=int, default=BATCH_SLOTS, help="scheduler slots")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stub", action="store_true", help="start stub_llm.py and use it")
+    args = parser.parse_args()
+
+    if args.stub:
+        server, _ = stub_llm.start(0, latency=0.2, tokens_per_second=40, tokens=args.max_tokens)
+        args.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    print(f"{args.base_url}, {args.slots} slots, {args.turns} turns per session, "
+          f"up to {args.max_tokens} tokens each\n")
+    print(f"{'sessions':>8}{'tok/s':>9}{'tok/s/s':>9}{'ttft p50':>10}{'ttft p95':>10}"
+          f"{'turn p50':>10}{'turn p95':>10}{'batch':>7}")
+    # Warm up: model weights paged in, shared prompt prefix cached.
+    session(OpenAICompatibleBackend(args.base_url, args.model, max_tokens=args.max_tokens), 1,
+            args.seed, [])
+    for sessions in args.sessions:
+        # Waiting for a slot is part of what is measured here, not an error.
+        backend = OpenAICompatibleBackend(args.base_url, args.model, max_tokens=args.max_tokens,
+                                          slots=args.slots, slot_wait=3600)
+        results, elapsed = run(backend, sessions, args.turns, args.seed)
+        ttft = [r[0] for r in results]
+        turn = [r[1] for r in results]
+        tokens = sum(r[2] for r in results)
+        per_session = np.mean([r[2] / (r[1] - r[0]) for r in results if r[1] > r[0]])
+        batch = backend.scheduler.stats()["batch_size"]
+        print(
+            f"{sessions:>8}{tokens / elapsed:>9.1f}{per_session:>9.1f}"
+            f"{np.percentile(ttft, 50) * 1000:>10.0f}{np.percentile(ttft, 95) * 1000:>10.0f}"
+            f"{np.percentile(turn, 50) * 1000:>10.0f}{np.percentile(turn, 95) * 1000:>10.0f}"
+            f"{batch['avg']:>7.1f}"
+        )
+    print("\nttft and turn latency in ms; tok/s/s is decode speed seen by one session")
+
+
+if __name__ == "__main__":
+    main()
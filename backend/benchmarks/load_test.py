@@ -0,0 +1,645 @@
+# Offline load test of the whole backend, for comparing commits.
+#
+# "run" builds (once per parameter set) a workdir with a synthetic
+# database.db, a sample of knowledge.xlsx indexed into an embedded Qdrant,
+# starts stub_llm.py in place of the chat model and one server worker on top,
+# then drives each scenario with concurrent clients for --duration seconds:
+#
+#   products   listing pages (random sort, following next_cursor), product by id
+#   search     /products/search with words, prefixes and typos
+#   user       /user/<id> for random ids
+#   videos     the /videos/ manifest and 256 KiB Range reads of the MP4s
+#   chat       --chat-clients Socket.IO clients on /chat, each sending one
+#              question after another (streamed); latency is the whole turn,
+#              ttft the first answer_chunk, busy the turns the pool refused
+#
+# Requests, errors, throughput, p50/p95/p99 and the peak RSS of the server
+# process are printed and written to a JSON file tagged with the git commit.
+# "compare" diffs two such files and exits non-zero on regressions.
+#
+# Only one worker is started: embedded Qdrant locks its directory to a
+# single process. The embedding model must already be in the local Hugging
+# Face cache (HF_HUB_OFFLINE is set); pick a small one with
+# --embedding-model. The answer cache is off unless --answer-cache is given,
+# so every turn goes through retrieval and the stub.
+#
+#   python benchmarks/load_test.py run --duration 30 --chat-clients 50 \
+#       --embedding-model sentence-transformers/all-MiniLM-L6-v2
+#   python benchmarks/load_test.py compare results/abc123.json results/def456.json
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import socketio
+from openpyxl import Workbook, load_workbook
+
+import stub_llm
+from product_search import PRODUCE, QUERIES, build_database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, "..")
+SRC_DIR = os.path.join(BACKEND_DIR, "src")
+QDRANT_DIR = os.path.join(SRC_DIR, "model", "qdrant")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, SRC_DIR)
+
+from marketplace.indexes import SORT_COLUMNS, create_indexes  # noqa: E402
+from serve import worker_command  # noqa: E402
+
+FIRST_NAMES = ["Arun", "Bina", "Chandan", "Dipa", "Gopal", "Jit", "Kamala", "Manoj", "Nirmala",
+               "Prakash", "Rina", "Sanjay", "Sunita", "Tapan", "Uma"]
+LAST_NAMES = ["Debnath", "Bhaskar", "Das", "Ghosh", "Mondal", "Roy", "Sarkar", "Pal", "Biswas"]
+PLACES = ["Nadia", "Murshidabad", "Hooghly", "Bardhaman", "Birbhum", "Malda", "Bankura",
+          "Purulia", "South 24 Parganas", "North 24 Parganas"]
+QUESTIONS = [
+    "How do I control aphids on {crop}?",
+    "When should I sow {crop} in West Bengal?",
+    "Which fertilizer is best for {crop} at flowering?",
+    "My {crop} leaves are turning yellow, what should I do?",
+    "How often should I irrigate {crop} in summer?",
+    "What is the recommended spacing for {crop}?",
+]
+CROPS = ["cauliflower", "brinjal", "paddy", "pumpkin", "okra", "chilli", "tomato", "onion"]
+RANGE_BYTES = 256 * 1024
+SCENARIOS = ("products", "search", "user", "videos", "chat")
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+# --- fixtures -------------------------------------------------------------
+
+def build_users(conn, rows, seed):
+    rng = random.Random(seed)
+    conn.execute(
+        """
+        CREATE TABLE user (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            location TEXT NOT NULL
+        )
+    """
+    )
+    conn.executemany(
+        "INSERT INTO user (user_id, name, age, location) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"LOAD{i:07d}",
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                rng.randint(18, 80),
+                f"{rng.choice(PLACES)}, West Bengal, India.",
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+
+
+def prepare_database(path, products, users, seed):
+    if os.path.exists(path):
+        os.remove(path)
+    started = time.perf_counter()
+    conn = build_database(path, products, seed)
+    build_users(conn, users, seed)
+    # What add_products.py builds; the server only checks them at startup.
+    create_indexes(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    print(f"Database: {products} products, {users} users in {time.perf_counter() - started:.1f}s")
+
+
+def sample_knowledge(target, rows_per_sheet):
+    """The first ``rows_per_sheet`` non-empty rows of every sheet of knowledge.xlsx."""
+    source = load_workbook(os.path.join(QDRANT_DIR, "knowledge.xlsx"), read_only=True, data_only=True)
+    sample = Workbook()
+    sample.remove(sample.active)
+    total = 0
+    for sheet in source.worksheets:
+        out = sample.create_sheet(sheet.title)
+        kept = 0
+        for values in sheet.iter_rows(values_only=True):
+            if kept >= rows_per_sheet:
+                break
+            if any(v is not None for v in values):
+                out.append(list(values))
+                kept += 1
+        total += kept
+    source.close()
+    sample.save(target)
+    return total
+
+
+def prepare_knowledge(workdir, rows_per_sheet, env):
+    excel = os.path.join(workdir, "knowledge_sample.xlsx")
+    rows = sample_knowledge(excel, rows_per_sheet)
+    shutil.rmtree(env["QDRANT_PATH"], ignore_errors=True)
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "processor.py", "--excel", excel, "--workers", "0", "--full"],
+        cwd=QDRANT_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    print(f"Knowledge: {rows} rows indexed in {time.perf_counter() - started:.1f}s")
+
+
+def prepare_workdir(args, env):
+    """Build what is missing or was built with other parameters."""
+    os.makedirs(args.workdir, exist_ok=True)
+    params_path = os.path.join(args.workdir, "params.json")
+    built = {}
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            built = json.load(f)
+    wanted_db = {"products": args.products, "users": args.users, "seed": args.seed}
+    wanted_index = {"knowledge_rows": args.knowledge_rows, "embedding_model": args.embedding_model,
+                    "retrieval_mode": env["RETRIEVAL_MODE"]}
+    fixture = os.path.join(args.workdir, "fixture.db")
+    if built.get("database") != wanted_db or not os.path.exists(fixture):
+        built.pop("database", None)
+        prepare_database(fixture, args.products, args.users, args.seed)
+        built["database"] = wanted_db
+    if built.get("index") != wanted_index or not os.path.exists(env["QDRANT_PATH"]):
+        built.pop("index", None)
+        prepare_knowledge(args.workdir, args.knowledge_rows, env)
+        built["index"] = wanted_index
+    with open(params_path, "w") as f:
+        json.dump(built, f, indent=2)
+
+    # Every run starts from the pristine fixture: chat turns write sessions.
+    database = env["DATABASE_PATH"]
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    shutil.copy(fixture, database)
+
+
+# --- server ---------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def start_server(port, env, log_path, timeout):
+    log = open(log_path, "w")
+    server = subprocess.Popen(worker_command(port, 64), cwd=SRC_DIR, stdout=log, stderr=log,
+                              env={**env, "HOST": "127.0.0.1", "PORT": str(port)})
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited during startup, see {log_path}")
+        try:
+            if get_json(f"http://127.0.0.1:{port}/chat/stats").get("loaded"):
+                return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Chat stack did not load in {timeout:.0f}s, see {log_path}")
+
+
+def process_tree(pid):
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    stack.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def rss_bytes(pid):
+    total = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    return total
+
+
+class MemorySampler(threading.Thread):
+    """Peak RSS of the server and its children while a scenario runs (Linux)."""
+
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            self.peak = max(self.peak, rss_bytes(self.pid))
+            self.done.wait(self.interval)
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.peak
+
+
+# --- HTTP scenarios -------------------------------------------------------
+
+def fetch(conn, path, headers=None):
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+class ProductsClient:
+    """Pages through listings a few pages deep, mixed with product detail views."""
+
+    def __init__(self, rng, args):
+        self.rng = rng
+        self.products = args.products
+        self.cursor = None
+        self.sort = "id"
+        self.depth = 0
+        self.listing = False
+
+    def next_request(self):
+        self.listing = self.rng.random() >= 0.3
+        if not self.listing:
+            return f"/products/{self.rng.randint(1, self.products)}", None, (200,)
+        if self.cursor is None or self.depth >= 5:
+            column = self.rng.choice(SORT_COLUMNS + ["id"])
+            self.sort = self.rng.choice(["", "-"]) + column
+            self.cursor, self.depth = None, 0
+        path = f"/products/?limit=20&sort={self.sort}"
+        if self.cursor:
+            path += f"&cursor={self.cursor}"
+        return path, None, (200,)
+
+    def on_response(self, body):
+        if self.listing:
+            self.cursor = json.loads(body).get("next_cursor")
+            self.depth += 1
+
+
+class SearchClient:
+    def __init__(self, rng, args):
+        self.rng = rng
+        self.queries = [q for group in QUERIES.values() for q in group] + PRODUCE
+
+    def next_request(self):
+        query = urllib.parse.quote(self.rng.choice(self.queries))
+        return f"/products/search?q={query}&limit=20", None, (200,)
+
+
+class UserClient:
+    def __init__(self, rng, args):
+        self.rng = rng
+        self.users = args.users
+
+    def next_request(self):
+        return f"/user/{self.rng.randint(1, self.users)}", None, (200,)
+
+
+class VideosClient:
+    def __init__(self, rng, args):
+        self.rng = rng
+        self.videos = args.videos
+
+    def next_request(self):
+        if not self.videos or self.rng.random() < 0.2:
+            return "/videos/", None, (200,)
+        video = self.rng.choice(self.videos)
+        start = self.rng.randrange(max(1, video["size"] - RANGE_BYTES))
+        end = min(video["size"], start + RANGE_BYTES) - 1
+        return video["url"], {"Range": f"bytes={start}-{end}"}, (206,)
+
+
+HTTP_CLIENTS = {
+    "products": ProductsClient,
+    "search": SearchClient,
+    "user": UserClient,
+    "videos": VideosClient,
+}
+
+
+def http_worker(port, client, stop, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.is_set():
+        path, headers, expected = client.next_request()
+        started = time.perf_counter()
+        try:
+            status, body = fetch(conn, path, headers)
+            ok = status in expected
+            if ok and hasattr(client, "on_response"):
+                client.on_response(body)
+        except (OSError, ValueError, http.client.HTTPException):
+            ok = False
+            conn.close()
+        results.append((ok, time.perf_counter() - started))
+    conn.close()
+
+
+def run_http(name, port, args, seed):
+    stop = threading.Event()
+    results = []
+    threads = [
+        threading.Thread(target=http_worker, daemon=True,
+                         args=(port, HTTP_CLIENTS[name](random.Random(seed + i), args), stop, results))
+        for i in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    return results, time.perf_counter() - started, {}
+
+
+# --- chat scenario --------------------------------------------------------
+
+def chat_worker(port, index, args, stop, results, extra):
+    rng = random.Random(args.seed + index)
+    client = socketio.Client(reconnection=False)
+    done = threading.Event()
+    turn = {}
+
+    @client.on("answer_chunk", namespace="/chat")
+    def on_chunk(data):
+        turn.setdefault("first", time.perf_counter())
+
+    @client.on("answer_done", namespace="/chat")
+    def on_done(data):
+        turn["outcome"] = "busy" if data.get("status") == "busy" else "ok"
+        done.set()
+
+    @client.on("message", namespace="/chat")
+    def on_message(data):
+        turn["outcome"] = "busy" if data.get("status") == "busy" else "ok"
+        done.set()
+
+    try:
+        client.connect(f"http://127.0.0.1:{port}", namespaces=["/chat"], wait_timeout=30)
+    except Exception:
+        with extra["lock"]:
+            extra["connect_errors"] += 1
+        return
+    user_id = f"load-{index}"
+    try:
+        while not stop.is_set():
+            question = rng.choice(QUESTIONS).format(crop=rng.choice(CROPS))
+            turn.clear()
+            done.clear()
+            started = time.perf_counter()
+            client.emit("message", {"userID": user_id, "context": question, "stream": True},
+                        namespace="/chat")
+            finished = done.wait(args.chat_timeout)
+            elapsed = time.perf_counter() - started
+            outcome = turn.get("outcome") if finished else "timeout"
+            if outcome == "busy":
+                with extra["lock"]:
+                    extra["busy"] += 1
+                time.sleep(0.5)
+                continue
+            results.append((outcome == "ok", elapsed))
+            if "first" in turn:
+                extra["ttft"].append(turn["first"] - started)
+            if args.think_time:
+                time.sleep(rng.uniform(0, 2 * args.think_time))
+    finally:
+        client.disconnect()
+
+
+def run_chat(port, args):
+    stop = threading.Event()
+    results = []
+    extra = {"busy": 0, "connect_errors": 0, "ttft": [], "lock": threading.Lock()}
+    threads = [
+        threading.Thread(target=chat_worker, daemon=True, args=(port, i, args, stop, results, extra))
+        for i in range(args.chat_clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=args.chat_timeout + 5)
+    del extra["lock"]
+    ttft = extra.pop("ttft")
+    if ttft:
+        extra["ttft_p50_ms"] = float(np.percentile(ttft, 50) * 1000)
+        extra["ttft_p95_ms"] = float(np.percentile(ttft, 95) * 1000)
+    return results, time.perf_counter() - started, extra
+
+
+# --- reporting ------------------------------------------------------------
+
+def summarise(results, elapsed, rss_peak, extra):
+    latencies = [seconds for ok, seconds in results if ok]
+    summary = {
+        "requests": len(results),
+        "errors": sum(1 for ok, _ in results if not ok),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "rss_peak_mb": rss_peak / 2**20,
+    }
+    for q in (50, 95, 99):
+        summary[f"p{q}_ms"] = float(np.percentile(latencies, q) * 1000) if latencies else None
+    summary.update(extra)
+    return summary
+
+
+def fmt(value, width, digits=1):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.{digits}f}"
+
+
+def print_table(scenarios):
+    print(f"\n{'scenario':<10}{'requests':>10}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>9}")
+    for name, s in scenarios.items():
+        print(f"{name:<10}{s['requests']:>10}{s['errors']:>8}{fmt(s['throughput'], 9)}"
+              f"{fmt(s['p50_ms'], 9, 2)}{fmt(s['p95_ms'], 9, 2)}{fmt(s['p99_ms'], 9, 2)}"
+              f"{fmt(s['rss_peak_mb'], 9)}")
+    chat = scenarios.get("chat")
+    if chat:
+        print(f"\nchat: ttft p50 {fmt(chat.get('ttft_p50_ms'), 0)} ms, "
+              f"p95 {fmt(chat.get('ttft_p95_ms'), 0)} ms, busy {chat['busy']}, "
+              f"connect errors {chat['connect_errors']}")
+
+
+def run(args):
+    args.workdir = os.path.abspath(args.workdir)
+    if args.embedding_model is None:
+        args.embedding_model = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en")
+    stub, _ = stub_llm.start(0, args.llm_latency, args.llm_tokens_per_second, args.llm_tokens)
+    env = {
+        **os.environ,
+        "DATABASE_PATH": os.path.join(args.workdir, "database.db"),
+        "VECTOR_BACKEND": "local",
+        "QDRANT_PATH": os.path.join(args.workdir, "qdrant"),
+        "EMBEDDING_MODEL": args.embedding_model,
+        "RETRIEVAL_MODE": "hybrid" if args.hybrid else "dense",
+        "CHAT_MODEL": f"http://127.0.0.1:{stub.server_address[1]}",
+        "HF_TOKEN": "stub",
+        "CHAT_WARMUP": "true",
+        "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+        "HTTP_CACHE": "false" if args.no_http_cache else "true",
+        "SESSION_SHARED": "false",
+        "SOCKETIO_MESSAGE_QUEUE": "",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+    }
+    prepare_workdir(args, env)
+
+    port = free_port()
+    log_path = os.path.join(args.workdir, "server.log")
+    print(f"Starting the server on port {port} (log: {log_path})")
+    server = start_server(port, env, log_path, args.startup_timeout)
+    try:
+        args.videos = get_json(f"http://127.0.0.1:{port}/videos/manifest")["videos"]
+        idle_rss = rss_bytes(server.pid)
+        print(f"Ready, {idle_rss / 2**20:.0f} MB RSS. {args.clients} HTTP clients, "
+              f"{args.chat_clients} chat clients, {args.duration:.0f}s per scenario")
+        scenarios = {}
+        for index, name in enumerate(args.scenarios):
+            sampler = MemorySampler(server.pid)
+            sampler.start()
+            if name == "chat":
+                results, elapsed, extra = run_chat(port, args)
+            else:
+                results, elapsed, extra = run_http(name, port, args, args.seed + 1000 * index)
+            scenarios[name] = summarise(results, elapsed, sampler.stop(), extra)
+            print(f"  {name}: {scenarios[name]['requests']} requests")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        stub.shutdown()
+
+    print_table(scenarios)
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{git_commit()}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    params = {k: v for k, v in vars(args).items() if k not in ("func", "videos", "output")}
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": git_commit(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "params": params,
+                "idle_rss_mb": idle_rss / 2**20,
+                "scenarios": scenarios,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nWrote {output}")
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old["params"] != new["params"]:
+        changed = sorted(k for k in set(old["params"]) | set(new["params"])
+                         if old["params"].get(k) != new["params"].get(k))
+        print(f"Warning: runs used different parameters ({', '.join(changed)})\n")
+
+    # Higher is better for throughput; lower for everything else.
+    metrics = [("throughput", "req/s", 1), ("p50_ms", "p50", -1), ("p95_ms", "p95", -1),
+               ("p99_ms", "p99", -1), ("rss_peak_mb", "rss", -1)]
+    print(f"{old['commit']} -> {new['commit']} (regression threshold {args.threshold:.0f}%)\n")
+    print(f"{'scenario':<10}{'metric':<8}{'old':>11}{'new':>11}{'change':>9}")
+    regressions = 0
+    for name in new["scenarios"]:
+        if name not in old["scenarios"]:
+            continue
+        for key, label, direction in metrics:
+            before = old["scenarios"][name].get(key)
+            after = new["scenarios"][name].get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change * direction > args.threshold
+            regressions += worse
+            print(f"{name:<10}{label:<8}{before:>11.2f}{after:>11.2f}{change:>+8.1f}%"
+                  f"{'  REGRESSION' if worse else ''}")
+    print(f"\n{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the backend")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the load test")
+    run_parser.add_argument("--workdir", default=os.path.join(BENCH_DIR, "load_data"),
+                            help="fixtures are built here once and reused")
+    run_parser.add_argument("--output", help="result JSON (default results/<commit>.json)")
+    run_parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument("--duration", type=float, default=30.0, help="seconds per scenario")
+    run_parser.add_argument("--clients", type=int, default=32, help="concurrent HTTP clients")
+    run_parser.add_argument("--chat-clients", type=int, default=50)
+    run_parser.add_argument("--chat-timeout", type=float, default=60.0)
+    run_parser.add_argument("--think-time", type=float, default=0.0,
+                            help="mean pause between a chat client's turns")
+    run_parser.add_argument("--products", type=int, default=200_000)
+    run_parser.add_argument("--users", type=int, default=100_000)
+    run_parser.add_argument("--knowledge-rows", type=int, default=20, help="rows per sheet")
+    run_parser.add_argument("--embedding-model", help="default: EMBEDDING_MODEL or BAAI/bge-large-en")
+    run_parser.add_argument("--hybrid", action="store_true", help="index and retrieve dense + BM25")
+    run_parser.add_argument("--answer-cache", action="store_true")
+    run_parser.add_argument("--no-http-cache", action="store_true")
+    run_parser.add_argument("--llm-latency", type=float, default=0.3, help="stub time to first token")
+    run_parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    run_parser.add_argument("--llm-tokens", type=int, default=120)
+    run_parser.add_argument("--seed", type=int, default=7)
+    run_parser.add_argument("--startup-timeout", type=float, default=300.0)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
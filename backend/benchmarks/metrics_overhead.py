@@ -0,0 +1,105 @@
+# Cost of the /metrics instrumentation: requests/sec on DB-backed routes with
+# the request hooks and timed SQLite connections on ("metrics") and off
+# ("plain"), plus the raw cost of one histogram observation. The response
+# cache is disabled so every request reaches SQLite. Runs the real
+# blueprints in-process against a copy of database.db.
+#
+#   python benchmarks/metrics_overhead.py --requests 5000 --threads 4
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from flask import Flask  # noqa: E402
+
+import db  # noqa: E402
+import http_cache  # noqa: E402
+import metrics  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+from marketplace.route import products_bp  # noqa: E402
+from users.route import user_bp  # noqa: E402
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    if instrumented:
+        metrics.init_app(app)
+    app.register_blueprint(products_bp, url_prefix="/products")
+    app.register_blueprint(user_bp, url_prefix="/user")
+    return app
+
+
+def first_id(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(f"SELECT id FROM {table} ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 1
+
+
+def measure(app, path, requests, threads):
+    client = app.test_client()
+
+    def one(_):
+        started = time.perf_counter()
+        client.get(path)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(one, range(requests)))
+    return requests / (time.perf_counter() - started), np.percentile(latencies, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "database.db"))
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    http_cache.cache.enabled = False
+    workdir = tempfile.mkdtemp()
+    copy = os.path.join(workdir, "database.db")
+    shutil.copy(args.db, copy)
+    paths = [
+        "/products/?limit=20",
+        f"/products/{first_id(copy, 'products')}",
+        f"/user/{first_id(copy, 'user')}",
+    ]
+
+    histogram = metrics.Histogram("bench", "bench", ["label"])
+    started = time.perf_counter()
+    for i in range(200_000):
+        histogram.observe(0.003, "x")
+    per_observe = (time.perf_counter() - started) / 200_000 * 1e6
+    print(f"one histogram observation: {per_observe:.2f} us\n")
+
+    print(f"{'mode':<10}{'route':<22}{'req/s':>10}{'p50 ms':>9}")
+    try:
+        for mode in ("plain", "metrics"):
+            instrumented = mode == "metrics"
+            db.METRICS_ENABLED = instrumented
+            db.pool = db.ConnectionPool(copy, pooled=True)
+            app = make_app(instrumented)
+            for path in paths:
+                measure(app, path, min(200, args.requests), args.threads)  # warm up
+                rps, p50 = measure(app, path, args.requests, args.threads)
+                print(f"{mode:<10}{path:<22}{rps:>10.0f}{p50:>9.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# GET /products/ latency and response size as the catalogue grows: the old
+# full-table listing against keyset pages (first page and a deep page).
+# Each size gets a synthetic products table in a temporary database.
+#
+#   python benchmarks/product_listing.py --sizes 1000 100000 500000
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from flask import Flask  # noqa: E402
+
+import db  # noqa: E402
+import http_cache  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+from marketplace import route  # noqa: E402
+
+
+def build_database(path, size):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            description TEXT,
+            image_url TEXT,
+            rating REAL NOT NULL,
+            reviews REAL NOT NULL,
+            sold INTEGER NOT NULL
+        )
+    """
+    )
+    rng = random.Random(size)
+    conn.executemany(
+        "INSERT INTO products (name, price, description, image_url, rating, reviews, sold) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"Product {i}",
+                round(rng.uniform(10, 100000), 2),
+                "Fresh produce from a local farm, harvested this week",
+                "https://picsum.photos/200/300",
+                round(rng.uniform(1, 5), 1),
+                rng.randint(0, 500),
+                rng.randint(0, 1000),
+            )
+            for i in range(size)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def full_table():
+    """What GET /products/ used to do."""
+    with db.get_db_connection() as conn:
+        products = conn.execute("SELECT * FROM products").fetchall()
+    return json.dumps([dict(product) for product in products]).encode()
+
+
+def timed(fetch, repeat):
+    """Average ms, response bytes and peak traced MB of ``fetch()``."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = fetch()
+    elapsed = (time.perf_counter() - started) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, len(body), peak / 1e6
+
+
+def deep_cursor(client, pages):
+    """Cursor after ``pages`` pages sorted by -rating."""
+    cursor = ""
+    for _ in range(pages):
+        url = f"/products/?sort=-rating&limit=50&cursor={cursor}"
+        next_cursor = client.get(url).get_json()["next_cursor"]
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product listing latency vs catalogue size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 500000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--deep-pages", type=int, default=100)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    # Measure the queries, not the response cache in front of them.
+    http_cache.cache.enabled = False
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(route.products_bp, url_prefix="/products")
+    client = app.test_client()
+
+    print(f"{'rows':>8}  {'request':<36}{'ms':>9}{'KB':>10}{'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            path = os.path.join(workdir, f"products_{size}.db")
+            build_database(path, size)
+            db.pool = db.ConnectionPool(path)
+            route.prepare_indexes()  # what the server does at startup
+
+            cursor = deep_cursor(client, args.deep_pages)
+            pages = [
+                ("page 1, sort=id", "/products/?limit=50"),
+                ("page 1, sort=-rating, price filter",
+                 "/products/?limit=50&sort=-rating&min_price=500&max_price=5000"),
+                (f"page {args.deep_pages + 1}, sort=-rating",
+                 f"/products/?limit=50&sort=-rating&cursor={cursor}"),
+            ]
+            cases = [("old: SELECT * (all rows)", full_table)] + [
+                (name, lambda url=url: client.get(url).data) for name, url in pages
+            ]
+            for name, fetch in cases:
+                ms, size_bytes, peak = timed(fetch, args.repeat)
+                print(f"{size:>8}  {name:<36}{ms:>9.1f}{size_bytes / 1024:>10.1f}{peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# /products/search latency on a synthetic catalogue (default 1M rows):
+# exact words, prefixes, multi-word queries and typos, each ranking at most
+# PRODUCT_SEARCH_CANDIDATES matches.
+# The catalogue is built once per --rows in a temporary database.
+#
+#   python benchmarks/product_search.py --rows 1000000
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from marketplace.indexes import create_index  # noqa: E402
+from marketplace.search import search, vocabulary  # noqa: E402
+
+PRODUCE = ["tomato", "potato", "onion", "wheat", "rice", "mustard", "chilli", "brinjal",
+           "cabbage", "cauliflower", "mango", "banana", "jute", "sugarcane", "lentil"]
+KINDS = ["seeds", "saplings", "fertilizer", "pesticide", "harvest", "organic", "hybrid",
+         "sprayer", "pump", "tractor", "tiller", "compost", "irrigation", "kit"]
+WORDS = ["fresh", "local", "premium", "bulk", "certified", "drought", "resistant",
+         "high", "yield", "farm", "grade", "export", "quality", "season", "village"]
+
+QUERIES = {
+    "word": ["tomato", "tractor", "compost", "mango"],
+    "prefix": ["toma", "fert", "irrig", "cauli"],
+    "two words": ["hybrid tomato", "organic fertilizer", "mango saplings", "rice seeds"],
+    "typo": ["tomatoe", "fertilzer", "pestcide", "sugercane"],
+}
+
+
+def filler_vocabulary(rng, size=20000):
+    """Made-up words and their cumulative Zipf weights, so descriptions look like real text."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+    return words, weights
+
+
+def build_database(path, rows, seed):
+    rng = random.Random(seed)
+    filler, weights = filler_vocabulary(rng)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            description TEXT,
+            image_url TEXT,
+            rating REAL NOT NULL,
+            reviews REAL NOT NULL,
+            sold INTEGER NOT NULL
+        )
+    """
+    )
+    conn.executemany(
+        "INSERT INTO products (name, price, description, image_url, rating, reviews, sold) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"{rng.choice(WORDS).title()} {rng.choice(PRODUCE).title()} {rng.choice(KINDS).title()}",
+                round(rng.uniform(10, 50000), 2),
+                " ".join(
+                    rng.sample(WORDS + PRODUCE + KINDS, 2) + rng.choices(filler, cum_weights=weights, k=10)
+                ),
+                "https://picsum.photos/200/300",
+                round(rng.uniform(1, 5), 1),
+                rng.randint(0, 500),
+                rng.randint(0, 1000),
+            )
+            for _ in range(rows)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 product search latency")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        conn = build_database(os.path.join(workdir, "products.db"), args.rows, args.seed)
+        conn.row_factory = sqlite3.Row
+        print(f"Built {args.rows} products in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        create_index(conn)
+        vocabulary.load(conn)
+        print(f"Indexed them in {time.perf_counter() - started:.1f}s\n")
+
+        columns = ["id", "name", "price", "image_url"]
+        print(f"{'kind':<11}{'query':<22}{'hits':>6}{'p50 ms':>9}{'p95 ms':>9}  corrected")
+        for kind, queries in QUERIES.items():
+            for query in queries:
+                latencies = []
+                for _ in range(args.repeat):
+                    t = time.perf_counter()
+                    rows, corrected = search(conn, query, columns, args.limit)
+                    latencies.append(time.perf_counter() - t)
+                print(
+                    f"{kind:<11}{query:<22}{len(rows):>6}"
+                    f"{np.percentile(latencies, 50) * 1000:>9.2f}"
+                    f"{np.percentile(latencies, 95) * 1000:>9.2f}  {corrected or ''}"
+                )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
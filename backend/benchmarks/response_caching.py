@@ -0,0 +1,111 @@
+# Requests/sec and bytes on the wire for the cached read routes in three modes:
+#   uncached    HTTP_CACHE off, every request queries SQLite and serializes
+#   cached      body served from the in-process cache, full 200 every time
+#   revalidate  client sends the ETag back (If-None-Match) and gets a 304
+# Runs the real blueprints in-process through Flask's test client against a
+# copy of database.db.
+#
+#   python benchmarks/response_caching.py --requests 5000 --threads 8
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from flask import Flask  # noqa: E402
+
+import db  # noqa: E402
+import http_cache  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+from marketplace.route import products_bp  # noqa: E402
+from users.route import user_bp  # noqa: E402
+from videos.route import videos_bp  # noqa: E402
+
+
+def make_app():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(products_bp, url_prefix="/products")
+    app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(videos_bp, url_prefix="/videos")
+    return app
+
+
+def first_id(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(f"SELECT id FROM {table} ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 1
+
+
+def measure(app, path, requests, threads, revalidate):
+    client = app.test_client()
+    headers = {}
+    if revalidate:
+        etag = client.get(path).headers.get("ETag")
+        headers = {"If-None-Match": etag} if etag else {}
+
+    def one(_):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        return response.status_code, len(response.get_data()), time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies = [s for _, _, s in results]
+    errors = sum(1 for status, _, _ in results if status not in (200, 304))
+    body = np.mean([size for _, size, _ in results])
+    return requests / elapsed, np.percentile(latencies, 50) * 1000, body, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP response cache and 304 benchmark")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "database.db"))
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    copy = os.path.join(workdir, "database.db")
+    shutil.copy(args.db, copy)
+    db.pool = db.ConnectionPool(copy, pooled=True)
+    http_cache.cache = http_cache.ResponseCache(stamp_dir=os.path.join(workdir, "stamps"))
+    app = make_app()
+    paths = [
+        "/products/",
+        f"/products/{first_id(copy, 'products')}",
+        f"/user/{first_id(copy, 'user')}",
+        "/videos/",
+    ]
+
+    print(f"{args.requests} requests per route, {args.threads} threads\n")
+    print(f"{'mode':<12}{'route':<16}{'req/s':>10}{'p50 ms':>9}{'bytes':>9}{'errors':>8}")
+    try:
+        for mode in ("uncached", "cached", "revalidate"):
+            http_cache.cache.clear()
+            http_cache.cache.enabled = mode != "uncached"
+            for path in paths:
+                measure(app, path, min(200, args.requests), args.threads, False)  # warm up
+                rps, p50, body, errors = measure(
+                    app, path, args.requests, args.threads, mode == "revalidate"
+                )
+                print(f"{mode:<12}{path:<16}{rps:>10.0f}{p50:>9.2f}{body:>9.0f}{errors:>8}")
+        print(f"\ncache: {http_cache.cache.stats()}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
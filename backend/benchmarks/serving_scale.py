@@ -0,0 +1,156 @@
+# Throughput of serve.py as the worker count grows.
+# For each worker count the script starts serve.py, then runs concurrent
+# clients against the balancer for a fixed time. Half of the clients fetch
+# an HTTP route; the other half run Socket.IO long-polling sessions
+# (handshake, connect to /chat, poll), which only succeed if the balancer
+# keeps each session on one worker. Every client connects from its own
+# 127.0.0.x source address so the per-IP stickiness spreads them out.
+#
+#   python benchmarks/serving_scale.py --workers 1 2 4 --clients 32 --duration 15
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def client_address(index):
+    # Linux routes all of 127.0.0.0/8 to loopback.
+    return f"127.0.{index // 250}.{index % 250 + 2}"
+
+
+def request(conn, method, path, body=None):
+    conn.request(method, path, body=body, headers={"Content-Type": "text/plain"})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def http_client(port, source, path, stop, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30, source_address=(source, 0))
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            status, _ = request(conn, "GET", path)
+            ok = status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+        results.append(("http", ok, time.perf_counter() - started))
+
+
+def polling_client(port, source, stop, results):
+    """One Engine.IO polling session per iteration; fails if it changes worker."""
+    base = "/socket.io/?EIO=4&transport=polling"
+    while not stop.is_set():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30, source_address=(source, 0))
+        started = time.perf_counter()
+        try:
+            _, body = request(conn, "GET", base)
+            sid = json.loads(body.decode()[1:])["sid"]
+            # New TCP connection per request, as browsers often do.
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30, source_address=(source, 0))
+            status, _ = request(conn, "POST", f"{base}&sid={sid}", b"40/chat,")
+            _, body = request(conn, "GET", f"{base}&sid={sid}")
+            ok = status == 200 and b"40/chat" in body
+        except (OSError, ValueError, KeyError, http.client.HTTPException):
+            ok = False
+        finally:
+            conn.close()
+        results.append(("polling", ok, time.perf_counter() - started))
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def run(workers, args):
+    server = subprocess.Popen(
+        # The builtin balancer needs no nginx on the benchmark machine; it
+        # is sticky by source address, which the clients vary (127.0.x.y).
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port),
+         "--host", "127.0.0.1", "--balancer", "builtin"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "CHAT_WARMUP": "false"},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_for_port(args.port, args.startup_timeout):
+            print(f"{workers:>8}  serve.py did not come up")
+            return
+        time.sleep(1)  # let the balancer find every worker
+
+        stop = threading.Event()
+        results = []
+        threads = []
+        for i in range(args.clients):
+            source = client_address(i)
+            if i % 2 == 0:
+                target, extra = http_client, (args.path,)
+            else:
+                target, extra = polling_client, ()
+            threads.append(
+                threading.Thread(
+                    target=target, args=(args.port, source, *extra, stop, results), daemon=True
+                )
+            )
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        for kind in ("http", "polling"):
+            rows = [(ok, s) for k, ok, s in results if k == kind]
+            if not rows:
+                continue
+            latencies = [s for ok, s in rows if ok]
+            errors = sum(1 for ok, _ in rows if not ok)
+            p95 = np.percentile(latencies, 95) * 1000 if latencies else 0.0
+            print(
+                f"{workers:>8}{kind:>9}{len(latencies) / args.duration:>10.1f}"
+                f"{p95:>10.1f}{errors:>8}"
+            )
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serve.py throughput vs worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--path", default="/products/")
+    parser.add_argument("--port", type=int, default=5090)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.duration:.0f}s per run, HTTP path {args.path}\n")
+    print(f"{'workers':>8}{'kind':>9}{'ok/s':>10}{'p95 ms':>10}{'errors':>8}")
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Requests/sec on /products/ and /user/<id> with the old connect-per-request
+# pattern ("before") and the shared per-thread pool from src/db.py ("after").
+# Runs the real blueprints in-process through Flask's test client, each mode
+# against its own copy of database.db so WAL mode does not leak into the baseline.
+#
+#   python benchmarks/sqlite_routes.py --requests 5000 --threads 8
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+from flask import Flask  # noqa: E402
+
+import db  # noqa: E402
+import http_cache  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+from marketplace.route import products_bp  # noqa: E402
+from users.route import user_bp  # noqa: E402
+
+
+class ConnectPerRequest(db.ConnectionPool):
+    """What the routes did before: exists check, connect, pragma, close."""
+
+    def acquire(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+
+def make_app():
+    app = Flask(__name__)
+    # Measure the queries, not the response cache in front of them.
+    http_cache.cache.enabled = False
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(products_bp, url_prefix="/products")
+    app.register_blueprint(user_bp, url_prefix="/user")
+    return app
+
+
+def first_user_id(path):
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT id FROM user ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 1
+
+
+def measure(app, path, requests, threads):
+    client = app.test_client()
+
+    def one(_):
+        started = time.perf_counter()
+        status = client.get(path).status_code
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies = [s for _, s in results]
+    errors = sum(1 for status, _ in results if status != 200)
+    return requests / elapsed, np.percentile(latencies, 50) * 1000, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite route throughput before/after pooling")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "database.db"))
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    app = make_app()
+    workdir = tempfile.mkdtemp()
+    user_id = first_user_id(args.db)
+    paths = ["/products/", f"/user/{user_id}"]
+
+    print(f"{args.requests} requests per route, {args.threads} threads\n")
+    print(f"{'mode':<8}{'route':<16}{'req/s':>10}{'p50 ms':>9}{'errors':>8}")
+    try:
+        for mode, pool_class in (("before", ConnectPerRequest), ("after", db.ConnectionPool)):
+            copy = os.path.join(workdir, f"{mode}.db")
+            shutil.copy(args.db, copy)
+            db.pool = pool_class(copy, pooled=True)
+            for path in paths:
+                measure(app, path, min(200, args.requests), args.threads)  # warm up
+                rps, p50, errors = measure(app, path, args.requests, args.threads)
+                print(f"{mode:<8}{path:<16}{rps:>10.0f}{p50:>9.2f}{errors:>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
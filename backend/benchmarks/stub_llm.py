@@ -0,0 +1,158 @@
+# Offline stand-in for the chat model: an OpenAI-compatible
+# /v1/chat/completions endpoint that answers after a fixed delay and then
+# emits tokens at a fixed rate, streamed (SSE) or not. Point the server at
+# it with CHAT_MODEL=http://127.0.0.1:<port> and any HF_TOKEN;
+# InferenceClient appends /v1/chat/completions to a URL model.
+#
+#   python benchmarks/stub_llm.py --port 8089 --latency 0.3 --tokens-per-second 40 --tokens 120
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "water the field early in the morning and check the soil moisture before "
+    "adding fertilizer apply neem oil against aphids rotate wheat with pulses "
+    "sow after the first monsoon rain keep seedlings shaded for a week"
+).split()
+
+
+class StubSettings:
+    def __init__(self, latency=0.3, tokens_per_second=40.0, tokens=120):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+def answer_tokens(prompt: str, count: int):
+    """The same prompt always gets the same answer."""
+    rng = random.Random(hashlib.blake2b(prompt.encode(), digest_size=8).digest())
+    return [rng.choice(WORDS) + " " for _ in range(count)]
+
+
+def make_handler(settings: StubSettings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = "".join(m.get("content") or "" for m in body.get("messages", []))
+            count = min(settings.tokens, body.get("max_tokens") or settings.tokens)
+            tokens = answer_tokens(prompt, count)
+            with settings.lock:
+                settings.requests += 1
+
+            time.sleep(settings.latency)
+            created = int(time.time())
+            interval = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                # Chunked like llama.cpp, TGI and vLLM, so clients see each
+                # event as it is sent rather than at the end of the body.
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in tokens:
+                    self._event(b"data: " + json.dumps(self._chunk(created, {"content": token}, None)).encode())
+                    time.sleep(interval)
+                self._event(b"data: " + json.dumps(self._chunk(created, {}, "stop")).encode())
+                self._event(b"data: [DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+                return
+
+            time.sleep(interval * len(tokens))
+            payload = json.dumps(
+                {
+                    "id": f"stub-{created}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": "stub",
+                    "system_fingerprint": "stub",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(prompt.split()),
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(prompt.split()) + len(tokens),
+                    },
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        @staticmethod
+        def _chunk(created, delta, finish_reason):
+            return {
+                "id": f"stub-{created}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": "stub",
+                "system_fingerprint": "stub",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        def _event(self, line):
+            event = line + b"\n\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.flush()
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop idle keep-alive connections; that is not an error here.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start(port=0, latency=0.3, tokens_per_second=40.0, tokens=120):
+    """Serve on a background thread; returns (server, settings). Port 0 picks a free one."""
+    settings = StubSettings(latency, tokens_per_second, tokens)
+    server = StubServer(("127.0.0.1", port), make_handler(settings))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat endpoint")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=120, help="tokens per answer")
+    args = parser.parse_args()
+    server, _ = start(args.port, args.latency, args.tokens_per_second, args.tokens)
+    print(f"Stub LLM at http://127.0.0.1:{server.server_address[1]} "
+          f"({args.latency}s to first token, {args.tokens_per_second} tokens/s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
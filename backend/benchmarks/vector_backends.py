@@ -0,0 +1,63 @@
+# Search latency of the same collection over each VECTOR_BACKEND.
+# Query vectors are sampled from the collection itself, so no embedding
+# model is loaded and only the vector store round trip is measured.
+# Build the local index first with VECTOR_BACKEND=local python processor.py.
+#
+#   python benchmarks/vector_backends.py --backends http grpc local --queries 500
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+QDRANT_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "model", "qdrant")
+sys.path.insert(0, QDRANT_DIR)
+
+from vector_backend import COLLECTION_NAME, describe, make_client  # noqa: E402
+
+
+def sample_vectors(client, collection, n):
+    points, _ = client.scroll(collection, limit=n, with_vectors=True, with_payload=False)
+    vectors = []
+    for point in points:
+        vector = point.vector
+        if isinstance(vector, dict):
+            vector = vector.get("")
+        if vector is not None:
+            vectors.append(vector)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant search latency per backend")
+    parser.add_argument("--backends", nargs="+", default=["http", "grpc", "local"])
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'backend':<48}{'p50 ms':>9}{'p95 ms':>9}{'qps':>9}")
+    for backend in args.backends:
+        try:
+            client = make_client(backend)
+            vectors = sample_vectors(client, args.collection, args.queries)
+        except Exception as e:
+            print(f"{describe(backend):<48} unavailable: {e}")
+            continue
+        latencies = []
+        started = time.perf_counter()
+        for vector in vectors:
+            t = time.perf_counter()
+            client.query_points(args.collection, query=vector, limit=args.k, with_payload=True)
+            latencies.append(time.perf_counter() - t)
+        total = time.perf_counter() - started
+        client.close()
+        print(
+            f"{describe(backend):<48}{np.percentile(latencies, 50) * 1000:>9.2f}"
+            f"{np.percentile(latencies, 95) * 1000:>9.2f}{len(latencies) / total:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
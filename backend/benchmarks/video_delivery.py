@@ -0,0 +1,86 @@
+# Video delivery against a running server (python serve.py or src/main.py):
+#   manifest   GET /videos/ with and without If-None-Match (200 vs 304)
+#   full       time to first byte and total time for the whole MP4
+#   resume     Range: bytes=<middle>- , what a player sends to seek or resume
+#   probe      Range: bytes=0-1 , the request players open a file with
+#   hls start  master playlist + lowest-rendition playlist + first segment,
+#              i.e. what a player fetches before the first frame (needs
+#              package_videos.py to have run)
+#
+#   python benchmarks/video_delivery.py --url http://127.0.0.1:5000 --repeat 20
+import argparse
+import http.client
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+import orjson
+
+
+def fetch(conn, path, headers=None):
+    """(status, body bytes, seconds to first byte, total seconds)."""
+    started = time.perf_counter()
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    first = response.read(1)
+    ttfb = time.perf_counter() - started
+    body = first + response.read()
+    return response.status, body, ttfb, time.perf_counter() - started
+
+
+def report(name, samples):
+    ttfb = np.percentile([s[2] for s in samples], 50) * 1000
+    total = np.percentile([s[3] for s in samples], 50) * 1000
+    size = np.mean([len(s[1]) for s in samples])
+    statuses = ",".join(sorted({str(s[0]) for s in samples}))
+    print(f"{name:<14}{statuses:>8}{ttfb:>10.2f}{total:>10.2f}{size:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video delivery latencies")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    target = urlparse(args.url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+
+    status, body, _, _ = fetch(conn, "/videos/manifest")
+    manifest = orjson.loads(body)["videos"]
+    if status != 200 or not manifest:
+        print("No videos on the server.")
+        return
+    video = manifest[0]
+    print(f"video {video['name']}: {video['size']} bytes, {video['duration']}s, "
+          f"{len(video['renditions'])} HLS renditions\n")
+
+    print(f"{'request':<14}{'status':>8}{'ttfb ms':>10}{'total ms':>10}{'bytes':>12}")
+    report("manifest", [fetch(conn, "/videos/") for _ in range(args.repeat)])
+    conn.request("GET", "/videos/")
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader("ETag")
+    report("manifest 304", [fetch(conn, "/videos/", {"If-None-Match": etag}) for _ in range(args.repeat)])
+
+    middle = video["size"] // 2
+    report("full", [fetch(conn, video["url"]) for _ in range(args.repeat)])
+    report("resume", [fetch(conn, video["url"], {"Range": f"bytes={middle}-"})
+                      for _ in range(args.repeat)])
+    report("probe", [fetch(conn, video["url"], {"Range": "bytes=0-1"}) for _ in range(args.repeat)])
+
+    if video["hls"]:
+        lowest = video["renditions"][0]["url"]
+        playlist = fetch(conn, lowest)[1].decode()
+        segment = next(line for line in playlist.splitlines() if line and not line.startswith("#"))
+        segment_url = lowest.rsplit("/", 1)[0] + "/" + segment
+        runs = []
+        for _ in range(args.repeat):
+            parts = [fetch(conn, video["hls"]), fetch(conn, lowest), fetch(conn, segment_url)]
+            runs.append((200, b"".join(p[1] for p in parts), parts[-1][2] + sum(p[3] for p in parts[:2]),
+                         sum(p[3] for p in parts)))
+        report("hls start", runs)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
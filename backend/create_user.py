@@ -1,6 +1,11 @@
 # Generate some mock user data
 
 import sqlite3
+import sys
+
+sys.path.insert(0, "./src")
+
+from cache_stamps import touch  # noqa: E402
 
 DB_PATH = "database.db"
 
@@ -34,6 +39,8 @@ def insert_farmer_details():
 
     conn.commit()
     conn.close()
+    # Running servers drop cached user responses and profile locations.
+    touch("user")
     print(f"Inserted {len(farmers)} farmer details into the database.")
 
 
@@ -0,0 +1,185 @@
+"""Cut every video in src/videos/files into HLS renditions and a poster.
+
+    python package_videos.py            # new or changed videos only
+    python package_videos.py --force    # everything
+
+Needs ffmpeg and ffprobe on PATH. For each <name>.mp4 this writes
+hls/<name>/ (master.m3u8, one media playlist + 4 s MPEG-TS segments per
+rendition, meta.json) and thumbs/<name>.jpg. Rungs are applied to the
+short side, so portrait phone videos get the same ladder, and rungs above
+the source are skipped. Keyframes are forced on segment boundaries so players
+can switch bitrate at any segment. A video is repackaged when its MP4 is
+newer than its meta.json. Running servers pick the result up through the
+/videos/ manifest, which watches these folders.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VIDEO_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "videos", "files")
+HLS_FOLDER = os.path.join(VIDEO_FOLDER, "hls")
+THUMB_FOLDER = os.path.join(VIDEO_FOLDER, "thumbs")
+
+SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+PRESET = os.getenv("HLS_PRESET", "veryfast")
+# (name, short side in pixels, video bits/s, audio bits/s)
+LADDER = [
+    ("240p", 240, 400_000, 64_000),
+    ("480p", 480, 1_000_000, 96_000),
+    ("720p", 720, 2_500_000, 128_000),
+]
+THUMB_WIDTH = 480
+
+
+def probe(path):
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=codec_type,width,height:format=duration",
+         "-of", "json", path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    info = json.loads(out)
+    streams = info.get("streams", [])
+    video = next(s for s in streams if s["codec_type"] == "video")
+    has_audio = any(s["codec_type"] == "audio" for s in streams)
+    duration = float(info.get("format", {}).get("duration") or 0)
+    return video["width"], video["height"], has_audio, duration
+
+
+def ladder_for(width, height):
+    renditions = [r for r in LADDER if r[1] <= min(width, height)]
+    return renditions or LADDER[:1]
+
+
+def output_size(width, height, short_side):
+    """Frame size with the short side scaled to ``short_side`` (even numbers)."""
+    scale = short_side / min(width, height)
+    return round(width * scale / 2) * 2, round(height * scale / 2) * 2
+
+
+def hls_command(source, out_dir, renditions, width, height, has_audio):
+    count = len(renditions)
+    split = f"[0:v]split={count}" + "".join(f"[v{i}]" for i in range(count))
+    scales = []
+    for i, (_, short_side, _, _) in enumerate(renditions):
+        w, h = output_size(width, height, short_side)
+        scales.append(f"[v{i}]scale={w}:{h}[v{i}out]")
+    command = ["ffmpeg", "-v", "error", "-y", "-i", source,
+               "-filter_complex", ";".join([split] + scales)]
+    stream_map = []
+    for i, (name, _, video_rate, audio_rate) in enumerate(renditions):
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264", f"-b:v:{i}", str(video_rate),
+            f"-maxrate:v:{i}", str(int(video_rate * 1.07)),
+            f"-bufsize:v:{i}", str(int(video_rate * 1.5)),
+        ]
+        if has_audio:
+            command += ["-map", "a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", str(audio_rate)]
+            stream_map.append(f"v:{i},a:{i},name:{name}")
+        else:
+            stream_map.append(f"v:{i},name:{name}")
+    command += [
+        "-preset", PRESET,
+        "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(out_dir, "%v", "seg_%03d.ts"),
+        "-master_pl_name", "master.m3u8",
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(out_dir, "%v", "index.m3u8"),
+    ]
+    return command
+
+
+def package_hls(source, stem, width, height, has_audio, duration):
+    renditions = ladder_for(width, height)
+    target = os.path.join(HLS_FOLDER, stem)
+    staging = os.path.join(HLS_FOLDER, f".{stem}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    subprocess.run(hls_command(source, staging, renditions, width, height, has_audio), check=True)
+    meta = {
+        "source": os.path.basename(source),
+        "duration": duration,
+        "segment_seconds": SEGMENT_SECONDS,
+        "renditions": [
+            {
+                "name": name,
+                "width": output_size(width, height, short_side)[0],
+                "height": output_size(width, height, short_side)[1],
+                "bandwidth": video_rate + (audio_rate if has_audio else 0),
+            }
+            for name, short_side, video_rate, audio_rate in renditions
+        ],
+    }
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap the finished tree in, so servers never list a half-written one.
+    old = os.path.join(HLS_FOLDER, f".{stem}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(target):
+        os.rename(target, old)
+    os.rename(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return [name for name, _, _, _ in renditions]
+
+
+def make_thumbnail(source, stem, duration):
+    os.makedirs(THUMB_FOLDER, exist_ok=True)
+    target = os.path.join(THUMB_FOLDER, f"{stem}.jpg")
+    partial = os.path.join(THUMB_FOLDER, f".{stem}.tmp.jpg")
+    # A frame a little way in is more representative than the first one.
+    offset = min(duration * 0.1, 5.0)
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-ss", f"{offset:.2f}", "-i", source,
+         "-frames:v", "1", "-vf", f"scale={THUMB_WIDTH}:-2", "-q:v", "4", partial],
+        check=True,
+    )
+    os.replace(partial, target)
+
+
+def up_to_date(source, stem):
+    meta = os.path.join(HLS_FOLDER, stem, "meta.json")
+    thumb = os.path.join(THUMB_FOLDER, f"{stem}.jpg")
+    if not (os.path.exists(meta) and os.path.exists(thumb)):
+        return False
+    return os.path.getmtime(meta) >= os.path.getmtime(source)
+
+
+def package_videos(force=False):
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        print("ffmpeg and ffprobe must be installed and on PATH.")
+        sys.exit(1)
+    os.makedirs(HLS_FOLDER, exist_ok=True)
+    names = sorted(f for f in os.listdir(VIDEO_FOLDER) if f.endswith(".mp4"))
+    packaged = 0
+    for filename in names:
+        source = os.path.join(VIDEO_FOLDER, filename)
+        stem = filename[: -len(".mp4")]
+        if not force and up_to_date(source, stem):
+            print(f"{filename}: up to date")
+            continue
+        width, height, has_audio, duration = probe(source)
+        renditions = package_hls(source, stem, width, height, has_audio, duration)
+        make_thumbnail(source, stem, duration)
+        packaged += 1
+        print(f"{filename}: {duration:.1f}s, renditions {', '.join(renditions)}, poster written")
+    print(f"Packaged {packaged} of {len(names)} videos.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Package videos for HLS delivery")
+    parser.add_argument("--force", action="store_true", help="repackage every video")
+    package_videos(parser.parse_args().force)
@@ -0,0 +1,31 @@
+# Rebuild the full-text product search index (products_fts) from the products table.
+# Creates the FTS table, its sync triggers and the listing indexes if they are missing.
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, "./src")
+
+from marketplace.indexes import create_indexes, index_exists, rebuild  # noqa: E402
+
+DB_PATH = "./database.db"  # Change path if needed
+
+
+def reindex_products():
+    conn = sqlite3.connect(DB_PATH)
+    started = time.perf_counter()
+    if index_exists(conn):
+        rebuild(conn)
+    # Creates whichever listing or search indexes are missing.
+    create_indexes(conn)
+    products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    terms = conn.execute("SELECT COUNT(*) FROM products_fts_vocab").fetchone()[0]
+    conn.close()
+    print(
+        f"Reindexed {products} products ({terms} distinct terms) "
+        f"in {time.perf_counter() - started:.2f}s."
+    )
+
+
+if __name__ == "__main__":
+    reindex_products()
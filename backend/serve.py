@@ -0,0 +1,300 @@
+"""Production serving: several app workers behind nginx.
+
+    python serve.py --workers 4 --port 5000
+
+With one worker gunicorn binds --host:--port itself and nothing sits in
+between. With more, each worker is a full copy of the app (gunicorn with
+one threaded worker where available, the Socket.IO server from
+src/main.py otherwise) bound to 127.0.0.1:<base-port + i>. serve.py writes
+an nginx config for them (--nginx-conf), then only supervises the
+workers; nginx does the balancing:
+
+  * /socket.io/ is pinned to one worker per client, which long-polling
+    needs: all requests of an Engine.IO session must reach the process
+    that created it. The key is the ``client`` query parameter the mobile
+    app sends on every Socket.IO request, falling back to the client IP,
+    so users behind one carrier-grade NAT address still spread out.
+  * Every other route goes to the least busy worker. nginx passes the
+    client address in X-Forwarded-For, which the workers trust for one
+    hop (PROXY_HOPS), and videos keep gunicorn's sendfile path.
+
+``--balancer builtin`` runs a small asyncio TCP proxy in this process
+instead, sticky by client IP. All traffic then crosses one Python thread
+and the workers see every client as 127.0.0.1: it is for trying several
+workers on a machine without nginx, not for production.
+
+What the workers share:
+  * chat sessions and summaries, through SQLite (SESSION_SHARED=true);
+  * cached chat answers, through SQLite (ANSWER_CACHE_SHARED=true): each
+    worker keeps its in-memory index and pulls the others' answers about
+    once a second;
+  * invalidation of the answer and HTTP caches, through stamp files;
+  * Socket.IO emits, through SOCKETIO_MESSAGE_QUEUE when it is set
+    (e.g. redis://localhost:6379/0 for Redis or a compatible server like
+    Valkey; needs the ``redis`` package).
+What they do not share: the HTTP response and query embedding caches are
+per process, so their hit rates drop as workers are added (both are cheap
+to refill: one SQLite query or one embedding each), and every worker loads
+its own embedding model; budget memory accordingly.
+VECTOR_BACKEND=local (embedded Qdrant) locks its index to one process, so
+serve.py refuses to start more than one worker with it.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+
+WORKERS = int(os.getenv("SERVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+THREADS = int(os.getenv("SERVE_THREADS", "64"))
+PORT = int(os.getenv("PORT", "5000"))
+BASE_PORT = int(os.getenv("SERVE_BASE_PORT", "5101"))
+BALANCER = os.getenv("SERVE_BALANCER", "nginx").lower()
+NGINX_CONF = os.getenv(
+    "SERVE_NGINX_CONF", os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.nginx.conf")
+)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "http").lower()
+BUFFER_SIZE = 64 * 1024
+
+NGINX_TEMPLATE = """# Generated by serve.py for {count} workers; include it from nginx.conf's
+# http block (or copy it there) and reload nginx.
+map $arg_client $farmers_socketio_key {{
+    ""      $remote_addr;
+    default $arg_client;
+}}
+
+map $http_upgrade $farmers_connection {{
+    default upgrade;
+    ""      "";
+}}
+
+upstream farmers_socketio {{
+    hash $farmers_socketio_key consistent;
+{servers}
+}}
+
+upstream farmers_api {{
+    least_conn;
+{servers}
+    keepalive 32;
+}}
+
+server {{
+    listen {listen};
+    client_max_body_size 16m;
+
+    proxy_set_header Host $host;
+    proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+    proxy_set_header X-Forwarded-Proto $scheme;
+
+    location /socket.io/ {{
+        proxy_pass http://farmers_socketio;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $farmers_connection;
+        proxy_buffering off;
+        proxy_read_timeout 120s;
+    }}
+
+    location / {{
+        proxy_pass http://farmers_api;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        # Streams video byte ranges through without spooling them to disk.
+        proxy_buffering off;
+    }}
+}}
+"""
+
+
+def worker_command(port, threads, host="127.0.0.1"):
+    if os.name != "nt" and importlib.util.find_spec("gunicorn"):
+        return [
+            sys.executable, "-m", "gunicorn",
+            "--workers", "1",
+            "--threads", str(threads),
+            "--bind", f"{host}:{port}",
+            "--chdir", SRC_DIR,
+            "main:app",
+        ]
+    # gunicorn does not run on Windows; fall back to the built-in server.
+    return [sys.executable, os.path.join(SRC_DIR, "main.py")]
+
+
+def spawn_workers(count, base_port, threads, proxy_hops=0):
+    env = dict(os.environ)
+    if count > 1:
+        # Sessions must be read from SQLite on every turn once a user's
+        # turns can land on different workers (reconnects, new IPs), and an
+        # answer cached by one worker should serve the same question on all.
+        env.setdefault("SESSION_SHARED", "true")
+        env.setdefault("ANSWER_CACHE_SHARED", "true")
+    if proxy_hops:
+        env.setdefault("PROXY_HOPS", str(proxy_hops))
+    workers = []
+    for i in range(count):
+        port = base_port + i
+        workers.append(
+            subprocess.Popen(
+                worker_command(port, threads),
+                cwd=SRC_DIR,
+                env={**env, "HOST": "127.0.0.1", "PORT": str(port)},
+            )
+        )
+    return workers
+
+
+def nginx_config(host, port, ports) -> str:
+    servers = "\n".join(f"    server 127.0.0.1:{p};" for p in ports)
+    listen = str(port) if host in ("0.0.0.0", "") else f"{host}:{port}"
+    return NGINX_TEMPLATE.format(count=len(ports), servers=servers, listen=listen)
+
+
+def write_nginx_config(path, host, port, ports):
+    with open(path, "w") as f:
+        f.write(nginx_config(host, port, ports))
+
+
+def supervise(workers):
+    """Block until a worker exits; the others are stopped by the caller."""
+    while all(worker.poll() is None for worker in workers):
+        time.sleep(1)
+    print(" A worker exited; stopping the others")
+
+
+def pick_worker(ip: str, ports):
+    # crc32 rather than hash(): stable across balancer restarts.
+    return ports[zlib.crc32(ip.encode()) % len(ports)]
+
+
+async def pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(BUFFER_SIZE)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def handle_client(client_reader, client_writer, ports):
+    ip = client_writer.get_extra_info("peername")[0]
+    try:
+        upstream_reader, upstream_writer = await asyncio.open_connection(
+            "127.0.0.1", pick_worker(ip, ports)
+        )
+    except OSError:
+        client_writer.close()
+        return
+    await asyncio.gather(
+        pipe(client_reader, upstream_writer),
+        pipe(upstream_reader, client_writer),
+    )
+
+
+async def balance(host, port, ports):
+    server = await asyncio.start_server(
+        lambda r, w: handle_client(r, w, ports), host, port
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def wait_for_workers(ports, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    pending = set(ports)
+    while pending and time.monotonic() < deadline:
+        for port in list(pending):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                pending.discard(port)
+            except OSError:
+                pass
+        if pending:
+            time.sleep(0.2)
+    return not pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several app workers behind nginx")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS, help="threads per worker")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--base-port", type=int, default=BASE_PORT)
+    parser.add_argument(
+        "--balancer", choices=["nginx", "builtin"], default=BALANCER,
+        help="nginx: write --nginx-conf and let nginx balance; builtin: in-process proxy (development)",
+    )
+    parser.add_argument("--nginx-conf", default=NGINX_CONF)
+    args = parser.parse_args()
+    if args.workers > 1 and VECTOR_BACKEND == "local":
+        parser.error(
+            "VECTOR_BACKEND=local locks the index to one process: "
+            "run --workers 1 or point the workers at a Qdrant server"
+        )
+
+    started = time.perf_counter()
+    if args.workers <= 1:
+        # Nothing to balance: gunicorn listens on the public port itself.
+        workers = [
+            subprocess.Popen(
+                worker_command(args.port, args.threads, args.host),
+                cwd=SRC_DIR,
+                env={**os.environ, "HOST": args.host, "PORT": str(args.port)},
+            )
+        ]
+        ports = [args.port]
+    else:
+        ports = [args.base_port + i for i in range(args.workers)]
+        workers = spawn_workers(
+            args.workers, args.base_port, args.threads,
+            proxy_hops=1 if args.balancer == "nginx" else 0,
+        )
+    try:
+        if not wait_for_workers(ports):
+            print(" Some workers did not start listening in time")
+        ready = f"ready in {time.perf_counter() - started:.1f}s"
+        if args.workers <= 1:
+            print(f"Serving 1 worker on http://{args.host}:{args.port} ({ready})")
+            supervise(workers)
+        elif args.balancer == "nginx":
+            write_nginx_config(args.nginx_conf, args.host, args.port, ports)
+            print(
+                f"Serving {args.workers} workers on ports {ports[0]}-{ports[-1]} ({ready}); "
+                f"nginx config for port {args.port} written to {args.nginx_conf}"
+            )
+            supervise(workers)
+        else:
+            print(
+                f"Serving {args.workers} workers on ports {ports[0]}-{ports[-1]} "
+                f"behind the builtin balancer at http://{args.host}:{args.port} ({ready}); "
+                "use --balancer nginx in production"
+            )
+            asyncio.run(balance(args.host, args.port, ports))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
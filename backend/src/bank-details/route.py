@@ -1,70 +1,14 @@
 from flask import Blueprint, jsonify
 import sqlite3
-import os
 import logging
-from contextlib import contextmanager
-from functools import wraps
+from db import get_db_connection, handle_database_errors
 
 bank_bp = Blueprint("bank", __name__)
 
-# Configuration
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database.db")
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections with automatic cleanup"""
-    conn = None
-    try:
-        if not os.path.exists(DB_PATH):
-            logger.error(f"Database file not found: {DB_PATH}")
-            raise FileNotFoundError(f"Database file not found: {DB_PATH}")
-
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-
-        # Enable foreign key constraints
-        conn.execute("PRAGMA foreign_keys = ON")
-
-        yield conn
-    except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if conn:
-            conn.close()
-
-
-def handle_database_errors(f):
-    """Decorator to handle database errors gracefully"""
-
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            return f(*args, **kwargs)
-        except FileNotFoundError as e:
-            logger.error(f"Database file error: {e}")
-            return jsonify({"error": "Database unavailable"}), 503
-        except sqlite3.Error as e:
-            logger.error(f"Database error: {e}")
-            return jsonify({"error": "Database error occurred"}), 500
-        except Exception as e:
-            logger.error(f"Unexpected error in {f.__name__}: {e}")
-            return jsonify({"error": "Internal server error"}), 500
-
-    return decorated_function
-
-
 def validate_user_id(user_id):
     """Validate user ID parameter"""
     if not isinstance(user_id, int) or user_id <= 0:
@@ -94,7 +38,7 @@ def get_bank_details(user_id):
                 details_dict = dict(bank_details)
                 details_dict.pop("user_id", None)
 
-                logger.info(f"Successfully retrieved bank details for user {user_id}")
+                logger.debug("Retrieved bank details for user %s", user_id)
                 return (
                     jsonify(
                         {
@@ -107,7 +51,7 @@ def get_bank_details(user_id):
                     200,
                 )
             else:
-                logger.info(f"Bank details not found for user: {user_id}")
+                logger.debug("Bank details not found for user: %s", user_id)
                 return (
                     jsonify({"error": "Bank details not found", "status": "error"}),
                     404,
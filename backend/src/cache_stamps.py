@@ -0,0 +1,38 @@
+"""Invalidation stamps shared by the serve.py workers and the offline scripts.
+
+A stamp is an empty file under backend/http_cache/ named after the data it
+covers ("products", "user"); its mtime moves on every write to that data.
+Whatever caches the data in memory (http_cache, the chat stack's user
+locations) compares the mtime now and then and drops its copy when it
+moved. Plain files and no Flask, so add_products.py and create_user.py can
+touch a stamp without loading the web stack.
+"""
+
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+STAMP_DIR = os.path.join(os.path.dirname(__file__), "..", "http_cache")
+
+
+def stamp_path(tag: str, stamp_dir: str = STAMP_DIR) -> str:
+    return os.path.join(stamp_dir, tag)
+
+
+def read_stamp(tag: str, stamp_dir: str = STAMP_DIR) -> Optional[float]:
+    try:
+        return os.stat(stamp_path(tag, stamp_dir)).st_mtime
+    except OSError:
+        return None
+
+
+def touch(tag: str, stamp_dir: str = STAMP_DIR):
+    """Mark ``tag`` as written, for every process watching it."""
+    try:
+        os.makedirs(stamp_dir, exist_ok=True)
+        with open(stamp_path(tag, stamp_dir), "a"):
+            os.utime(stamp_path(tag, stamp_dir))
+    except OSError as e:
+        logger.warning("Could not touch cache stamp for %s: %s", tag, e)
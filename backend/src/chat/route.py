@@ -1,10 +1,26 @@
-import json
-from flask import Blueprint
-from flask_socketio import SocketIO, send
-from model.model import model as chat_model  # alias to avoid shadowing
+import os
+import uuid
+from flask import Blueprint, jsonify, request
+from flask_socketio import SocketIO
+from json_provider import SocketIOJson
+from metrics import registry, timed_handler
+from model.loader import chat_stack, is_loaded
+from model.units.trace import startup_stats, trace_stats
+from .worker import chat_pool
 
 chat_bp = Blueprint("chat", __name__)
-socketio = SocketIO()
+socketio = SocketIO(json=SocketIOJson)
+
+# Set CHAT_STREAMING=false to always answer with a single "message" event.
+STREAMING_ENABLED = os.getenv("CHAT_STREAMING", "true").lower() == "true"
+BUSY_MESSAGE = "Server is busy, please try again shortly."
+
+
+def fallback_message() -> str:
+    # Imported here like the stats below, so this module stays light to import.
+    from model.units.resilience_unit import FALLBACK_MESSAGE
+
+    return FALLBACK_MESSAGE
 
 
 def process_message(msg: dict) -> dict:
@@ -12,18 +28,146 @@ def process_message(msg: dict) -> dict:
     user_id = msg.get("userID")
     context = msg.get("context", "")
 
-    answer = chat_model(context, session_id=user_id)  # type: ignore
+    # First call loads the LLM client, embeddings and Qdrant (model/loader.py).
+    answer = chat_stack().model(context, session_id=user_id)  # type: ignore
 
     return {"userID": user_id, "context": answer}
 
 
-@socketio.on("message", namespace="/chat")
-def handle_message(msg: dict):
-    """Handles incoming WebSocket messages."""
-    result = process_message(msg)
+def stream_message(msg: dict, sid: str):
+    """Emit the answer as answer_chunk events followed by one answer_done."""
+    user_id = msg.get("userID")
+    context = msg.get("context", "")
+    message_id = msg.get("messageID") or uuid.uuid4().hex
+
+    parts = []
+    status = "success"
+    try:
+        stream = chat_stack().stream_model(context, session_id=user_id)  # type: ignore
+        for index, delta in enumerate(stream):
+            parts.append(delta)
+            socketio.emit(
+                "answer_chunk",
+                {
+                    "userID": user_id,
+                    "messageID": message_id,
+                    "index": index,
+                    "delta": delta,
+                },
+                namespace="/chat",
+                to=sid,
+            )
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        # Always close the answer, so the client never waits on a dead turn.
+        socketio.emit(
+            "answer_done",
+            {
+                "userID": user_id,
+                "messageID": message_id,
+                "answer": "".join(parts) or fallback_message(),
+                "status": status,
+            },
+            namespace="/chat",
+            to=sid,
+        )
+
+
+def answer_message(msg: dict, sid: str):
+    """Runs one chat turn on the worker pool and replies to ``sid``."""
+    if STREAMING_ENABLED and msg.get("stream"):
+        stream_message(msg, sid)
+        return
+
+    try:
+        result = process_message(msg)
+    except Exception:
+        socketio.send(
+            {"answer": fallback_message(), "status": "error", "userID": msg.get("userID")},
+            namespace="/chat",
+            to=sid,
+        )
+        raise  # still counted as a failed turn by the pool
     response_data = {
         "answer": result["context"],
         "status": "success",
         "userID": result["userID"],
     }
-    send(json.dumps(response_data), namespace="/chat")
+    socketio.send(response_data, namespace="/chat", to=sid)
+
+
+@socketio.on("message", namespace="/chat")
+@timed_handler("/chat", "message")
+def handle_message(msg: dict):
+    """Handles incoming WebSocket messages.
+
+    The turn is queued on the chat worker pool so the Socket.IO thread is
+    released immediately. Clients opt in to token streaming by sending
+    ``"stream": true``; everyone else gets the original single ``message``
+    reply. When the pool is saturated the turn is answered at once with
+    ``status: "busy"``, on the event the client is already waiting for.
+    """
+    sid = request.sid  # type: ignore
+    user_key = msg.get("userID") or sid
+    if not chat_pool.submit(user_key, answer_message, msg, sid):
+        reply_busy(msg, sid)
+
+
+def reply_busy(msg: dict, sid: str):
+    busy = {
+        "userID": msg.get("userID"),
+        "answer": BUSY_MESSAGE,
+        "status": "busy",
+    }
+    if STREAMING_ENABLED and msg.get("stream"):
+        busy["messageID"] = msg.get("messageID") or uuid.uuid4().hex
+        socketio.emit("answer_done", busy, namespace="/chat", to=sid)
+    else:
+        socketio.send(busy, namespace="/chat", to=sid)
+
+
+QUEUE_STATS = ("active", "queue_depth", "queued_users")
+TURN_OUTCOMES = ("submitted", "completed", "failed", "rejected")
+
+registry.register_collector(
+    "chat_pool_turns", "gauge", "Chat turns running or waiting for a worker.",
+    lambda: {k: v for k, v in chat_pool.stats().items() if k in QUEUE_STATS}, label="state",
+)
+registry.register_collector(
+    "chat_pool_turns_total", "counter", "Chat turns by outcome.",
+    lambda: {k: v for k, v in chat_pool.stats().items() if k in TURN_OUTCOMES}, label="outcome",
+)
+
+
+@chat_bp.route("/stats", methods=["GET"])
+def chat_stats():
+    stats = {
+        "loaded": is_loaded(),
+        "startup": startup_stats(),
+        "pool": chat_pool.stats(),
+        "turns": trace_stats(),
+    }
+    if is_loaded():
+        # Already imported by the chat stack; stats never trigger a load.
+        from model.units.cache_unit import answer_cache
+        from model.units.rag_unit import embeddings
+        from model.units.resilience_unit import guard
+        from model.units.runner_unit import backend
+        from model.units.session_store import session_store
+
+        stats["sessions"] = session_store.stats()
+        stats["answer_cache"] = answer_cache.stats()
+        stats["embeddings"] = embeddings.stats()
+        stats["llm"] = {**guard.stats(), **backend.stats()}
+    return jsonify(stats)
+
+
+@chat_bp.route("/cache/invalidate", methods=["POST"])
+def invalidate_answer_cache():
+    if is_loaded():
+        from model.units.cache_unit import answer_cache
+
+        answer_cache.invalidate()
+    return jsonify({"status": "success"})
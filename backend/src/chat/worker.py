@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import ENABLED as METRICS_ENABLED, chat_queue_wait
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.getenv("CHAT_MAX_WORKERS", "4"))
+MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "32"))
+MAX_PENDING_PER_USER = int(os.getenv("CHAT_MAX_PENDING_PER_USER", "4"))
+
+
+class ChatWorkerPool:
+    """Bounded executor for chat turns.
+
+    At most ``max_workers`` turns run at once. Each user has a FIFO queue
+    and only one of their turns runs at a time, so replies come back in the
+    order the messages were sent. ``submit`` returns False instead of
+    queueing when the pool (or the user's queue) is full.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING,
+                 max_pending_per_user=MAX_PENDING_PER_USER):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chat-worker"
+        )
+        self._lock = threading.Lock()
+        self._queues = {}  # user key -> deque of (enqueued_at, fn, args)
+        self._active = set()  # users with a turn currently on the executor
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    def submit(self, user_key, fn, *args) -> bool:
+        with self._lock:
+            queue = self._queues.setdefault(user_key, deque())
+            if (
+                self._pending >= self.max_pending
+                or len(queue) >= self.max_pending_per_user
+            ):
+                self._stats["rejected"] += 1
+                if not queue and user_key not in self._active:
+                    del self._queues[user_key]
+                return False
+
+            queue.append((time.perf_counter(), fn, args))
+            self._pending += 1
+            self._stats["submitted"] += 1
+            if user_key not in self._active:
+                self._start_next(user_key)
+        return True
+
+    def _start_next(self, user_key):
+        # Caller holds self._lock.
+        queue = self._queues.get(user_key)
+        if not queue:
+            self._queues.pop(user_key, None)
+            self._active.discard(user_key)
+            return
+        self._active.add(user_key)
+        enqueued_at, fn, args = queue.popleft()
+        self._executor.submit(self._run, user_key, enqueued_at, fn, args)
+
+    def _run(self, user_key, enqueued_at, fn, args):
+        started = time.perf_counter()
+        wait = started - enqueued_at
+        failed = False
+        # Counted as pending until a worker actually picks it up, so turns
+        # waiting in the executor's own queue show up in queue_depth too.
+        with self._lock:
+            self._pending -= 1
+        if METRICS_ENABLED:
+            chat_queue_wait.observe(wait)
+        try:
+            fn(*args)
+        except Exception:
+            failed = True
+            logger.exception("Chat turn failed for %s", user_key)
+        finally:
+            with self._lock:
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(
+                    self._stats["wait_seconds_max"], wait
+                )
+                self._stats["run_seconds_total"] += time.perf_counter() - started
+                self._start_next(user_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            finished = (self._stats["completed"] + self._stats["failed"]) or 1
+            return {
+                "max_workers": self.max_workers,
+                "active": len(self._active),
+                "queue_depth": self._pending,
+                "queued_users": sum(1 for q in self._queues.values() if q),
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "avg_wait_ms": round(
+                    self._stats["wait_seconds_total"] / finished * 1000, 1
+                ),
+                "max_wait_ms": round(self._stats["wait_seconds_max"] * 1000, 1),
+                "avg_run_ms": round(
+                    self._stats["run_seconds_total"] / finished * 1000, 1
+                ),
+            }
+
+
+chat_pool = ChatWorkerPool()
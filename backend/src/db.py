@@ -0,0 +1,173 @@
+"""Shared SQLite access for the blueprints and the chat session store.
+
+Each thread keeps one open connection to database.db instead of connecting
+on every request. Connections are set up once with WAL journaling (readers
+never block the writer, across threads and across serve.py workers) and the
+pragmas below; sqlite3's per-connection statement cache keeps the compiled
+form of every query a route runs.
+
+    DATABASE_PATH         SQLite file (default backend/database.db)
+    SQLITE_POOL           true (default) | false to connect per request
+    SQLITE_CACHE_KB       page cache per connection (default 8192)
+    SQLITE_MMAP_BYTES     memory-mapped I/O size (default 256 MiB)
+    SQLITE_BUSY_TIMEOUT   seconds to wait for a lock (default 5)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+from flask import jsonify
+
+from metrics import ENABLED as METRICS_ENABLED, registry, sqlite_latency
+
+logger = logging.getLogger(__name__)
+
+# ``or``: an empty DATABASE_PATH= line in .env means the default too.
+DB_PATH = os.getenv("DATABASE_PATH") or os.path.join(os.path.dirname(__file__), "..", "database.db")
+
+POOL_ENABLED = os.getenv("SQLITE_POOL", "true").lower() == "true"
+CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "8192"))
+MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+STATEMENT_CACHE = 256
+
+
+@lru_cache(maxsize=512)
+def statement_type(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ""
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose execute() calls land in sqlite_query_duration_seconds."""
+
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            sqlite_latency.observe(time.perf_counter() - started, statement_type(sql))
+
+    def executemany(self, sql, parameters, /):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            sqlite_latency.observe(time.perf_counter() - started, statement_type(sql))
+
+
+class ConnectionPool:
+    """One SQLite connection per thread, configured once when it is opened."""
+
+    def __init__(self, path=DB_PATH, pooled=POOL_ENABLED, create=False):
+        self.path = path
+        self.pooled = pooled
+        self.create = create
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checked = False
+        self._stats = {"opened": 0, "reused": 0}
+
+    def _open(self) -> sqlite3.Connection:
+        if not self._checked and not self.create:
+            # Only checked until the first successful open, not per request.
+            if not os.path.exists(self.path):
+                logger.error("Database file not found: %s", self.path)
+                raise FileNotFoundError(f"Database file not found: {self.path}")
+            self._checked = True
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT,
+            cached_statements=STATEMENT_CACHE,
+            factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        # NORMAL is durable across application crashes in WAL mode; only an
+        # OS crash or power loss can drop the last commits.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = {-CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        with self._lock:
+            self._stats["opened"] += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        if not self.pooled:
+            return self._open()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        else:
+            with self._lock:
+                self._stats["reused"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        if not self.pooled:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """This thread's connection; commits on success, rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pooled": self.pooled, **self._stats}
+
+
+pool = ConnectionPool()
+
+registry.register_collector(
+    "sqlite_connections_total", "counter", "Connections opened and reused from the pool.",
+    lambda: {k: v for k, v in pool.stats().items() if k != "pooled"}, label="event",
+)
+
+
+@contextmanager
+def get_db_connection():
+    """Context manager for database connections with automatic cleanup"""
+    try:
+        with pool.connection() as conn:
+            yield conn
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        raise
+
+
+def handle_database_errors(f):
+    """Decorator to handle database errors gracefully"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        except FileNotFoundError as e:
+            logger.error("Database file error: %s", e)
+            return jsonify({"error": "Database unavailable"}), 503
+        except sqlite3.Error as e:
+            logger.error("Database error: %s", e)
+            return jsonify({"error": "Database error occurred"}), 500
+        except Exception as e:
+            logger.error("Unexpected error in %s: %s", f.__name__, e)
+            return jsonify({"error": "Internal server error"}), 500
+
+    return decorated_function
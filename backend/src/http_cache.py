@@ -0,0 +1,230 @@
+"""Response caching and conditional GETs for the read-heavy routes.
+
+``@cached("products")`` keeps the serialized body of successful responses
+in an in-process LRU keyed by path and query string, and answers repeat
+requests from it until the TTL runs out or the tag is invalidated. Every
+response carries a strong ETag (a hash of the body) and Last-Modified, so
+a client that sends If-None-Match / If-Modified-Since gets an empty 304
+when nothing changed, whether or not the body came from the cache.
+
+Writers call ``invalidate("products")``. That clears this process's
+entries for the tag and touches its stamp (cache_stamps.py), which the
+other serve.py workers notice within STAMP_CHECK_INTERVAL seconds; scripts
+that write the database touch the stamp directly.
+
+    HTTP_CACHE              true (default) | false to disable the body cache
+    HTTP_CACHE_TTL          seconds a cached body is served (default 30)
+    HTTP_CACHE_MAX_ENTRIES  LRU size (default 1024)
+    HTTP_CACHE_MAX_AGE      max-age sent to clients (default 0: always revalidate)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional
+
+from flask import Response, make_response, request
+from werkzeug.http import http_date, parse_date
+
+from cache_stamps import STAMP_DIR, read_stamp, touch
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("HTTP_CACHE", "true").lower() == "true"
+TTL = float(os.getenv("HTTP_CACHE_TTL", "30"))
+MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "1024"))
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+
+STAMP_CHECK_INTERVAL = 2.0
+
+
+@dataclass
+class Entry:
+    body: bytes
+    mimetype: str
+    etag: str
+    last_modified: float
+    created: float
+    tag: str
+
+
+def make_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """LRU of serialized response bodies, cleared per tag."""
+
+    def __init__(self, ttl=TTL, max_entries=MAX_ENTRIES, enabled=ENABLED, stamp_dir=STAMP_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.stamp_dir = stamp_dir
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        # Last ETag seen per key, so Last-Modified survives expiry of an
+        # unchanged body.
+        self._versions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stamps = {}
+        self._stamps_checked = 0.0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0,
+                       "not_modified": 0}
+
+    def _drop_tag(self, tag: str):
+        # Caller holds self._lock.
+        for key in [k for k, e in self._entries.items() if e.tag == tag]:
+            del self._entries[key]
+        self._stats["invalidations"] += 1
+
+    def _check_stamps(self, now: float):
+        # Caller holds self._lock.
+        if now - self._stamps_checked < STAMP_CHECK_INTERVAL:
+            return
+        self._stamps_checked = now
+        for tag, seen in list(self._stamps.items()):
+            stamp = read_stamp(tag, self.stamp_dir)
+            if stamp != seen:
+                self._stamps[tag] = stamp
+                self._drop_tag(tag)
+                logger.info("HTTP cache cleared for %s: written by another process", tag)
+
+    def watch(self, tag: str):
+        with self._lock:
+            if tag not in self._stamps:
+                self._stamps[tag] = read_stamp(tag, self.stamp_dir)
+
+    def get(self, key: str) -> Optional[Entry]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamps(now)
+            entry = self._entries.get(key)
+            if entry is None or now - entry.created > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, tag: str, body: bytes, mimetype: str) -> Entry:
+        etag = make_etag(body)
+        now = time.monotonic()
+        with self._lock:
+            previous = self._versions.get(key)
+            last_modified = previous[1] if previous and previous[0] == etag else time.time()
+            self._versions[key] = (etag, last_modified)
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.max_entries * 4:
+                self._versions.popitem(last=False)
+
+            entry = Entry(body, mimetype, etag, last_modified, now, tag)
+            if self.enabled:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._stats["stores"] += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+            return entry
+
+    def invalidate(self, tag: str):
+        """Drop ``tag`` here and, through its stamp file, in every other worker."""
+        with self._lock:
+            self._drop_tag(tag)
+            touch(tag, self.stamp_dir)
+            self._stamps[tag] = read_stamp(tag, self.stamp_dir)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._entries), **self._stats}
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+
+cache = ResponseCache()
+
+registry.register_collector(
+    "http_cache_events_total", "counter", "Response cache hits, misses, 304s and evictions.",
+    lambda: {k: v for k, v in cache.stats().items() if k not in ("enabled", "entries")},
+    label="event",
+)
+registry.register_collector(
+    "http_cache_entries", "gauge", "Response bodies held in the cache.",
+    lambda: cache.stats()["entries"],
+)
+
+
+def invalidate(tag: str):
+    cache.invalidate(tag)
+
+
+def not_modified(entry: Entry) -> bool:
+    """True if the request's validators match ``entry`` (If-None-Match wins)."""
+    if_none_match = request.if_none_match
+    if if_none_match:
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match.
+        return if_none_match.contains_weak(entry.etag)
+    since = request.headers.get("If-Modified-Since")
+    if since:
+        since_date = parse_date(since)
+        # HTTP dates have one-second resolution.
+        return since_date is not None and int(entry.last_modified) <= since_date.timestamp()
+    return False
+
+
+def conditional_response(entry: Entry, private: bool) -> Response:
+    if not_modified(entry):
+        cache.count_not_modified()
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers["Last-Modified"] = http_date(entry.last_modified)
+    scope = "private" if private else "public"
+    response.headers["Cache-Control"] = (
+        f"{scope}, max-age={MAX_AGE}" if MAX_AGE else f"{scope}, no-cache"
+    )
+    return response
+
+
+def cached(tag: str, private: bool = False):
+    """Cache successful GET responses of a view under ``tag``.
+
+    ``private`` marks per-user responses so shared proxies do not store them.
+    """
+
+    def decorator(view):
+        cache.watch(tag)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+            key = request.full_path
+            entry = cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entry = cache.put(key, tag, response.get_data(), response.mimetype)
+            return conditional_response(entry, private)
+
+        return wrapper
+
+    return decorator
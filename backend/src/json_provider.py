@@ -0,0 +1,85 @@
+"""orjson for every JSON body the server writes.
+
+``OrjsonProvider`` replaces Flask's stdlib provider, so ``jsonify`` in the
+blueprints serializes with orjson and writes the bytes straight into the
+response. ``SocketIOJson`` does the same for Socket.IO packets.
+
+List endpoints can skip Python dicts entirely: select
+``json_object_sql(columns)`` and SQLite builds each row's JSON object,
+which ``row_objects`` embeds as-is with ``orjson.Fragment``.
+"""
+
+import sqlite3
+from decimal import Decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def default(obj):
+    """Types orjson does not know natively."""
+    if isinstance(obj, sqlite3.Row):
+        return dict(zip(obj.keys(), obj))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj, sort_keys=False, indent=False) -> bytes:
+    options = OPTIONS
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=default, option=options)
+
+
+def json_object_sql(columns, table="") -> str:
+    """``json_object('id', id, ...)`` selecting ``columns`` (optionally table-qualified)."""
+    prefix = f"{table}." if table else ""
+    return "json_object(" + ", ".join(f"'{c}', {prefix}{c}" for c in columns) + ")"
+
+
+def row_objects(rows, key=0):
+    """Wrap the JSON text SQLite built for each row so orjson copies it verbatim."""
+    return [orjson.Fragment(row[key]) for row in rows]
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keys keep insertion order (Flask's default provider sorts them); set
+    ``app.json.sort_keys = True`` to sort.
+    """
+
+    sort_keys = False
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys)).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=self._app.debug)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class SocketIOJson:
+    """``json`` module for python-socketio: str in, str out, like the stdlib."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        return dumps_bytes(obj).decode()
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
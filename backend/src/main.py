@@ -1,10 +1,20 @@
+import os
 import socket
 from flask import Flask
-from marketplace.route import products_bp
-from home.route import home_bp
-from chat.route import chat_bp, socketio
-from users.route import user_bp
-from videos.route import videos_bp
+from werkzeug.middleware.proxy_fix import ProxyFix
+import metrics
+from json_provider import OrjsonProvider
+from model.loader import start_warmup
+from model.units.trace import startup_phase, startup_stats
+
+# The chat stack (LLM client, embeddings, Qdrant) is not imported here; it
+# loads on the first chat turn or on the warm-up thread started below.
+with startup_phase("routes"):
+    from marketplace.route import prepare_indexes, products_bp
+    from home.route import home_bp
+    from chat.route import chat_bp, socketio
+    from users.route import user_bp
+    from videos.route import videos_bp
 
 
 # Helper to get LAN IP
@@ -21,22 +31,46 @@ def get_local_ip():
     return ip
 
 
-localIP = get_local_ip()
-port = 5000
+host = os.getenv("HOST", "0.0.0.0")
+port = int(os.getenv("PORT", "5000"))
+# Number of proxies in front of the app (serve.py sets 1 behind nginx);
+# their X-Forwarded-* headers are trusted so remote_addr is the client.
+proxy_hops = int(os.getenv("PROXY_HOPS", "0"))
+
+with startup_phase("app"):
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    metrics.init_app(app)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops, x_host=proxy_hops)
+    app.register_blueprint(products_bp, url_prefix="/products")
+    app.register_blueprint(chat_bp, url_prefix="/chat")
+    app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(videos_bp, url_prefix="/videos")
+    app.register_blueprint(home_bp, url_prefix="/")
 
-app = Flask(__name__)
-app.register_blueprint(products_bp, url_prefix="/products")
-app.register_blueprint(chat_bp, url_prefix="/chat")
-app.register_blueprint(user_bp, url_prefix="/user")
-app.register_blueprint(videos_bp, url_prefix="/videos")
-app.register_blueprint(home_bp, url_prefix="/")
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        transports=["polling", "websocket"],  # type: ignore
+        # Set when running several workers (see serve.py) so an emit from
+        # any process reaches sockets connected to the others.
+        message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE") or None,
+    )
 
-socketio.init_app(
-    app,
-    cors_allowed_origins="*",
-    transports=["polling", "websocket"],  # type: ignore
+metrics.registry.register_collector(
+    "startup_phase_seconds", "gauge", "Duration of each startup phase.",
+    lambda: {name: ms / 1000 for name, ms in startup_stats().items()}, label="phase",
 )
 
+with startup_phase("product_indexes"):
+    prepare_indexes()
+
+start_warmup()
+
 if __name__ == "__main__":
+    localIP = get_local_ip()
+    phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup_stats().items())
+    print(f"Startup: {phases} (chat stack loading in background)")
     print(f"Starting server at http://{localIP}:{port}")
-    socketio.run(app, host="0.0.0.0", port=port,debug=False)
+    socketio.run(app, host=host, port=port,debug=False)
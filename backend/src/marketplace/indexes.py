@@ -0,0 +1,104 @@
+"""SQLite indexes behind the product routes.
+
+Two kinds, both built off the request path: add_products.py and
+reindex_products.py build them when the catalogue is written, and every
+server checks them once at startup (``prepare_indexes`` in route.py).
+
+  * (sort column, id) B-tree indexes serve the listing's ORDER BY and its
+    keyset seek.
+  * ``products_fts`` is an external-content FTS5 table over name and
+    description: it stores only the inverted index and reads the text back
+    from ``products``. Triggers keep it in sync on every insert, update and
+    delete. Prefix indexes make ``tom*`` cheap.
+
+No Flask here, so the scripts can import it.
+"""
+
+SORT_COLUMNS = ["price", "rating", "sold"]
+
+LISTING_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products ({column}, id)"
+    for column in SORT_COLUMNS
+]
+
+SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # Term list of the index, used for typo correction.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab USING fts5vocab(products_fts, 'row')",
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+# Matches in the name count ten times as much as in the description.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def products_exist(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'"
+    ).fetchone() is not None
+
+
+def index_exists(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+    ).fetchone() is not None
+
+
+def create_index(conn):
+    """Create the FTS table and triggers; fill the index if it is new."""
+    new = not index_exists(conn)
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    # ORDER BY rank then means this weighting; stored with the index.
+    conn.execute(
+        "INSERT INTO products_fts (products_fts, rank) VALUES ('rank', ?)",
+        (f"bm25({NAME_WEIGHT}, {DESCRIPTION_WEIGHT})",),
+    )
+    if new:
+        rebuild(conn)
+    conn.commit()
+
+
+def rebuild(conn):
+    """Re-read every product into the index and merge its segments."""
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('optimize')")
+    conn.commit()
+
+
+def create_indexes(conn):
+    """Listing and search indexes; only the missing ones cost anything."""
+    if conn.in_transaction:
+        conn.commit()
+    # Taken up front so that workers starting together build them once.
+    conn.execute("BEGIN IMMEDIATE")
+    for statement in LISTING_INDEXES:
+        conn.execute(statement)
+    create_index(conn)
@@ -1,36 +1,218 @@
-from flask import Blueprint, jsonify, request
-import sqlite3
+import base64
+import json
+import logging
+import math
 import os
+import sqlite3
+
+from flask import Blueprint, jsonify, request
+from db import get_db_connection, handle_database_errors
+from http_cache import cached
+from json_provider import json_object_sql, row_objects
+from . import search as product_search
+from .indexes import SORT_COLUMNS, create_indexes, products_exist
+
+logger = logging.getLogger(__name__)
 
 products_bp = Blueprint("products", __name__)
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database.db")
+PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("PRODUCTS_MAX_PAGE_SIZE", "200"))
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+COLUMNS = ["id", "name", "price", "description", "image_url", "rating", "reviews", "sold"]
+# query parameter -> (column, operator)
+RANGE_FILTERS = {
+    "min_price": ("price", ">="),
+    "max_price": ("price", "<="),
+    "min_rating": ("rating", ">="),
+    "max_rating": ("rating", "<="),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def prepare_indexes():
+    """Build missing product indexes and load the typo vocabulary.
+
+    Runs once when the server starts, so no request pays for either.
+    """
+    try:
+        with get_db_connection() as conn:
+            if not products_exist(conn):
+                logger.warning("No products table yet; run add_products.py")
+                return
+            create_indexes(conn)
+            product_search.vocabulary.load(conn)
+    except (OSError, sqlite3.Error) as e:
+        logger.error("Could not prepare product indexes: %s", e)
+
+
+def encode_cursor(row, sort_column):
+    key = [row[sort_column], row["id"]] if sort_column != "id" else [row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def is_sql_number(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -(2**63) <= value < 2**63
+    return isinstance(value, float) and math.isfinite(value)
+
 
+def decode_cursor(cursor, sort_column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise BadRequest("Invalid cursor")
+    if not isinstance(key, list) or len(key) != (1 if sort_column == "id" else 2):
+        raise BadRequest("Cursor does not match sort order")
+    # The values are bound as SQL parameters: plain numbers only, that
+    # SQLite can hold, and an integer id last.
+    if not all(is_sql_number(v) for v in key) or not isinstance(key[-1], int):
+        raise BadRequest("Invalid cursor")
+    return key
 
-# establish connection
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
+def parse_fields(args):
+    if not args.get("fields"):
+        return COLUMNS
+    fields = [f.strip() for f in args["fields"].split(",") if f.strip()]
+    unknown = set(fields) - set(COLUMNS)
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
 
-# GET all products
+
+def parse_listing(args):
+    """Validate query parameters into (sql, params, limit, sort_column, fields)."""
+    try:
+        limit = int(args.get("limit", PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    sort = args.get("sort", "id")
+    descending = sort.startswith("-")
+    sort_column = sort.lstrip("-")
+    if sort_column not in SORT_COLUMNS + ["id"]:
+        raise BadRequest(f"sort must be one of: id, {', '.join(SORT_COLUMNS)} (prefix - for descending)")
+
+    fields = parse_fields(args)
+    # SQLite builds each item's JSON; the cursor needs id and the sort column
+    # even when they are not returned.
+    selected = [f"{json_object_sql(fields)} AS item"] + list(dict.fromkeys(["id", sort_column]))
+
+    where, params = [], []
+    for name, (column, operator) in RANGE_FILTERS.items():
+        if name in args:
+            try:
+                value = float(args[name])
+            except ValueError:
+                raise BadRequest(f"{name} must be a number")
+            # float() accepts "nan" and "inf"; nan compares false to every row.
+            if not math.isfinite(value):
+                raise BadRequest(f"{name} must be a finite number")
+            params.append(value)
+            where.append(f"{column} {operator} ?")
+
+    if args.get("cursor"):
+        key = decode_cursor(args["cursor"], sort_column)
+        seek = "<" if descending else ">"
+        if sort_column == "id":
+            where.append(f"id {seek} ?")
+        else:
+            where.append(f"({sort_column}, id) {seek} (?, ?)")
+        params.extend(key)
+
+    direction = "DESC" if descending else "ASC"
+    order = f"id {direction}" if sort_column == "id" else f"{sort_column} {direction}, id {direction}"
+    sql = f"SELECT {', '.join(selected)} FROM products"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # One extra row tells us whether there is a next page.
+    sql += f" ORDER BY {order} LIMIT ?"
+    params.append(limit + 1)
+    return sql, params, limit, sort_column, fields
+
+
+# GET a page of products
 @products_bp.route("/", methods=["GET"])
+@cached("products")
+@handle_database_errors
 def get_products():
-    conn = get_db_connection()
-    products = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
-    return jsonify([dict(product) for product in products])
+    """Keyset-paginated listing.
+
+    Query parameters: limit, cursor (from the previous page's next_cursor),
+    sort (id, price, rating, sold; prefix "-" for descending), fields
+    (comma-separated projection) and min/max_price, min/max_rating.
+    """
+    try:
+        sql, params, limit, sort_column, fields = parse_listing(request.args)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    with get_db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1], sort_column) if len(rows) > limit else None
+    return jsonify(
+        {
+            "items": row_objects(rows[:limit], "item"),
+            "next_cursor": next_cursor,
+            "limit": limit,
+        }
+    )
+
+
+# GET full-text search
+@products_bp.route("/search", methods=["GET"])
+@cached("products")
+@handle_database_errors
+def search_products():
+    """BM25-ranked matches for ``q`` in name and description.
+
+    Words match as prefixes; if nothing matches, unknown words are replaced
+    by the closest indexed terms and ``corrected`` says what was searched.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        fields = parse_fields(request.args)
+        limit = int(request.args.get("limit", SEARCH_LIMIT))
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    with get_db_connection() as conn:
+        rows, corrected = product_search.search(conn, query, fields, limit)
+
+    return jsonify(
+        {
+            "items": row_objects(rows),
+            "query": query,
+            "corrected": corrected,
+        }
+    )
 
 
 # GET product by id
 @products_bp.route("/<int:product_id>", methods=["GET"])
+@cached("products")
+@handle_database_errors
 def get_product(product_id):
-    conn = get_db_connection()
-    product = conn.execute(
-        "SELECT * FROM products WHERE id = ?", (product_id,)
-    ).fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        product = conn.execute(
+            "SELECT * FROM products WHERE id = ?", (product_id,)
+        ).fetchone()
     if product:
-        return jsonify(dict(product))
+        return jsonify(product)
     return jsonify({"error": "Product not found"}), 404
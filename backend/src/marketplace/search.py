@@ -0,0 +1,240 @@
+"""Full-text product search on the FTS5 index built in indexes.py.
+
+FTS5 finds the newest ``CANDIDATES`` matches and only those are ranked, by
+BM25 computed here with name matches weighted above the description. Query
+words match as prefixes, and words that match nothing are swapped for the
+closest indexed terms, which catches typos like "tomatoe" or "fertilzer".
+
+Two FTS5 costs grow with the catalogue, so neither is used:
+
+  * ``ORDER BY rank`` computes BM25's document frequencies by reading each
+    term's whole posting list, about 8 ms per common word at 1M rows even
+    when only a few hundred rows are ranked. The frequencies come from the
+    cached vocabulary instead.
+  * A quoted prefix like ``"toma"*`` longer than the prefix indexes merges
+    the posting lists of every matching term before returning a row. Such
+    words are expanded to the indexed terms they prefix, which FTS5 reads
+    lazily.
+"""
+
+import difflib
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from json_provider import json_object_sql
+from marketplace.indexes import DESCRIPTION_WEIGHT, NAME_WEIGHT
+
+MAX_TERMS = 8
+# Only the newest matches are ranked; an older, better match past them is
+# not found. Bounds the work of broad queries on a large catalogue.
+CANDIDATES = int(os.getenv("PRODUCT_SEARCH_CANDIDATES", "200"))
+# Longer prefixes fall back to a quoted prefix query.
+MAX_EXPANSIONS = 16
+# Words this short are served by the index's own prefix='2 3' indexes.
+INDEXED_PREFIX = 3
+TYPO_CUTOFF = 0.75
+TYPO_SUGGESTIONS = 3
+VOCABULARY_TTL = 300.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(text: str):
+    """Tokens of ``text`` as the unicode61 tokenizer indexes them."""
+    text = (text or "").lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return TOKEN.findall(text)
+
+
+def tokenize(query: str):
+    return fold(query)[:MAX_TERMS]
+
+
+class Word:
+    """One query word: the exact terms it stands for, or a prefix."""
+
+    def __init__(self, terms=(), prefix=None):
+        self.terms = frozenset(terms)
+        self.prefix = prefix
+
+    def count(self, tokens) -> int:
+        if self.prefix is None:
+            return sum(map(self.terms.__contains__, tokens))
+        return sum(token.startswith(self.prefix) for token in tokens)
+
+    def expression(self) -> str:
+        if self.prefix is not None:
+            return f'"{self.prefix}"*'
+        return "(" + " OR ".join(f'"{t}"' for t in sorted(self.terms)) + ")"
+
+
+def match_expression(words) -> str:
+    # Explicit AND: FTS5 rejects an implicit one after a parenthesized group.
+    return " AND ".join(word.expression() for word in words)
+
+
+class Vocabulary:
+    """Indexed terms with their document counts, bucketed by first letter.
+
+    Loaded when the server starts (``prepare_indexes``) and refreshed every
+    few minutes to pick up products written by other processes. A refresh
+    runs on one request while the others keep using the previous terms.
+    """
+
+    def __init__(self, ttl=VOCABULARY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._docs = {}
+        self._products = 0
+        self._loaded_at = 0.0
+
+    def load(self, conn):
+        buckets, docs = defaultdict(list), {}
+        # fts5vocab returns terms in order, so every bucket is sorted.
+        for term, doc in conn.execute("SELECT term, doc FROM products_fts_vocab"):
+            buckets[term[:1]].append(term)
+            docs[term] = doc
+        self._products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        self._buckets, self._docs = buckets, docs
+        self._loaded_at = time.monotonic()
+
+    def buckets(self, conn):
+        if not self._loaded_at:
+            # Not preloaded (scripts, benchmarks): load once, others wait.
+            with self._lock:
+                if not self._loaded_at:
+                    self.load(conn)
+        elif time.monotonic() - self._loaded_at > self.ttl and self._lock.acquire(blocking=False):
+            try:
+                self.load(conn)
+            finally:
+                self._lock.release()
+        return self._buckets
+
+    def expand(self, conn, term: str, limit=MAX_EXPANSIONS):
+        """Up to ``limit + 1`` indexed terms starting with ``term``."""
+        bucket = self.buckets(conn).get(term[:1], ())
+        found = []
+        for t in bucket[bisect_left(bucket, term):]:
+            if not t.startswith(term) or len(found) > limit:
+                break
+            found.append(t)
+        return found
+
+    def has_prefix(self, conn, term: str) -> bool:
+        return bool(self.expand(conn, term, limit=0))
+
+    def closest(self, conn, term: str):
+        candidates = [
+            t for t in self.buckets(conn).get(term[:1], ())
+            if abs(len(t) - len(term)) <= 2
+        ]
+        return difflib.get_close_matches(
+            term, candidates, n=TYPO_SUGGESTIONS, cutoff=TYPO_CUTOFF
+        )
+
+    def documents(self, word: Word) -> int:
+        if word.prefix is None:
+            return sum(self._docs.get(t, 0) for t in word.terms)
+        bucket = self._buckets.get(word.prefix[:1], ())
+        docs = 0
+        for t in bucket[bisect_left(bucket, word.prefix):]:
+            if not t.startswith(word.prefix):
+                break
+            docs += self._docs[t]
+        return docs
+
+    def idf(self, word: Word) -> float:
+        """BM25's inverse document frequency, floored like FTS5's."""
+        total = max(self._products, 1)
+        docs = min(self.documents(word) or 1, total)
+        return max(math.log((total - docs + 0.5) / (docs + 0.5)), 1e-6)
+
+
+vocabulary = Vocabulary()
+
+
+def compile_word(conn, term: str) -> Word:
+    if len(term) > INDEXED_PREFIX:
+        terms = vocabulary.expand(conn, term, MAX_EXPANSIONS)
+        # Unknown terms may be newer than the vocabulary: FTS5 decides.
+        if 0 < len(terms) <= MAX_EXPANSIONS:
+            return Word(terms)
+    return Word(prefix=term)
+
+
+def rank(candidates, words, limit):
+    """The best ``limit`` candidates by BM25 over name and description.
+
+    Each candidate is (json, name, description); newer rows win ties.
+    """
+    idf = [vocabulary.idf(word) for word in words]
+    columns = [[fold(name), fold(description)] for _, name, description in candidates]
+    average = [
+        sum(len(c[i]) for c in columns) / max(len(columns), 1) or 1.0 for i in (0, 1)
+    ]
+    weights = (NAME_WEIGHT, DESCRIPTION_WEIGHT)
+    scores = []
+    for position, tokens in enumerate(columns):
+        score = 0.0
+        for word, word_idf in zip(words, idf):
+            for i, column in enumerate(tokens):
+                tf = word.count(column)
+                if tf:
+                    norm = 1 - BM25_B + BM25_B * len(column) / average[i]
+                    score += weights[i] * word_idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        scores.append((-score, position))
+    scores.sort()
+    return [(candidates[position][0],) for _, position in scores[:limit]]
+
+
+def search(conn, query: str, columns, limit: int):
+    """BM25-ranked products for ``query``; returns (rows, corrected query or None).
+
+    Each row holds one column: the product's ``columns`` as JSON text.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return [], None
+
+    # Newest first: FTS5 walks its posting lists backwards and stops after
+    # CANDIDATES rows, however many products match.
+    sql = (
+        f"SELECT {json_object_sql(columns, 'p')}, p.name, p.description FROM ("
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH ? "
+        "ORDER BY rowid DESC LIMIT ?"
+        ") f JOIN products p ON p.id = f.rowid"
+    )
+    words = [compile_word(conn, term) for term in terms]
+    candidates = conn.execute(sql, (match_expression(words), CANDIDATES)).fetchall()
+    if candidates:
+        return rank(candidates, words, limit), None
+
+    # Nothing matched. Every term is required, so any hit means every word
+    # is (a prefix of) an indexed term and there is nothing to correct;
+    # without hits, replace unknown words with their closest indexed terms.
+    corrected, suggestion = [], []
+    for term, word in zip(terms, words):
+        if vocabulary.has_prefix(conn, term):
+            corrected.append(word)
+            suggestion.append(term)
+            continue
+        suggestions = vocabulary.closest(conn, term)
+        if not suggestions:
+            return [], None
+        corrected.append(Word(suggestions))
+        suggestion.append(suggestions[0])
+    if suggestion == terms:
+        return [], None
+    candidates = conn.execute(sql, (match_expression(corrected), CANDIDATES)).fetchall()
+    return rank(candidates, corrected, limit), " ".join(suggestion)
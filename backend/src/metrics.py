@@ -0,0 +1,264 @@
+"""Process-wide counters and latency histograms, exported at GET /metrics.
+
+``init_app(app)`` times every HTTP request (labelled by method, URL rule
+and status) and adds the /metrics route in the Prometheus text format.
+The other layers record into the module-level metrics below:
+
+    socketio_handler_duration_seconds   @timed_handler on Socket.IO events
+    chat_stage_duration_seconds         condense / embed / retrieve / llm,
+                                        from model.units.trace.record_call
+    chat_turn_duration_seconds          whole turns, and time to first token
+    chat_queue_wait_seconds             time a turn waited for a chat worker
+    sqlite_query_duration_seconds       every Connection.execute in db.py
+
+The embedding batcher (embed_batch_size, embed_batch_seconds,
+embed_query_seconds) and the local LLM's slot scheduler (llm_batch_size,
+llm_slot_wait_seconds) own their histograms; the modules that create the
+process-wide instances export them with ``registry.register``.
+
+Point-in-time numbers that already live elsewhere (response cache,
+connection pool, chat pool, startup phases) are read on each scrape
+through ``register_collector``.
+
+    METRICS_ENABLED   true (default) | false to skip all instrumentation
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, request
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; wide enough for both SQLite lookups and LLM calls.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(zip(self.labelnames, labels))} {_number(value)}"
+
+
+class Histogram:
+    """Labelled Prometheus histogram; one bucket array per label set."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts..., +Inf count], sum
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, *labels) -> dict:
+        """Count, sum, average and cumulative buckets of one series, for stats()."""
+        with self._lock:
+            counts, total = self._series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            count = sum(counts)
+            cumulative = 0
+            buckets = {}
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "avg": round(total / count, 6) if count else 0.0,
+            "buckets": buckets,
+        }
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_sum{_labels(pairs)} {total!r}"
+            yield f"{self.name}_count{_labels(pairs)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        """Export a metric created elsewhere, e.g. one owned by a long-lived object."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name, kind, documentation, collect, label="name"):
+        """Read a value on every scrape.
+
+        ``collect()`` returns a number, or a dict of numbers that becomes one
+        sample per key under ``label``.
+        """
+        self._collectors.append((name, kind, documentation, collect, label))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, documentation, collect, label in self._collectors:
+            try:
+                value = collect()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", name, e)
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(value, dict):
+                for key, number in value.items():
+                    lines.append(f"{name}{_labels([(label, key)])} {_number(number)}")
+            else:
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"]
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time to build the HTTP response.", ["method", "route"]
+)
+socketio_events = registry.counter(
+    "socketio_events_total", "Socket.IO events handled.", ["namespace", "event", "outcome"]
+)
+socketio_latency = registry.histogram(
+    "socketio_handler_duration_seconds", "Time spent in Socket.IO handlers.", ["namespace", "event"]
+)
+chat_stage_latency = registry.histogram(
+    "chat_stage_duration_seconds", "Chat pipeline stages: condense, embed, retrieve, llm.", ["stage"]
+)
+chat_turn_latency = registry.histogram(
+    "chat_turn_duration_seconds", "Whole chat turns, from question to last token.", ["mode"]
+)
+chat_ttft = registry.histogram(
+    "chat_time_to_first_token_seconds", "Time to the first streamed token of a turn."
+)
+chat_queue_wait = registry.histogram(
+    "chat_queue_wait_seconds", "Time a chat turn waited for a free worker."
+)
+sqlite_latency = registry.histogram(
+    "sqlite_query_duration_seconds",
+    "SQLite execute() time by statement type (for SELECT, up to the first row).",
+    ["operation"],
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    if ENABLED:
+        chat_stage_latency.observe(seconds, stage)
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        http_latency.observe(time.perf_counter() - started, request.method, route)
+        http_requests.inc(request.method, route, str(response.status_code))
+    return response
+
+
+def metrics_endpoint():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    """Time every request on ``app`` and serve GET /metrics."""
+    if not ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint)
+
+
+def timed_handler(namespace: str, event: str):
+    """Time a Socket.IO handler; goes under ``@socketio.on``."""
+
+    def decorator(handler):
+        if not ENABLED:
+            return handler
+
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                socketio_latency.observe(time.perf_counter() - started, namespace, event)
+                socketio_events.inc(namespace, event, outcome)
+
+        return wrapper
+
+    return decorator
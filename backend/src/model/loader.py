@@ -0,0 +1,56 @@
+"""Loads the chat stack on first use instead of at server import.
+
+Importing ``model.model`` builds the LLM client, loads the embedding model
+and connects to Qdrant, which takes seconds. Routes that do not chat never
+pay for it; the first chat turn (or the warm-up thread) loads it once,
+under a lock, and every later call gets the same module back.
+"""
+
+import logging
+import os
+import threading
+
+from .units.trace import startup_phase
+
+logger = logging.getLogger(__name__)
+
+# Start loading in the background as soon as the server is up, so the
+# first chat turn usually finds everything ready.
+WARMUP = os.getenv("CHAT_WARMUP", "true").lower() == "true"
+
+_lock = threading.Lock()
+_stack = None
+
+
+def chat_stack():
+    """The ``model.model`` module, imported on first call."""
+    global _stack
+    if _stack is not None:
+        return _stack
+    with _lock:
+        if _stack is None:
+            with startup_phase("chat_stack"):
+                from . import model as stack
+            _stack = stack
+    return _stack
+
+
+def is_loaded() -> bool:
+    return _stack is not None
+
+
+def _warm_up():
+    try:
+        chat_stack()
+    except Exception as e:
+        # The first chat turn retries and reports the error to its caller.
+        logger.error("Chat warm-up failed: %s", e)
+
+
+def start_warmup():
+    """Load the chat stack on a daemon thread when CHAT_WARMUP is on."""
+    if not WARMUP or is_loaded():
+        return None
+    thread = threading.Thread(target=_warm_up, name="chat-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -1,19 +1,57 @@
+import logging
+
 from .units.memory_unit import with_history
 from dotenv import load_dotenv
 from .units.general import generate_answer_without_rag
+from .units.resilience_unit import FALLBACK_MESSAGE, LLMUnavailable
+from .units.trace import trace_turn
 
 
 load_dotenv(dotenv_path="./src/.env")
 
+logger = logging.getLogger(__name__)
+
+
+def fallback_answer(user_input: str, error: Exception) -> str:
+    """Canned reply when the LLM is down; a plain LLM answer when only RAG failed."""
+    if isinstance(error, LLMUnavailable):
+        logger.warning("Answering with the fallback message: %s", error)
+        return FALLBACK_MESSAGE
+    logger.exception("RAG turn failed, answering without retrieval")
+    return generate_answer_without_rag(user_input)
+
+
 # wrapper function
 def model(user_input: str, session_id: str = "default") -> str:
-    result = with_history.invoke(
-        {"input": user_input},
-        config={"configurable": {"session_id": session_id}},
-    )
+    with trace_turn(session_id):
+        try:
+            result = with_history.invoke(
+                {"input": user_input},
+                config={"configurable": {"session_id": session_id}},
+            )
+        except Exception as e:
+            result = fallback_answer(user_input, e)
     return result
 
 
+def stream_model(user_input: str, session_id: str = "default"):
+    """Same turn as ``model`` but yields the answer as it is generated."""
+    with trace_turn(session_id, mode="stream"):
+        answered = False
+        try:
+            for chunk in with_history.stream(
+                {"input": user_input},
+                config={"configurable": {"session_id": session_id}},
+            ):
+                answered = True
+                yield chunk
+        except Exception as e:
+            # Half an answer is already on the client; let the route close it.
+            if answered:
+                raise
+            yield fallback_answer(user_input, e)
+
+
 # def model(user_input: str, session_id: str = "default") -> str:
 
 #     generate_answer_without_rag(user_input)
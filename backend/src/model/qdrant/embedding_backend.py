@@ -0,0 +1,121 @@
+"""Embedding model selection shared by processor.py and the chat server.
+
+Both sides must embed with the same model or the vectors in Qdrant are
+meaningless, so the choice lives here and is read from the environment:
+
+    EMBEDDING_BACKEND   torch (default) | onnx
+    EMBEDDING_MODEL     BAAI/bge-large-en (default), BAAI/bge-base-en, BAAI/bge-small-en, ...
+    EMBEDDING_ONNX_QUANTIZE   int8 (default) | none
+    EMBEDDING_ONNX_DIR  where exported ONNX models are kept
+    RETRIEVAL_MODE      dense (default) | hybrid
+    SPARSE_MODEL        Qdrant/bm25 (default), any fastembed sparse model
+
+The ONNX backend needs ``optimum[onnxruntime]`` and hybrid retrieval needs
+``fastembed``; both are imported lazily so the default path needs neither.
+"""
+
+import os
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en")
+ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "int8").lower()
+ONNX_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR", os.path.join(os.path.dirname(__file__), "onnx_models")
+)
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+SPARSE_MODEL = os.getenv("SPARSE_MODEL", "Qdrant/bm25")
+# langchain_qdrant's default name, so QdrantVectorStore finds it unconfigured.
+SPARSE_VECTOR_NAME = "langchain-sparse"
+
+# avx2 kernels run on practically every x86 server CPU we deploy to.
+ONNX_QUANTIZATION_CONFIG = "avx2"
+
+MODEL_DIMENSIONS = {
+    "BAAI/bge-large-en": 1024,
+    "BAAI/bge-large-en-v1.5": 1024,
+    "BAAI/bge-base-en": 768,
+    "BAAI/bge-base-en-v1.5": 768,
+    "BAAI/bge-small-en": 384,
+    "BAAI/bge-small-en-v1.5": 384,
+}
+
+
+def _export_onnx(model_name: str, quantize: str) -> tuple:
+    """Export ``model_name`` to ONNX once, optionally int8-quantized.
+
+    Returns (local model dir, onnx file name relative to it).
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+    except ImportError as e:
+        raise ImportError(
+            "EMBEDDING_BACKEND=onnx needs optimum and onnxruntime: "
+            "pip install 'optimum[onnxruntime]'"
+        ) from e
+
+    local_dir = os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+    file_name = (
+        f"onnx/model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+        if quantize == "int8"
+        else "onnx/model.onnx"
+    )
+    if os.path.exists(os.path.join(local_dir, file_name)):
+        return local_dir, file_name
+
+    print(f" Exporting {model_name} to ONNX in {local_dir} (one-off)...")
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    model.save_pretrained(local_dir)
+    if quantize == "int8":
+        export_dynamic_quantized_onnx_model(
+            model, ONNX_QUANTIZATION_CONFIG, local_dir
+        )
+    return local_dir, file_name
+
+
+def load_embeddings(backend=None, model_name=None, quantize=None,
+                    normalize=False) -> HuggingFaceEmbeddings:
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    model_name = model_name or EMBEDDING_MODEL
+    quantize = (quantize or ONNX_QUANTIZE).lower()
+    encode_kwargs = {"normalize_embeddings": normalize}
+
+    if backend == "torch":
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs=encode_kwargs,
+        )
+    if backend == "onnx":
+        local_dir, file_name = _export_onnx(model_name, quantize)
+        return HuggingFaceEmbeddings(
+            model_name=local_dir,
+            model_kwargs={
+                "device": "cpu",
+                "backend": "onnx",
+                "model_kwargs": {"file_name": file_name},
+            },
+            encode_kwargs=encode_kwargs,
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend} (expected torch or onnx)")
+
+
+def embedding_dimension(embeddings, model_name=None) -> int:
+    """Known size for the bge family, otherwise probe the model once."""
+    dimension = MODEL_DIMENSIONS.get(model_name or EMBEDDING_MODEL)
+    if dimension:
+        return dimension
+    return len(embeddings.embed_documents(["dimension probe"])[0])
+
+
+def load_sparse_embeddings(model_name=None):
+    """BM25-style sparse encoder used for both indexing and hybrid queries."""
+    from langchain_qdrant import FastEmbedSparse
+
+    try:
+        return FastEmbedSparse(model_name=model_name or SPARSE_MODEL)
+    except ImportError as e:
+        raise ImportError("RETRIEVAL_MODE=hybrid needs fastembed: pip install fastembed") from e
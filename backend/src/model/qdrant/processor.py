@@ -1,17 +1,59 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
 import os
-from langchain_qdrant import QdrantVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
+import sqlite3
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import pandas as pd
+from openpyxl import load_workbook
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    Modifier,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from embedding_backend import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    MODEL_DIMENSIONS,
+    RETRIEVAL_MODE,
+    SPARSE_VECTOR_NAME,
+    embedding_dimension,
+    load_embeddings,
+    load_sparse_embeddings,
+)
+from vector_backend import COLLECTION_NAME, describe, make_client
 
 # Configuration
 EXCEL_PATH = "./knowledge.xlsx"
-MODEL_NAME = "BAAI/bge-large-en"
-QDRANT_URL = "http://localhost:6333"
-COLLECTION_NAME = "agriculture_knowledge"
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
+# Streaming ingestion: rows read from the workbook per step, texts per
+# embedding call, and embedding worker processes (0 = embed in-process).
+READ_CHUNK_ROWS = 5000
+EMBED_BATCH_SIZE = 256
+EMBED_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# Point ids are uuid5(namespace, content hash): re-running on the same rows
+# yields the same ids, which is what makes incremental indexing possible.
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a9e-5b7d-4e38-9a41-0c8d2f7b3e15")
+SCROLL_PAGE_SIZE = 1000
+# Touched after every successful run so the chat server's answer cache
+# (model/units/cache_unit.py) knows to drop answers built on the old index.
+INDEX_STAMP_PATH = os.path.join(os.path.dirname(__file__), "index_version")
 
 COLUMN_NAMES = [
     "Sl No.",
@@ -29,127 +71,483 @@ COLUMN_NAMES = [
     "Answer",
 ]
 
+# Keyword payload indexes for filtered retrieval (model/units/filter_unit.py).
+INDEXED_METADATA = ["State", "District", "Crop", "Season", "Month", "Year"]
 
-def main():
-    if not os.path.exists(EXCEL_PATH):
-        raise FileNotFoundError(f"Excel file not found at {EXCEL_PATH}")
+METADATA_COLUMNS = [
+    "Sl No.",
+    "Year",
+    "Month",
+    "Day",
+    "State",
+    "District",
+    "Sector",
+    "Season",
+    "Crop",
+    "Sl No.-Q",
+    "Sl No.-A",
+]
+
+
+def iter_row_chunks(excel_path=EXCEL_PATH, chunk_rows=READ_CHUNK_ROWS):
+    """Yield cleaned DataFrames of at most ``chunk_rows`` rows, sheet by sheet.
 
-    print("Loading and processing Excel knowledge base...")
+    The workbook is opened read-only so openpyxl streams rows from disk
+    instead of materialising every sheet.
+    """
+    if not os.path.exists(excel_path):
+        raise FileNotFoundError(f"Excel file not found at {excel_path}")
 
-    # Read and process all sheets
+    workbook = load_workbook(excel_path, read_only=True, data_only=True)
     try:
-        xls = pd.ExcelFile(EXCEL_PATH)
-        sheet_names = xls.sheet_names
-        print(f"Found {len(sheet_names)} sheets in the Excel file: {sheet_names}")
-
-        # Read and combine all sheets with proper column names
-        all_sheets = []
-        for sheet in sheet_names:
-            # Read sheet without header and assign custom column names
-            sheet_df = pd.read_excel(xls, sheet_name=sheet, header=None)
-
-            # Assign column names only if we have the expected number of columns
-            if len(sheet_df.columns) == len(COLUMN_NAMES):
-                sheet_df.columns = COLUMN_NAMES
-                print(f"   Sheet '{sheet}' loaded with {len(sheet_df)} rows")
-                all_sheets.append(sheet_df)
-            else:
-                print(
-                    f"   Sheet '{sheet}' has {len(sheet_df.columns)} columns (expected {len(COLUMN_NAMES)}). Skipping."
-                )
-
-        # Combine all valid sheets
-        if all_sheets:
-            df = pd.concat(all_sheets, ignore_index=True)
-        else:
-            raise ValueError("No valid sheets found with correct column structure")
-
-    except Exception as e:
-        print(f" Error processing Excel file: {e}")
-        print(" Trying fallback method...")
-        # Fallback: try reading as single sheet
-        df = pd.read_excel(EXCEL_PATH, header=None)
-        if len(df.columns) == len(COLUMN_NAMES):
-            df.columns = COLUMN_NAMES
-        else:
-            print(
-                f" Fallback failed. Found {len(df.columns)} columns (expected {len(COLUMN_NAMES)})"
-            )
-            raise
+        print(f"Found {len(workbook.sheetnames)} sheets in the Excel file")
+        for sheet in workbook.worksheets:
+            rows = []
+            width = None
+            for values in sheet.iter_rows(values_only=True):
+                # Cells past the data are often styled but empty; trim them.
+                values = list(values)
+                while values and values[-1] is None:
+                    values.pop()
+                if not values:
+                    continue
+                if width is None:
+                    width = len(values)
+                    if width != len(COLUMN_NAMES):
+                        print(
+                            f"   Sheet '{sheet.title}' has {width} columns (expected {len(COLUMN_NAMES)}). Skipping."
+                        )
+                        break
+                values = [
+                    # Like pandas.read_excel: 2025.0 -> 2025
+                    int(v) if isinstance(v, float) and v.is_integer() else v
+                    for v in (values + [None] * len(COLUMN_NAMES))[: len(COLUMN_NAMES)]
+                ]
+                rows.append(values)
+                if len(rows) >= chunk_rows:
+                    yield prepare_chunk(pd.DataFrame(rows, columns=COLUMN_NAMES, dtype=object))
+                    rows = []
+            if rows:
+                yield prepare_chunk(pd.DataFrame(rows, columns=COLUMN_NAMES, dtype=object))
+    finally:
+        workbook.close()
 
-    # Clean and prepare the data
-    df = clean_dataframe(df)
 
-    # Create meaningful content from the key columns
-    print("Creating meaningful content from key columns...")
-    df["content"] = df.apply(
-        lambda row: (
-            f"Crop: {row['Crop']} | "
-            f"State: {row['State']}, District: {row['District']} | "
-            f"Season: {row['Season']} | "
-            f"Question: {row['Question']} | "
-            f"Answer: {row['Answer']}"
-        ),
-        axis=1,
+def prepare_chunk(df):
+    """Clean a chunk and add content/metadata columns with vectorized string ops."""
+    df = clean_dataframe(df)
+    # Header rows repeat inside the sheets; they carry no knowledge.
+    df = df[df["Question"] != "Question"].copy()
+    df["content"] = (
+        "Crop: " + df["Crop"]
+        + " | State: " + df["State"]
+        + ", District: " + df["District"]
+        + " | Season: " + df["Season"]
+        + " | Question: " + df["Question"]
+        + " | Answer: " + df["Answer"]
     )
+    df["metadata"] = df[METADATA_COLUMNS].to_dict(orient="records")
+    return df
 
-    # Extract metadata
-    print("Extracting metadata...")
-    metadata_columns = [
-        "Sl No.",
-        "Year",
-        "Month",
-        "Day",
-        "State",
-        "District",
-        "Sector",
-        "Season",
-        "Crop",
-        "Sl No.-Q",
-        "Sl No.-A",
-    ]
-    df["metadata"] = df[metadata_columns].to_dict(orient="records")
-
-    # Ensure we have valid content
-    if df.empty:
-        print(" No valid data found after processing. Exiting.")
-        return
 
-    print(f" Processed {len(df)} agriculture knowledge entries")
+def load_knowledge(excel_path=EXCEL_PATH):
+    """Whole knowledge base as one frame (for benchmarks and small files)."""
+    chunks = list(iter_row_chunks(excel_path))
+    if not chunks:
+        return pd.DataFrame(columns=COLUMN_NAMES + ["content", "metadata"])
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ---- embedding workers ----
+_worker_embeddings = None
+
+
+def _init_embed_worker(threads):
+    global _worker_embeddings
+    try:
+        import torch
+
+        # Each process gets its share of cores instead of all of them.
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_embeddings = load_embeddings()
+
+
+def _embed_texts(texts):
+    return _worker_embeddings.embed_documents(texts)  # type: ignore
+
+
+class InlineExecutor:
+    """Same interface as the process pool, for --workers 0."""
+
+    def __init__(self):
+        self.embeddings = load_embeddings()
 
-    # Convert to LangChain documents
-    documents = [
-        Document(page_content=row["content"], metadata=row["metadata"])
-        for _, row in df.iterrows()
-    ]
-    print(f" Created {len(documents)} documents")
+    def submit(self, fn, texts):
+        future = Future()
+        try:
+            future.set_result(self.embeddings.embed_documents(texts))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
-    # Split documents into chunks
+    def shutdown(self, wait=True):
+        pass
+
+
+class Progress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.chunks = 0
+        self.points = 0
+        self.added = 0
+        self.skipped = 0
+        self.deleted = 0
+        self._last_report = 0.0
+
+    def report(self, force=False):
+        elapsed = time.perf_counter() - self.started
+        if not force and elapsed - self._last_report < 5:
+            return
+        self._last_report = elapsed
+        rate = self.points / elapsed if elapsed else 0.0
+        print(
+            f"   rows={self.rows} chunks={self.chunks} upserted={self.points} "
+            f"added={self.added} skipped={self.skipped} "
+            f"elapsed={elapsed:.1f}s throughput={rate:.1f} points/s"
+        )
+
+
+def point_id(page_content, metadata):
+    """Deterministic id from a chunk's content, so unchanged chunks keep their id."""
+    digest = hashlib.sha256(
+        (page_content + "\x00" + json.dumps(metadata, sort_keys=True)).encode("utf-8")
+    ).hexdigest()
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, digest))
+
+
+def iter_batches(excel_path, chunk_rows, batch_size, progress):
+    """Yield (ids, texts, payloads) batches of split chunks, reading lazily."""
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
     )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Split into {len(chunks)} knowledge chunks")
-
-    # Initialize embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name=MODEL_NAME,
-        model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": False},
+    ids, texts, payloads = [], [], []
+    for df in iter_row_chunks(excel_path, chunk_rows):
+        progress.rows += len(df)
+        documents = [
+            Document(page_content=content, metadata=metadata)
+            for content, metadata in zip(df["content"], df["metadata"])
+        ]
+        for chunk in text_splitter.split_documents(documents):
+            ids.append(point_id(chunk.page_content, chunk.metadata))
+            texts.append(chunk.page_content)
+            # Same payload layout QdrantVectorStore writes and reads.
+            payloads.append(
+                {"page_content": chunk.page_content, "metadata": chunk.metadata}
+            )
+            if len(texts) >= batch_size:
+                progress.chunks += len(texts)
+                yield ids, texts, payloads
+                ids, texts, payloads = [], [], []
+    if texts:
+        progress.chunks += len(texts)
+        yield ids, texts, payloads
+
+
+def upsert(client, collection, ids, texts, payloads, vectors, sparse, progress):
+    if sparse is not None:
+        # BM25 is tokenisation plus hashing: cheap enough for the main process.
+        vectors = [
+            {
+                "": dense,
+                SPARSE_VECTOR_NAME: SparseVector(indices=s.indices, values=s.values),
+            }
+            for dense, s in zip(vectors, sparse.embed_documents(texts))
+        ]
+    client.upsert(
+        collection_name=collection,
+        points=[
+            PointStruct(id=point, vector=vector, payload=payload)
+            for point, vector, payload in zip(ids, vectors, payloads)
+        ],
+        wait=True,
+    )
+    progress.points += len(ids)
+    progress.report()
+
+
+class SeenIds:
+    """Point ids met during this run, in a temporary on-disk SQLite table.
+
+    Memory stays flat however large the knowledge base: the table is what
+    tells duplicate chunks apart and, at the end, which live points are stale.
+    """
+
+    def __init__(self):
+        # An empty path is a private temporary database, deleted on close.
+        self._conn = sqlite3.connect("")
+        self._conn.execute("CREATE TABLE seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.count = 0
+
+    def add(self, ids):
+        """Record ``ids``; returns the ones not seen before, in order."""
+        fresh = []
+        for point in ids:
+            if self._conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (point,)).rowcount:
+                fresh.append(point)
+        self.count += len(fresh)
+        return fresh
+
+    def missing(self, ids):
+        """The subset of ``ids`` never seen in this run."""
+        ids = list(ids)
+        found = set()
+        for start in range(0, len(ids), SCROLL_PAGE_SIZE):
+            page = ids[start:start + SCROLL_PAGE_SIZE]
+            rows = self._conn.execute(
+                f"SELECT id FROM seen WHERE id IN ({','.join('?' * len(page))})", page
+            )
+            found.update(r[0] for r in rows)
+        return [point for point in ids if point not in found]
+
+    def close(self):
+        self._conn.close()
+
+
+def present_ids(client, collection, ids):
+    """Which of ``ids`` the collection already holds (ids only, no vectors)."""
+    records = client.retrieve(collection, ids=ids, with_payload=False, with_vectors=False)
+    return {str(r.id) for r in records}
+
+
+def delete_stale(client, collection, seen, progress):
+    """Delete live points whose chunk is no longer in the workbook."""
+    # Every seen id is in the collection by now, so equal counts mean no
+    # stale points and the scan below can be skipped.
+    if client.count(collection, exact=True).count == seen.count:
+        return
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        stale = seen.missing(str(r.id) for r in records)
+        if stale:
+            client.delete(collection, points_selector=PointIdsList(points=stale), wait=True)
+            progress.deleted += len(stale)
+        if offset is None:
+            return
+
+
+def live_collection(client):
+    """Physical collection currently behind COLLECTION_NAME, or None."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == COLLECTION_NAME:
+            return alias.collection_name
+    # Indexes built before aliases were introduced are a plain collection.
+    if client.collection_exists(COLLECTION_NAME):
+        return COLLECTION_NAME
+    return None
+
+
+def has_sparse(client, collection) -> bool:
+    sparse = client.get_collection(collection).config.params.sparse_vectors or {}
+    return SPARSE_VECTOR_NAME in sparse
+
+
+def collection_dimension(client, collection) -> int:
+    vectors = client.get_collection(collection).config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors.get("") or next(iter(vectors.values()))
+    return vectors.size  # type: ignore
+
+
+def create_payload_indexes(client, collection):
+    """Add whichever INDEXED_METADATA indexes the collection lacks."""
+    indexed = set(client.get_collection(collection).payload_schema)
+    for field in INDEXED_METADATA:
+        if f"metadata.{field}" in indexed:
+            continue
+        client.create_payload_index(
+            collection,
+            field_name=f"metadata.{field}",
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+
+
+def create_shadow(client, dimension, hybrid):
+    shadow = f"{COLLECTION_NAME}_{time.time_ns() // 1_000_000}"
+    client.create_collection(
+        shadow,
+        vectors_config=VectorParams(size=dimension, distance=Distance.COSINE),
+        # IDF is applied by Qdrant at query time, which is what makes it BM25.
+        sparse_vectors_config=(
+            {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+            if hybrid
+            else None
+        ),
+    )
+    create_payload_indexes(client, shadow)
+    return shadow
+
+
+def swap_alias(client, live, shadow):
+    """Point COLLECTION_NAME at ``shadow`` in one atomic alias update."""
+    if live == COLLECTION_NAME:
+        # One-off migration from a plain collection. Qdrant will not create
+        # an alias over an existing collection name, so the plain one has to
+        # go first; the new collection is complete by now and the alias
+        # follows in the next call. Searches in between are retried once by
+        # the chat server (model/units/rag_unit.py).
+        client.delete_collection(COLLECTION_NAME)
+        live = None
+    operations = []
+    if live is not None:
+        operations.append(
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=COLLECTION_NAME))
+        )
+    operations.append(
+        CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=shadow, alias_name=COLLECTION_NAME)
+        )
     )
-    print(" Embedding model loaded")
-
-    # Create vector store
-    print(" Storing vectors in Qdrant...")
-    QdrantVectorStore.from_documents(
-        chunks,
-        embeddings,
-        url=QDRANT_URL,
-        collection_name=COLLECTION_NAME,
-        prefer_grpc=False,
-        force_recreate=True,
+    client.update_collection_aliases(change_aliases_operations=operations)
+    if live is not None:
+        client.delete_collection(live)
+
+
+def main(excel_path=EXCEL_PATH, chunk_rows=READ_CHUNK_ROWS,
+         batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS, full=False):
+    print("Loading and processing Excel knowledge base (streaming)...")
+    print(f" Embedding model: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND}), workers={workers}")
+
+    hybrid = RETRIEVAL_MODE == "hybrid"
+    sparse = load_sparse_embeddings() if hybrid else None
+
+    client = make_client()
+    print(f" Vector backend: {describe()}")
+    print(f" Retrieval mode: {RETRIEVAL_MODE}")
+
+    if workers > 0:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_embed_worker,
+            initargs=(threads,),
+        )
+        dimension = MODEL_DIMENSIONS.get(EMBEDDING_MODEL) or embedding_dimension(
+            load_embeddings()
+        )
+    else:
+        executor = InlineExecutor()
+        dimension = embedding_dimension(executor.embeddings)
+
+    # Changed and removed chunks are applied to the live collection in place.
+    # Only a first build, --full, or a new vector layout (embedding size,
+    # sparse vectors on or off) rebuilds into a shadow collection that
+    # replaces the live one with an alias swap at the end.
+    live = live_collection(client)
+    rebuild = (
+        full
+        or live is None
+        or has_sparse(client, live) != hybrid
+        or collection_dimension(client, live) != dimension
     )
-    print(f" Agriculture knowledge stored! Collection: {COLLECTION_NAME}")
+    if rebuild:
+        target = create_shadow(client, dimension, hybrid)
+        print(f" Live collection: {live or '(none)'}; rebuilding into {target}")
+    else:
+        target = live
+        # Indexes only speed up filtering; adding one changes no answer.
+        create_payload_indexes(client, live)
+        print(f" Live collection: {live}; updating in place")
+
+    # At most two batches per worker are in flight, so memory stays bounded
+    # no matter how large the workbook is.
+    max_in_flight = max(1, workers) * 2
+    progress = Progress()
+    in_flight = {}
+    seen = SeenIds()
+    try:
+        for ids, texts, payloads in iter_batches(excel_path, chunk_rows, batch_size, progress):
+            fresh = set(seen.add(ids))
+            present = set() if rebuild or not fresh else present_ids(client, live, list(fresh))
+            new_ids, new_texts, new_payloads = [], [], []
+            for point, text, payload in zip(ids, texts, payloads):
+                if point not in fresh:
+                    continue
+                fresh.discard(point)  # the same chunk twice in one batch
+                if point in present:
+                    progress.skipped += 1
+                    continue
+                new_ids.append(point)
+                new_texts.append(text)
+                new_payloads.append(payload)
+            if not new_ids:
+                progress.report()
+                continue
+
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    done_ids, done_texts, done_payloads = in_flight.pop(future)
+                    upsert(
+                        client, target, done_ids, done_texts, done_payloads,
+                        future.result(), sparse, progress,
+                    )
+            in_flight[executor.submit(_embed_texts, new_texts)] = (
+                new_ids, new_texts, new_payloads
+            )
+            progress.added += len(new_ids)
+        for future in list(in_flight):
+            done_ids, done_texts, done_payloads = in_flight.pop(future)
+            upsert(
+                client, target, done_ids, done_texts, done_payloads,
+                future.result(), sparse, progress,
+            )
+
+        if seen.count == 0:
+            # Never let an empty or unreadable workbook wipe the live index.
+            if rebuild:
+                client.delete_collection(target)
+            print(" No valid data found after processing. Exiting.")
+            return
+        if not rebuild:
+            delete_stale(client, live, seen, progress)
+    except BaseException:
+        if rebuild:
+            client.delete_collection(target)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        seen.close()
+
+    progress.report(force=True)
+    print(
+        f" Run report: added={progress.added} skipped={progress.skipped} "
+        f"deleted={progress.deleted}"
+    )
+
+    if rebuild:
+        swap_alias(client, live, target)
+        print(f" Agriculture knowledge stored! Collection: {COLLECTION_NAME} -> {target}")
+    elif progress.added or progress.deleted:
+        print(f" Agriculture knowledge updated in place: {COLLECTION_NAME} ({live})")
+    else:
+        print(f" No changes; {COLLECTION_NAME} left as is.")
+        return
+    touch_index_stamp()
+
+
+def touch_index_stamp():
+    with open(INDEX_STAMP_PATH, "w") as f:
+        f.write(str(time.time()))
 
 
 def clean_dataframe(df):
@@ -167,4 +565,13 @@ def clean_dataframe(df):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index knowledge.xlsx into Qdrant")
+    parser.add_argument("--excel", default=EXCEL_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=READ_CHUNK_ROWS)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument(
+        "--full", action="store_true", help="re-embed every chunk instead of only changed ones"
+    )
+    args = parser.parse_args()
+    main(args.excel, args.chunk_rows, args.batch_size, args.workers, args.full)
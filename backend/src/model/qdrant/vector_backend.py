@@ -0,0 +1,45 @@
+"""Qdrant connection shared by processor.py and the chat server.
+
+    VECTOR_BACKEND   http (default) | grpc | local
+    QDRANT_URL       server address for http/grpc (default http://localhost:6333)
+    QDRANT_GRPC_PORT gRPC port for grpc mode (default 6334)
+    QDRANT_PATH      on-disk index directory for local mode
+
+``local`` runs Qdrant embedded in the process (``QdrantClient(path=...)``):
+no server, no HTTP/JSON round trip per search, and searches are brute force
+over vectors held in memory, which is fast at the size of our knowledge
+base. The directory is locked by whichever process opens it, so stop the
+chat server while processor.py rebuilds the index and restart it after.
+"""
+
+import os
+
+from qdrant_client import QdrantClient
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "http").lower()
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_PATH = os.getenv(
+    "QDRANT_PATH", os.path.join(os.path.dirname(__file__), "local_index")
+)
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "agriculture_knowledge")
+
+
+def make_client(backend=None) -> QdrantClient:
+    backend = (backend or VECTOR_BACKEND).lower()
+    if backend == "http":
+        return QdrantClient(url=QDRANT_URL, prefer_grpc=False)
+    if backend == "grpc":
+        return QdrantClient(url=QDRANT_URL, grpc_port=QDRANT_GRPC_PORT, prefer_grpc=True)
+    if backend == "local":
+        return QdrantClient(path=QDRANT_PATH)
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend} (expected http, grpc or local)")
+
+
+def describe(backend=None) -> str:
+    backend = (backend or VECTOR_BACKEND).lower()
+    if backend == "local":
+        return f"local ({QDRANT_PATH})"
+    if backend == "grpc":
+        return f"grpc ({QDRANT_URL}, port {QDRANT_GRPC_PORT})"
+    return f"http ({QDRANT_URL})"
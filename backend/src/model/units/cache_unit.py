@@ -0,0 +1,275 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from db import DB_PATH, ConnectionPool
+
+from .session_store import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# When the LLM is unavailable, a close-enough cached answer beats none.
+FALLBACK_THRESHOLD = float(os.getenv("ANSWER_CACHE_FALLBACK_THRESHOLD", "0.85"))
+TTL = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+# Several server processes (serve.py): every answer is also written to
+# database.db, and each worker pulls the others' answers from there.
+SHARED = os.getenv("ANSWER_CACHE_SHARED", "false").lower() == "true"
+SYNC_INTERVAL = 1.0
+
+# qdrant/processor.py touches this file after every reindex; answers cached
+# before that point may quote stale knowledge and are dropped.
+INDEX_STAMP_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "qdrant", "index_version"
+)
+STAMP_CHECK_INTERVAL = 5.0
+
+
+def scope_key(hints: dict) -> str:
+    """Cache scope for a turn's retrieval hints (crop, season, location)."""
+    return "|".join(f"{field}={value}" for field, value in sorted(hints.items()))
+
+
+class SemanticCache:
+    """In-process nearest-neighbour cache of answers keyed by question embedding.
+
+    Vectors live in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product. A hit needs cosine similarity >= ``threshold``,
+    an entry younger than ``ttl`` and the same ``scope``: turns retrieved
+    under different filters (another user's district) never share answers.
+    When full, the least recently used slot is overwritten.
+
+    With ``shared`` on, stores are also written to the ``answer_cache``
+    table, and lookups first pull rows other processes wrote (at most every
+    SYNC_INTERVAL seconds), so one worker's answer serves them all. Rows
+    older than the TTL or the last reindex are never pulled.
+    """
+
+    def __init__(self, threshold=THRESHOLD, ttl=TTL, max_entries=MAX_ENTRIES,
+                 stamp_path=INDEX_STAMP_PATH, shared=SHARED, db_path=DB_PATH):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stamp_path = stamp_path
+        self._lock = threading.Lock()
+        self._matrix = None  # (max_entries, dim), allocated on first store
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._tokens = np.zeros(max_entries, dtype=np.int64)
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._scope_ids = {"": 0}
+        self._stamp = self._read_stamp()
+        self._stamp_checked = time.monotonic()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "saved_tokens": 0,
+            "hit_seconds_total": 0.0,
+            "pulled": 0,
+        }
+        self.shared = shared
+        self._sync_lock = threading.Lock()
+        self._synced_id = 0
+        self._synced_at = 0.0
+        self._own_ids = set()
+        if shared:
+            self._pool = ConnectionPool(db_path, create=True)
+            self._init_db()
+
+    # ---- shared table ----
+    def _init_db(self):
+        with self._pool.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    answer TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """
+            )
+
+    def _sync(self):
+        """Copy answers other processes stored since the last pull."""
+        if time.monotonic() - self._synced_at < SYNC_INTERVAL:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # another thread is pulling; use what is here
+        try:
+            self._synced_at = time.monotonic()
+            oldest = max(time.time() - self.ttl, self._stamp or 0.0)
+            try:
+                with self._pool.connection() as conn:
+                    rows = conn.execute(
+                        "SELECT id, scope, vector, answer, tokens, created_at FROM answer_cache "
+                        "WHERE id > ? AND created_at > ? ORDER BY id DESC LIMIT ?",
+                        (self._synced_id, oldest, self.max_entries),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning("Shared answer cache unavailable: %s", e)
+                return
+            with self._lock:
+                for row_id, scope, vector, answer, tokens, created in reversed(rows):
+                    self._synced_id = max(self._synced_id, row_id)
+                    if row_id in self._own_ids:
+                        self._own_ids.discard(row_id)
+                        continue
+                    v = np.frombuffer(vector, dtype=np.float32)
+                    self._put(v, answer, tokens, scope, created)
+                    self._stats["pulled"] += 1
+                self._own_ids = {i for i in self._own_ids if i > self._synced_id}
+        finally:
+            self._sync_lock.release()
+
+    def _publish(self, v: np.ndarray, answer: str, tokens: int, scope: str, created: float):
+        try:
+            with self._pool.connection() as conn:
+                row_id = conn.execute(
+                    "INSERT INTO answer_cache (scope, vector, answer, tokens, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (scope, v.astype(np.float32).tobytes(), answer, tokens, created),
+                ).lastrowid
+                # Before the commit makes it visible to this process's _sync.
+                with self._lock:
+                    self._own_ids.add(row_id)
+                # Keep the table about as large as one process's cache.
+                conn.execute(
+                    "DELETE FROM answer_cache WHERE id <= ? OR created_at < ?",
+                    (row_id - self.max_entries, created - self.ttl),
+                )
+        except sqlite3.Error as e:
+            logger.warning("Could not share a cached answer: %s", e)
+
+    def _read_stamp(self):
+        try:
+            return os.stat(self.stamp_path).st_mtime
+        except OSError:
+            return None
+
+    def _check_stamp(self, now: float):
+        # Caller holds self._lock.
+        if now - self._stamp_checked < STAMP_CHECK_INTERVAL:
+            return
+        self._stamp_checked = now
+        stamp = self._read_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._clear()
+            logger.info("Answer cache cleared: knowledge base was reindexed")
+
+    def _clear(self):
+        # Caller holds self._lock.
+        self._valid[:] = False
+        self._answers = [None] * self.max_entries
+        self._scope_ids = {"": 0}
+        self._stats["invalidations"] += 1
+
+    def invalidate(self):
+        """Clear this cache and, through the stamp file, every other worker's."""
+        with self._lock:
+            self._clear()
+            try:
+                with open(self.stamp_path, "a"):
+                    os.utime(self.stamp_path)
+            except OSError as e:
+                logger.warning("Could not touch %s: %s", self.stamp_path, e)
+            self._stamp = self._read_stamp()
+        if self.shared:
+            try:
+                with self._pool.connection() as conn:
+                    conn.execute("DELETE FROM answer_cache")
+            except sqlite3.Error as e:
+                logger.warning("Could not clear the shared answer cache: %s", e)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector, threshold=None, scope: str = "") -> Optional[str]:
+        started = time.perf_counter()
+        if self.shared:
+            with self._lock:
+                # A reindex clears first, so stale rows are not pulled back.
+                self._check_stamp(time.monotonic())
+            self._sync()
+        now = time.time()
+        with self._lock:
+            self._check_stamp(time.monotonic())
+            scope_id = self._scope_ids.get(scope, -1)
+            live = self._valid & (now - self._created < self.ttl) & (self._scopes == scope_id)
+            if self._matrix is None or not live.any():
+                self._stats["misses"] += 1
+                return None
+            scores = self._matrix @ self._normalize(vector)
+            scores[~live] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < (self.threshold if threshold is None else threshold):
+                self._stats["misses"] += 1
+                return None
+            self._last_used[best] = now
+            self._stats["hits"] += 1
+            self._stats["saved_tokens"] += int(self._tokens[best])
+            self._stats["hit_seconds_total"] += time.perf_counter() - started
+            return self._answers[best]
+
+    def store(self, vector, answer: str, prompt_tokens: int = 0, scope: str = ""):
+        v = self._normalize(vector)
+        now = time.time()
+        tokens = prompt_tokens + estimate_tokens(answer)
+        with self._lock:
+            self._put(v, answer, tokens, scope, now)
+            self._stats["stores"] += 1
+        if self.shared:
+            self._publish(v, answer, tokens, scope, now)
+
+    def _put(self, v: np.ndarray, answer: str, tokens: int, scope: str, created: float):
+        # Caller holds self._lock.
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, v.shape[0]), dtype=np.float32)
+        elif v.shape[0] != self._matrix.shape[1]:
+            return  # written under another embedding model
+        free = np.flatnonzero(~self._valid | (time.time() - self._created >= self.ttl))
+        if free.size:
+            slot = int(free[0])
+        else:
+            slot = int(np.argmin(self._last_used))
+            self._stats["evictions"] += 1
+        self._matrix[slot] = v
+        self._valid[slot] = True
+        self._created[slot] = created
+        self._last_used[slot] = created
+        self._answers[slot] = answer
+        self._tokens[slot] = tokens
+        self._scopes[slot] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = (self._stats["hits"] + self._stats["misses"]) or 1
+            hits = self._stats["hits"] or 1
+            return {
+                "entries": int(self._valid.sum()),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._stats["hits"] / lookups, 3),
+                "avg_hit_ms": round(self._stats["hit_seconds_total"] / hits * 1000, 2),
+                **{k: v for k, v in self._stats.items() if k != "hit_seconds_total"},
+            }
+
+
+answer_cache = SemanticCache()
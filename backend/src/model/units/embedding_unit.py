@@ -0,0 +1,141 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "16"))
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+
+
+class BatchingEmbeddings(Embeddings):
+    """Drop-in ``Embeddings`` that micro-batches concurrent ``embed_query`` calls.
+
+    Queries are queued to one background thread that waits up to
+    ``max_wait_ms`` for more to arrive and then embeds them with a single
+    ``embed_documents`` call on the wrapped model. Repeated texts are served
+    from an LRU cache without touching the model.
+    """
+
+    def __init__(self, base: Embeddings, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS, cache_size=CACHE_SIZE):
+        self.base = base
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self._queue = queue.Queue()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats = {"queries": 0, "cache_hits": 0, "batches": 0}
+        self.batch_sizes = Histogram(
+            "embed_batch_size", "Texts per embedding batch.", buckets=[1, 2, 4, 8, 16, 32, 64]
+        )
+        self.batch_seconds = Histogram(
+            "embed_batch_seconds", "Time to embed one batch.",
+            buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5],
+        )
+        self.query_seconds = Histogram(
+            "embed_query_seconds", "Time from query to vector, queueing included.",
+            buckets=[0.001, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1],
+        )
+
+    # ---- cache ----
+    def _cache_get(self, text: str):
+        with self._cache_lock:
+            self._stats["queries"] += 1
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._stats["cache_hits"] += 1
+                self._cache.move_to_end(text)
+            return vector
+
+    def _cache_put(self, text: str, vector: List[float]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ---- batching ----
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embed-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        started = time.perf_counter()
+        try:
+            vectors = dict(zip(texts, self.base.embed_documents(texts)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batch_seconds.observe(time.perf_counter() - started)
+        self.batch_sizes.observe(len(texts))
+        self._stats["batches"] += 1
+        for text, vector in vectors.items():
+            self._cache_put(text, vector)
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    # ---- Embeddings interface ----
+    def embed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        vector = self._cache_get(text)
+        if vector is None:
+            self._ensure_worker()
+            future = Future()
+            self._queue.put((text, future))
+            vector = future.result()
+        self.query_seconds.observe(time.perf_counter() - started)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Bulk callers (ingestion) already batch; go straight to the model.
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> dict:
+        queries = self._stats["queries"] or 1
+        return {
+            **self._stats,
+            "cache_size": len(self._cache),
+            "cache_hit_rate": round(self._stats["cache_hits"] / queries, 3),
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "batch_seconds": self.batch_seconds.snapshot(),
+            "query_seconds": self.query_seconds.snapshot(),
+        }
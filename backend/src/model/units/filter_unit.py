@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, MatchValue
+
+from cache_stamps import STAMP_DIR, read_stamp
+from db import pool
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("RETRIEVAL_FILTERS", "true").lower() == "true"
+
+# Fields (keyword-indexed by processor.py) we try to recognise in a question / user location.
+HINT_FIELDS = ["Crop", "Season", "District", "State"]
+# Progressively looser filters, tried until one returns enough hits.
+RELAXATION = [("Crop", "Season", "location"), ("Crop", "location"), ("Crop",), ()]
+
+VOCABULARY_TTL = 600.0
+# Profile locations rarely change; a changed one is used within this many
+# seconds, or at once after create_user.py.
+LOCATION_TTL = float(os.getenv("USER_LOCATION_TTL_SECONDS", "300"))
+LOCATION_CACHE_SIZE = 4096
+STAMP_CHECK_INTERVAL = 2.0
+
+
+def payload_key(field: str) -> str:
+    return f"metadata.{field}"
+
+
+class MetadataHints:
+    """Spots crop/season/location values from the knowledge base in free text.
+
+    The vocabulary is read from Qdrant's facet API (which uses the keyword
+    payload indexes) and refreshed every ``VOCABULARY_TTL`` seconds, so new
+    crops or districts become filterable as soon as they are indexed.
+    """
+
+    def __init__(self, client: QdrantClient, collection: str):
+        self.client = client
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._patterns: Dict[str, tuple] = {}
+        self._loaded_at = 0.0
+        self._refreshing = False
+
+    def _load(self):
+        patterns = {}
+        for field in HINT_FIELDS:
+            try:
+                hits = self.client.facet(
+                    self.collection, key=payload_key(field), limit=5000
+                ).hits
+            except Exception as e:
+                # No payload index on this collection yet: skip the field.
+                logger.warning("Cannot facet %s for retrieval filters: %s", field, e)
+                continue
+            values = {str(h.value).lower(): str(h.value) for h in hits if str(h.value).strip()}
+            if not values:
+                continue
+            alternation = "|".join(
+                re.escape(v) for v in sorted(values, key=len, reverse=True)
+            )
+            patterns[field] = (re.compile(rf"\b({alternation})\b"), values)
+        return patterns
+
+    def patterns(self):
+        """Current patterns; a stale set is reloaded by one caller at a time.
+
+        The facet queries run outside the lock, so other turns keep using the
+        previous patterns (none before the first load) instead of waiting.
+        """
+        with self._lock:
+            if self._refreshing or (
+                self._loaded_at and time.monotonic() - self._loaded_at <= VOCABULARY_TTL
+            ):
+                return self._patterns
+            self._refreshing = True
+        patterns = None
+        try:
+            patterns = self._load()
+            return patterns
+        finally:
+            with self._lock:
+                self._refreshing = False
+                if patterns is not None:
+                    self._patterns = patterns
+                    self._loaded_at = time.monotonic()
+
+    def extract(self, text: str, fields: Sequence[str] = HINT_FIELDS) -> Dict[str, str]:
+        text = (text or "").lower()
+        found = {}
+        patterns = self.patterns()
+        for field in fields:
+            if field not in patterns:
+                continue
+            pattern, values = patterns[field]
+            match = pattern.search(text)
+            if match:
+                found[field] = values[match.group(1)]
+        return found
+
+    def hints(self, question: str, location: Optional[str] = None) -> Dict[str, str]:
+        """Crop/season come from the question; location from it or the user profile."""
+        found = self.extract(question)
+        if location and "District" not in found and "State" not in found:
+            found.update(self.extract(location, ("District", "State")))
+        return found
+
+
+def build_filter(hints: Dict[str, str], fields: Sequence[str]) -> Optional[Filter]:
+    must = []
+    for field in fields:
+        if field == "location":
+            # District is the tighter match; fall back to State.
+            field = "District" if "District" in hints else "State"
+        if field in hints:
+            must.append(
+                FieldCondition(key=payload_key(field), match=MatchValue(value=hints[field]))
+            )
+    return Filter(must=must) if must else None
+
+
+def search_with_relaxation(search: Callable, hints: Dict[str, str], k: int):
+    """Filtered top-k search, loosening the filter until ``k`` chunks come back.
+
+    ``search(k, filter)`` runs one query (dense or hybrid). Walks RELAXATION
+    from the tightest filter to none; identical filters (when a hint is
+    missing) are only searched once.
+    """
+    tried = set()
+    docs = []
+    for fields in RELAXATION if hints else [()]:
+        search_filter = build_filter(hints, fields)
+        key = repr(search_filter)
+        if key in tried:
+            continue
+        tried.add(key)
+        docs = search(k, search_filter)
+        if len(docs) >= k:
+            break
+    return docs
+
+
+class UserLocations:
+    """``location`` per user_id, cached for ``ttl`` seconds.
+
+    Failed reads are not cached, so a database hiccup does not disable the
+    location filter for that user. create_user.py touches the "user" stamp
+    (cache_stamps.py) and every process drops its entries on the next
+    lookup after that.
+    """
+
+    def __init__(self, ttl=LOCATION_TTL, max_entries=LOCATION_CACHE_SIZE,
+                 load=None, stamp_dir=STAMP_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stamp_dir = stamp_dir
+        self._load = load or _load_location
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stamp = read_stamp("user", stamp_dir)
+        self._stamp_checked = time.monotonic()
+
+    def _check_stamp(self, now: float):
+        # Caller holds self._lock.
+        if now - self._stamp_checked < STAMP_CHECK_INTERVAL:
+            return
+        self._stamp_checked = now
+        stamp = read_stamp("user", self.stamp_dir)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._entries.clear()
+
+    def get(self, user_id: str) -> Optional[str]:
+        if not user_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamp(now)
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                return entry[0]
+        try:
+            location = self._load(user_id)
+        except (sqlite3.Error, FileNotFoundError) as e:
+            logger.warning("Could not read location for %s: %s", user_id, e)
+            return None
+        with self._lock:
+            self._entries[user_id] = (location, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return location
+
+    def forget(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def _load_location(user_id: str) -> Optional[str]:
+    with pool.connection() as conn:
+        row = conn.execute(
+            "SELECT location FROM user WHERE user_id = ?", (user_id,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+user_locations = UserLocations()
+
+
+def user_location(session_id: str) -> Optional[str]:
+    """``location`` of the logged-in user; chat sessions are keyed by user_id."""
+    return user_locations.get(session_id)
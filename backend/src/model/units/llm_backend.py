@@ -0,0 +1,282 @@
+"""Where chat completions come from: the HF Inference API or a local server.
+
+    LLM_BACKEND       hf (default) | openai
+    CHAT_MODEL        hf: model id or endpoint URL for InferenceClient
+                      openai: model name sent with each request (llama.cpp
+                      serves whatever it was started with and ignores it)
+    HF_TOKEN          hf only
+    LLM_BASE_URL      openai: the server's /v1 root (default http://127.0.0.1:8080/v1)
+    LLM_API_KEY       openai: bearer token, if the server checks one
+    LLM_MAX_TOKENS    completion budget per call (default 1024)
+    LLM_BATCH_SLOTS   openai: completions generated at once (default 8)
+
+``openai`` talks to any OpenAI-compatible process on the box: llama.cpp's
+llama-server, vLLM, Ollama, LM Studio. Those servers batch continuously:
+every decode step runs one forward pass over all sequences in flight, and a
+new request joins the running batch as soon as a slot is free. The client
+side of that is ``SlotScheduler``: concurrent chat turns, condense and
+summary calls are sent together up to LLM_BATCH_SLOTS, and the rest wait
+here, FIFO, for the next free slot instead of timing out in the server's
+queue. A call takes its slot before resilience_unit.guard starts the
+deadline; one that finds no slot within LLM_DEADLINE_SECONDS gets the
+fallback answer (``LLMBusy``) without counting against the circuit breaker.
+Start the server with as many slots, e.g.
+
+    llama-server -m model.gguf --parallel 8 --ctx-size 32768 --port 8080
+
+(--ctx-size is shared by the slots) and keep CHAT_MAX_WORKERS at least as
+high, or there are never enough turns in flight to fill the batch.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+import requests
+
+from metrics import Histogram
+
+from .resilience_unit import DEADLINE, TIMEOUT, LLMBusy
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "hf").lower()
+MODEL_NAME: Optional[str] = os.getenv("CHAT_MODEL")
+HF_TOKEN: Optional[str] = os.getenv("HF_TOKEN")
+BASE_URL = os.getenv("LLM_BASE_URL", "http://127.0.0.1:8080/v1").rstrip("/")
+API_KEY = os.getenv("LLM_API_KEY", "")
+MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+BATCH_SLOTS = int(os.getenv("LLM_BATCH_SLOTS", "8"))
+
+
+def _message_text(response) -> str:
+    if isinstance(response, dict) and "choices" in response:
+        try:
+            return response["choices"][0]["message"]["content"].strip()
+        except Exception:
+            pass
+    if isinstance(response, dict) and "generated_text" in response:
+        return response["generated_text"].strip()
+    raise ValueError(f"Unexpected response format: {response}")
+
+
+def _chunk_delta(chunk) -> str:
+    try:
+        return chunk["choices"][0]["delta"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+class ChatBackend(ABC):
+    """One prompt in, one completion out; ``stream`` yields it as text deltas."""
+
+    name = ""
+
+    @abstractmethod
+    def complete(self, prompt: str) -> str:
+        ...
+
+    @abstractmethod
+    def stream(self, prompt: str) -> Iterator[str]:
+        ...
+
+    def admit(self):
+        """Held around one guarded call, outside its deadline and retries."""
+        return nullcontext()
+
+    def describe(self) -> str:
+        return self.name
+
+    def stats(self) -> dict:
+        return {"backend": self.describe()}
+
+
+class HuggingFaceBackend(ChatBackend):
+    name = "hf"
+
+    def __init__(self, model=MODEL_NAME, token=HF_TOKEN, max_tokens=MAX_TOKENS):
+        from huggingface_hub import InferenceClient
+
+        if not model:
+            raise EnvironmentError("CHAT_MODEL environment variable is not set")
+        if not token:
+            raise EnvironmentError("HF_TOKEN environment variable is not set")
+        self.model = model
+        self.max_tokens = max_tokens
+        # The timeout bounds each wait on the socket; resilience_unit.guard
+        # adds the per-call deadline, retries and the circuit breaker on top.
+        self.client = InferenceClient(model=model, token=token, timeout=TIMEOUT)
+
+    def complete(self, prompt: str) -> str:
+        response = self.client.chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.max_tokens,
+            stream=False,
+        )
+        return _message_text(response)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.client.chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.max_tokens,
+            stream=True,
+        ):
+            delta = _chunk_delta(chunk)
+            if delta:
+                yield delta
+
+    def describe(self) -> str:
+        return f"hf ({self.model})"
+
+
+class SlotScheduler:
+    """At most ``slots`` completions in flight; the rest wait in FIFO order."""
+
+    def __init__(self, slots=BATCH_SLOTS, wait_timeout=DEADLINE):
+        self.slots = slots
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = []  # tickets, oldest first
+        self._stats = {"requests": 0, "queued": 0, "busy": 0, "wait_seconds_total": 0.0}
+        # Sequences already in the batch when a request is admitted, itself included.
+        self.batch_sizes = Histogram(
+            "llm_batch_size", "Sequences in the batch when a request is admitted.",
+            buckets=[1, 2, 4, 8, 16, 32, 64],
+        )
+        self.wait_seconds = Histogram(
+            "llm_slot_wait_seconds", "Time a request waited for a free slot.",
+            buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10],
+        )
+
+    def acquire(self):
+        started = time.perf_counter()
+        ticket = object()
+        with self._cond:
+            self._stats["requests"] += 1
+            if self._in_flight >= self.slots or self._waiting:
+                self._stats["queued"] += 1
+                self._waiting.append(ticket)
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self._waiting[0] is ticket and self._in_flight < self.slots,
+                        timeout=self.wait_timeout,
+                    )
+                finally:
+                    self._waiting.remove(ticket)
+                    # The next in line may be admissible now.
+                    self._cond.notify_all()
+                if not admitted:
+                    self._stats["busy"] += 1
+                    raise LLMBusy(f"No free LLM slot within {self.wait_timeout:.0f}s")
+            self._in_flight += 1
+            in_flight = self._in_flight
+            waited = time.perf_counter() - started
+            self._stats["wait_seconds_total"] += waited
+        self.batch_sizes.observe(in_flight)
+        self.wait_seconds.observe(waited)
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+                **self._stats,
+                "batch_size": self.batch_sizes.snapshot(),
+                "wait_seconds": self.wait_seconds.snapshot(),
+            }
+
+
+class OpenAICompatibleBackend(ChatBackend):
+    """/v1/chat/completions on a local server, admitted through a SlotScheduler."""
+
+    name = "openai"
+
+    def __init__(self, base_url=BASE_URL, model=MODEL_NAME, api_key=API_KEY,
+                 max_tokens=MAX_TOKENS, slots=BATCH_SLOTS, slot_wait=DEADLINE):
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.model = model or "local"
+        self.max_tokens = max_tokens
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.scheduler = SlotScheduler(slots, slot_wait)
+        # One keep-alive session per thread, as huggingface_hub does.
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, prompt: str, stream: bool) -> requests.Response:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "stream": stream,
+        }
+        response = self._session().post(
+            self.url, data=json.dumps(body), headers=self.headers, timeout=TIMEOUT, stream=stream
+        )
+        response.raise_for_status()
+        return response
+
+    def admit(self):
+        # Taken once per call, before the guard: waiting for a slot does not
+        # eat into the deadline, retries and hedges reuse it, and an attempt
+        # the guard gave up on never queues for one.
+        return self.scheduler.slot()
+
+    def complete(self, prompt: str) -> str:
+        return _message_text(self._post(prompt, stream=False).json())
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        response = self._post(prompt, stream=True)
+        try:
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                delta = _chunk_delta(json.loads(data))
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+
+    def describe(self) -> str:
+        return f"openai ({self.url}, {self.scheduler.slots} slots)"
+
+    def stats(self) -> dict:
+        return {"backend": self.describe(), "scheduler": self.scheduler.stats()}
+
+
+def make_backend(backend=None) -> ChatBackend:
+    backend = (backend or LLM_BACKEND).lower()
+    if backend == "hf":
+        return HuggingFaceBackend()
+    if backend == "openai":
+        return OpenAICompatibleBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {backend} (expected hf or openai)")
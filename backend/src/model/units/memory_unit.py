@@ -1,28 +1,52 @@
+import logging
+import os
+import time
+
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import (
+    RunnableGenerator,
     RunnableLambda,
-    RunnableParallel,
     RunnablePassthrough,
 )
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-
 
-from .runner_unit import hf_runnable
-from .rag_unit import vector_store
 
-# ---- 1) Setup ----
-chat = hf_runnable
-retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+from .cache_unit import (
+    ENABLED as ANSWER_CACHE_ENABLED,
+    FALLBACK_THRESHOLD,
+    answer_cache,
+    scope_key,
+)
+from .runner_unit import llm_runnable
+from .filter_unit import (
+    ENABLED as RETRIEVAL_FILTERS_ENABLED,
+    MetadataHints,
+    search_with_relaxation,
+    user_location,
+)
+from .rag_unit import COLLECTION_NAME, qdrant_client, searcher, vector_store
+from .resilience_unit import LLMUnavailable
+from .session_store import estimate_tokens, session_store, with_message_history
+from .summary_unit import format_history, maybe_compact
+from .trace import record_call
 
-store = {}
+logger = logging.getLogger(__name__)
 
+# ---- 1) Setup ----
+chat = llm_runnable
+# Chunks handed to the LLM. Hybrid retrieval ranks exact crop/pest/chemical
+# names well enough that 2 is usually plenty, which shortens the prompt.
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "3"))
+metadata_hints = MetadataHints(qdrant_client, COLLECTION_NAME)
+
+# Skip the condense LLM call on the first turn of a session: with no history
+# there is nothing to rephrase against, so the raw input is used as-is.
+SKIP_CONDENSE_ON_EMPTY_HISTORY = (
+    os.getenv("SKIP_CONDENSE_ON_EMPTY_HISTORY", "true").lower() == "true"
+)
 
-def get_session_history(session_id: str):
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+# Fold older turns into a running summary off the request path.
+session_store.compactor = maybe_compact
 
 
 # ---- 2) Prompts ----
@@ -45,7 +69,12 @@ RAG_PROMPT = PromptTemplate.from_template(
 4. **Context used** - 1-2 bullet points of what data you based your answer on.
 5. **Confidence & assumptions** - High/Medium/Low + brief note.
 
-If you can't answer due to missing Context, say so and ask for what's needed—but keep it minimal. Don't add long explanations or jargon—keep it clear and farmer-friendly."""
+If you can't answer due to missing Context, say so and ask for what's needed—but keep it minimal. Don't add long explanations or jargon—keep it clear and farmer-friendly.
+
+Context:
+{context}
+
+Question: {question}"""
 )
 
 
@@ -54,57 +83,106 @@ def format_docs(docs):
 
 
 # ---- 3) Chains ----
-condense = (
-    {
-        "history": RunnableLambda(lambda x: x["history"]),
-        "input": RunnableLambda(lambda x: x["input"]),
-    }
-    | CONDENSE_QUESTION_PROMPT
-    | chat
-    | StrOutputParser()
-)
-
-retrieve = (
-    {"question": condense}
-    | RunnableLambda(lambda x: x["question"])
-    | retriever
-    | RunnableLambda(lambda docs: {"context": format_docs(docs)})
-)
-
-rag = (
-    RunnableParallel(
-        context=RunnableLambda(lambda x: x.get("context")),
-        question=condense,
-    )
-    | RAG_PROMPT
-    | chat
-    | StrOutputParser()
-)
-
+condense = CONDENSE_QUESTION_PROMPT | chat | StrOutputParser()
+
+
+def condense_question(x: dict) -> str:
+    """Rephrase the follow-up once per turn; the result feeds retrieval and the answer."""
+    if SKIP_CONDENSE_ON_EMPTY_HISTORY and not x["history"].strip():
+        return x["input"]
+    started = time.perf_counter()
+    try:
+        return condense.invoke({"history": x["history"], "input": x["input"]})
+    finally:
+        record_call("condense", time.perf_counter() - started)
+
+
+def embed_question(question: str):
+    started = time.perf_counter()
+    try:
+        return vector_store.embeddings.embed_query(question)
+    finally:
+        record_call("embed", time.perf_counter() - started)
+
+
+def retrieve_context(question: str, vector, hints=None) -> str:
+    """Top-k search, narrowed by crop/season/location payload filters when known."""
+    started = time.perf_counter()
+    try:
+        docs = search_with_relaxation(
+            searcher(question, vector), hints or {}, RETRIEVAL_K
+        )
+    finally:
+        record_call("retrieve", time.perf_counter() - started)
+    return format_docs(docs)
+
+
+def retrieval_hints(question: str, config) -> dict:
+    if not RETRIEVAL_FILTERS_ENABLED:
+        return {}
+    session_id = (config or {}).get("configurable", {}).get("session_id")
+    try:
+        return metadata_hints.hints(question, user_location(session_id))
+    except Exception as e:
+        logger.warning("Retrieval hints unavailable: %s", e)
+        return {}
+
+
+rag = RAG_PROMPT | chat | StrOutputParser()
+
+
+def answer(inputs, config):
+    """Answer from the semantic cache, or retrieve + generate and cache the result.
+
+    The condensed question is embedded once; the same vector serves the
+    cache lookup and the Qdrant search. Cached answers are scoped by the
+    retrieval hints, so a user in another district (whose search is
+    filtered differently) never gets this one's answer. Chunks are passed
+    through as they arrive so streaming still works end to end.
+    """
+    x = {}
+    for chunk in inputs:
+        x.update(chunk)
+
+    vector = embed_question(x["question"])
+    hints = retrieval_hints(x["question"], config)
+    scope = scope_key(hints)
+    if ANSWER_CACHE_ENABLED:
+        cached = answer_cache.lookup(vector, scope=scope)
+        if cached is not None:
+            yield cached
+            return
+
+    x["context"] = retrieve_context(x["question"], vector, hints)
+    parts = []
+    try:
+        for chunk in rag.stream(x, config):
+            parts.append(chunk)
+            yield chunk
+    except LLMUnavailable:
+        # The endpoint is down: answer from a similar past question if any.
+        cached = (
+            answer_cache.lookup(vector, FALLBACK_THRESHOLD, scope) if ANSWER_CACHE_ENABLED else None
+        )
+        if cached is None:
+            raise
+        logger.info("LLM unavailable, answering from a similar cached question")
+        yield cached
+        return
+
+    if ANSWER_CACHE_ENABLED:
+        prompt_tokens = estimate_tokens(x["context"]) + estimate_tokens(x["question"])
+        answer_cache.store(vector, "".join(parts), prompt_tokens, scope)
+
+
+# Each step adds one key to the turn dict, so the condensed question is
+# computed exactly once and reused by the cache, retrieval and the answer prompt.
 chain = (
-    RunnableParallel(
-        history=RunnableLambda(lambda x: x.get("history", "")),
-        input=RunnablePassthrough(),
-    )
-    | RunnableParallel(
-        context=retrieve,
-        input=RunnableLambda(lambda x: x["input"]),
-        history=RunnableLambda(lambda x: x["history"]),  # <-- keep history alive
+    RunnablePassthrough.assign(
+        history=RunnableLambda(lambda x: format_history(x.get("history", [])))
     )
-    | RunnableLambda(
-        lambda x: {
-            "history": x["history"],  # type: ignore
-            "context": x["context"],  # type: ignore
-            "input": x["input"],  # type: ignore
-        }
-    )
-    | rag
+    | RunnablePassthrough.assign(question=RunnableLambda(condense_question))
+    | RunnableGenerator(answer)
 )
 
-with_history = RunnableWithMessageHistory(
-    chain,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="history",
-    output_messages_key="answer",
-)
+with_history = with_message_history(chain, session_store)
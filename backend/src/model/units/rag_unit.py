@@ -1,31 +1,35 @@
-import os
-from langchain_qdrant import QdrantVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-from qdrant_client import QdrantClient
-
+import logging
+import time
 
-MODEL_NAME = os.getenv("CHAT_MODEL")
-HF_TOKEN = os.getenv("HF_TOKEN")
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient
 
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
-COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "agriculture_knowledge")
-EMBEDDING_MODEL = "BAAI/bge-large-en"
+from metrics import registry
+from ..qdrant.embedding_backend import (
+    EMBEDDING_MODEL,
+    RETRIEVAL_MODE,
+    SPARSE_VECTOR_NAME,
+    embedding_dimension,
+    load_embeddings,
+    load_sparse_embeddings,
+)
+from ..qdrant.vector_backend import (
+    COLLECTION_NAME,
+    describe,
+    make_client,
+)
+from .embedding_unit import BatchingEmbeddings
+from .trace import startup_phase
 
 
-if not HF_TOKEN:
-    raise ValueError(
-        "Please set the HF_TOKEN environment variable to your Hugging Face API token."
-    )
-if not QDRANT_URL:
-    raise ValueError(
-        "Please set the QDRANT_URL environment variable to your Qdrant URL."
-    )
 if not COLLECTION_NAME:
     raise ValueError(
         "Please set the COLLECTION_NAME environment variable to your collection name."
     )
 
 
+logger = logging.getLogger(__name__)
+
 GREETINGS = [
     "hi",
     "hello",
@@ -36,22 +40,89 @@ GREETINGS = [
     "good evening",
 ]
 
-
-
-# Initialize embeddings
-embeddings = HuggingFaceEmbeddings(
-    model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"}
-)
-
-# Create Qdrant client
-qdrant_client = QdrantClient(url=QDRANT_URL, prefer_grpc=False)
-
-# Connect to existing vector store
-vector_store = QdrantVectorStore(
-    client=qdrant_client, collection_name=COLLECTION_NAME, embedding=embeddings
-)
-
- 
-
-
-
+MISSING_COLLECTION_RETRY_SECONDS = 0.5
+
+
+
+def check_collection_dimension(client: QdrantClient, dimension: int):
+    """Fail fast if the collection was built with a different embedding model."""
+    vectors = client.get_collection(COLLECTION_NAME).config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors.get("") or next(iter(vectors.values()))
+    if vectors.size != dimension:  # type: ignore
+        raise ValueError(
+            f"Collection '{COLLECTION_NAME}' stores {vectors.size}-d vectors but "  # type: ignore
+            f"EMBEDDING_MODEL={EMBEDDING_MODEL} produces {dimension}-d vectors. "
+            "Re-run qdrant/processor.py with the same EMBEDDING_MODEL."
+        )
+
+
+# Initialize embeddings; concurrent queries share one batched forward pass
+with startup_phase("embeddings"):
+    base_embeddings = load_embeddings()
+    embeddings = BatchingEmbeddings(base_embeddings)
+    for histogram in (embeddings.batch_sizes, embeddings.batch_seconds, embeddings.query_seconds):
+        registry.register(histogram)
+
+with startup_phase("vector_store"):
+    # Create Qdrant client (HTTP, gRPC or embedded; see qdrant/vector_backend.py)
+    qdrant_client = make_client()
+    logger.info("Vector backend: %s", describe())
+    check_collection_dimension(qdrant_client, embedding_dimension(base_embeddings))
+
+    # Connect to existing vector store. In hybrid mode each query sends a dense
+    # and a BM25 prefetch in one request and Qdrant fuses them with RRF.
+    if RETRIEVAL_MODE == "hybrid":
+        vector_store = QdrantVectorStore(
+            client=qdrant_client,
+            collection_name=COLLECTION_NAME,
+            embedding=embeddings,
+            sparse_embedding=load_sparse_embeddings(),
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+            retrieval_mode=RetrievalMode.HYBRID,
+        )
+    else:
+        vector_store = QdrantVectorStore(
+            client=qdrant_client, collection_name=COLLECTION_NAME, embedding=embeddings
+        )
+
+def is_missing_collection(error: Exception) -> bool:
+    # The HTTP, gRPC and embedded clients all word it "... not found ...".
+    message = str(error)
+    return COLLECTION_NAME in message and "not found" in message.lower()
+
+
+def retry_missing_collection(search):
+    """Retry a search once if COLLECTION_NAME does not resolve.
+
+    processor.py's one-off move from a plain collection to an alias deletes
+    the collection right before it creates the alias; a search landing
+    between the two calls gets the new collection on the retry.
+    """
+
+    def run(k, filter):
+        try:
+            return search(k, filter)
+        except Exception as e:
+            if not is_missing_collection(e):
+                raise
+            logger.warning("Collection %s not found, retrying once", COLLECTION_NAME)
+            time.sleep(MISSING_COLLECTION_RETRY_SECONDS)
+            return search(k, filter)
+
+    return run
+
+
+def searcher(question: str, vector):
+    """``search(k, filter)`` for the configured retrieval mode.
+
+    Dense search reuses the already computed question vector; hybrid search
+    needs the text for the sparse side, and its dense embed is a cache hit.
+    """
+    if RETRIEVAL_MODE == "hybrid":
+        return retry_missing_collection(
+            lambda k, filter: vector_store.similarity_search(question, k=k, filter=filter)
+        )
+    return retry_missing_collection(
+        lambda k, filter: vector_store.similarity_search_by_vector(vector, k=k, filter=filter)
+    )
@@ -0,0 +1,328 @@
+"""Deadlines, retries, hedged requests and a circuit breaker for LLM calls.
+
+Every chat_completion made by runner_unit goes through ``guard``:
+
+* deadline: a call, retries included, must return (for streams: produce its
+  first token) within LLM_DEADLINE_SECONDS. The HTTP client's own timeout
+  (LLM_TIMEOUT_SECONDS) bounds every silence on the socket, and a stream is
+  cut after LLM_STREAM_MAX_SECONDS, so no turn can hang on the endpoint.
+* retries: connection errors, timeouts and 408/425/429/5xx answers are
+  retried up to LLM_MAX_RETRIES times with full-jitter exponential backoff,
+  as long as the deadline allows. Streams are only retried before their
+  first token.
+* hedging (LLM_HEDGE=true): when an attempt has not answered after the p95
+  of recent latencies (never less than LLM_HEDGE_MIN_DELAY) a second one is
+  sent, and whichever answers first wins.
+* circuit breaker: after LLM_BREAKER_FAILURES failed calls in a row, calls
+  fail at once with ``LLMUnavailable`` for LLM_BREAKER_RESET_SECONDS; then a
+  single probe is let through to close it again.
+
+Attempts run on a persistent thread pool; huggingface_hub keeps one
+requests.Session per thread, so keep-alive connections are reused across
+calls. ``LLMUnavailable`` is turned into a fallback answer by the callers
+(memory_unit, model.py, chat/route.py).
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from huggingface_hub.errors import InferenceTimeoutError
+
+from metrics import ENABLED as METRICS_ENABLED, registry
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+DEADLINE = float(os.getenv("LLM_DEADLINE_SECONDS", "25"))
+STREAM_MAX_SECONDS = float(os.getenv("LLM_STREAM_MAX_SECONDS", "120"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+CALL_THREADS = int(os.getenv("LLM_CALL_THREADS", "32"))
+FALLBACK_MESSAGE = os.getenv("LLM_FALLBACK_MESSAGE") or (
+    "Sorry, the advisor is not available right now. Please try again in a few minutes."
+)
+
+RETRY_BACKOFF_CAP = 8.0
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    InferenceTimeoutError,
+    TimeoutError,
+)
+# Hedge after the p95 only once it is measured on enough calls.
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class LLMUnavailable(Exception):
+    """The endpoint kept failing or timing out, or the circuit is open."""
+
+
+class LLMBusy(LLMUnavailable):
+    """No local LLM slot freed up in time (llm_backend.SlotScheduler).
+
+    Raised before the guard is entered: it is not retried and does not
+    count towards the circuit breaker, since the endpoint is healthy.
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("LLM circuit closed")
+            self.state = self.CLOSED
+            self._consecutive = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._consecutive >= self.failures
+            ):
+                if self.state == self.CLOSED:
+                    self.opened += 1
+                    logger.warning(
+                        "LLM circuit open after %s failed calls; failing fast for %.0fs",
+                        self._consecutive, self.reset_seconds,
+                    )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Recent successful latencies, for the hedging delay."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+def _close_stream(future):
+    # A hedged stream that lost the race: drop its connection.
+    if not future.cancelled() and future.exception() is None:
+        _, deltas = future.result()
+        deltas.close()
+
+
+def _first_delta(deltas):
+    return next(deltas, None), deltas
+
+
+class LLMGuard:
+    def __init__(self, deadline=DEADLINE, max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF,
+                 hedge=HEDGE, hedge_min_delay=HEDGE_MIN_DELAY, stream_max_seconds=STREAM_MAX_SECONDS,
+                 breaker=None, threads=CALL_THREADS):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.stream_max_seconds = stream_max_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="llm-call")
+        self._call_latency = LatencyWindow()
+        self._first_token_latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "ok": 0,
+            "failed": 0,
+            "rejected": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "truncated_streams": 0,
+        }
+
+    def _count(self, event: str):
+        with self._lock:
+            self._stats[event] += 1
+        if METRICS_ENABLED:
+            llm_events.inc(event)
+
+    def hedge_delay(self, window: LatencyWindow) -> float:
+        p95 = window.p95()
+        return self.hedge_min_delay if p95 is None else max(self.hedge_min_delay, p95)
+
+    def call(self, attempt):
+        """``attempt()`` under the deadline, retries, hedging and the breaker."""
+        return self._call(attempt, self._call_latency, None)
+
+    def stream(self, open_stream):
+        """Yield the text deltas of ``open_stream()``, guarded up to the first one."""
+        first, deltas = self._call(
+            lambda: _first_delta(open_stream()), self._first_token_latency, _close_stream
+        )
+        try:
+            if first is None:
+                return
+            yield first
+            cut_at = time.monotonic() + self.stream_max_seconds
+            for delta in deltas:
+                yield delta
+                if time.monotonic() > cut_at:
+                    logger.warning("LLM stream cut after %.0fs", self.stream_max_seconds)
+                    self._count("truncated_streams")
+                    break
+        except Exception as e:
+            # Retrying now would repeat text the client already has; end the
+            # answer where it stopped instead.
+            if not is_retryable(e):
+                raise
+            logger.warning("LLM stream broke after the first token: %s", e)
+            self._count("truncated_streams")
+            self.breaker.failure()
+        finally:
+            deltas.close()
+
+    def _call(self, attempt, window, discard):
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailable("LLM circuit breaker is open")
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for retry in range(self.max_retries + 1):
+            if retry:
+                pause = random.uniform(0, min(RETRY_BACKOFF_CAP, self.backoff * 2 ** (retry - 1)))
+                if time.monotonic() + pause >= deadline:
+                    break
+                time.sleep(pause)
+                self._count("retries")
+            try:
+                result = self._attempt(attempt, deadline, window, discard)
+            except Exception as e:
+                error = e
+                if isinstance(e, TimeoutError):
+                    self._count("timeouts")
+                if not is_retryable(e):
+                    # The endpoint is up and refused this request (e.g. 400
+                    # for a bad prompt): retrying will not help, and it is
+                    # not an outage.
+                    self.breaker.success()
+                    self._count("failed")
+                    raise
+                logger.warning("LLM attempt %s failed: %s: %s", retry + 1, type(e).__name__, e)
+                continue
+            self.breaker.success()
+            self._count("ok")
+            return result
+        self.breaker.failure()
+        self._count("failed")
+        raise LLMUnavailable(f"LLM call failed: {type(error).__name__}: {error}") from error
+
+    def _attempt(self, attempt, deadline, window, discard):
+        first = self._executor.submit(attempt)
+        submitted = {first: time.monotonic()}
+        hedge_at = submitted[first] + self.hedge_delay(window) if self.hedge else None
+        futures = [first]
+        error = None
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                self._abandon(futures, discard)
+                raise TimeoutError(f"LLM call exceeded its {self.deadline:.0f}s deadline")
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(futures, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    self._abandon(futures, discard)
+                    window.add(time.monotonic() - submitted[future])
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if hedge_at is not None and futures and time.monotonic() >= hedge_at:
+                hedge_at = None
+                self._count("hedged")
+                hedge = self._executor.submit(attempt)
+                submitted[hedge] = time.monotonic()
+                futures.append(hedge)
+        raise error
+
+    @staticmethod
+    def _abandon(futures, discard):
+        # Running attempts cannot be interrupted; the HTTP timeout ends them.
+        for future in futures:
+            if not future.cancel() and discard is not None:
+                future.add_done_callback(discard)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        p95 = self._call_latency.p95()
+        stats.update(
+            circuit=self.breaker.state,
+            circuit_opened=self.breaker.opened,
+            call_p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+        )
+        return stats
+
+
+llm_events = registry.counter(
+    "llm_events_total", "LLM calls by outcome, plus retries, hedges and cut streams.", ["event"]
+)
+guard = LLMGuard()
+
+registry.register_collector(
+    "llm_circuit_open", "gauge", "1 while the LLM circuit breaker fails calls fast.",
+    lambda: int(guard.breaker.state != CircuitBreaker.CLOSED),
+)
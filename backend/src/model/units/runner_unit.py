@@ -1,33 +1,40 @@
-import os
-from typing import Optional, Any
+import asyncio
+import time
+from typing import Optional, Any, AsyncIterator, Iterator
 from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.prompt_values import StringPromptValue
-from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
 
+# Before the imports below: they read LLM_* and CHAT_MODEL at import time.
 load_dotenv()
 
-MODEL_NAME: Optional[str] = os.getenv("CHAT_MODEL")
-HF_TOKEN: Optional[str] = os.getenv("HF_TOKEN")
+from metrics import registry  # noqa: E402
+from .llm_backend import ChatBackend, SlotScheduler, make_backend  # noqa: E402
+from .resilience_unit import guard  # noqa: E402
+from .trace import mark_first_token, record_call, startup_phase  # noqa: E402
 
-if not MODEL_NAME:
-    raise EnvironmentError("CHAT_MODEL environment variable is not set")
-if not HF_TOKEN:
-    raise EnvironmentError("HF_TOKEN environment variable is not set")
+with startup_phase("llm_client"):
+    backend = make_backend()
 
-client = InferenceClient(model=MODEL_NAME, token=HF_TOKEN)
+scheduler: Optional[SlotScheduler] = getattr(backend, "scheduler", None)
+if scheduler is not None:
+    registry.register(scheduler.batch_sizes)
+    registry.register(scheduler.wait_seconds)
+    registry.register_collector(
+        "llm_batch_sequences", "gauge", "Local LLM completions in flight or waiting for a slot.",
+        lambda: {k: v for k, v in scheduler.stats().items() if k in ("in_flight", "waiting")},
+        label="state",
+    )
 
 
-class HuggingFaceRunnable(Runnable):
-    def __init__(self, client: InferenceClient):
-        self.client = client
+class LLMRunnable(Runnable):
+    """LangChain Runnable over the configured ChatBackend (see llm_backend.py)."""
 
-    def invoke(
-        self,
-        input: Any,
-        config: Optional[RunnableConfig] = None,
-        **kwargs: Any,
-    ) -> str:
+    def __init__(self, backend: ChatBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _prompt_text(input: Any) -> str:
         # --- Normalize LangChain inputs ---
         if isinstance(input, StringPromptValue):
             input = input.to_string()
@@ -38,23 +45,60 @@ class HuggingFaceRunnable(Runnable):
         if not input.strip():
             raise ValueError("Prompt text cannot be empty")
 
-        # Call Hugging Face API
-        response = self.client.chat_completion(
-            messages=[{"role": "user", "content": input}],
-            max_tokens=1024,
-            stream=False,
-        )
+        return input
+
+    def invoke(
+        self,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> str:
+        input = self._prompt_text(input)
+
+        started = time.perf_counter()
+        try:
+            with self.backend.admit():
+                return guard.call(lambda: self.backend.complete(input))
+        finally:
+            record_call("llm", time.perf_counter() - started)
+
+    def stream(
+        self,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """Yield the completion as token deltas while the endpoint generates it."""
+        input = self._prompt_text(input)
 
-        # --- Normalize response ---
-        if isinstance(response, dict) and "choices" in response:
-            try:
-                return response["choices"][0]["message"]["content"].strip()
-            except Exception:
-                pass
-        if isinstance(response, dict) and "generated_text" in response:
-            return response["generated_text"].strip()
+        started = time.perf_counter()
+        first = True
+        try:
+            # The slot is held until the stream is exhausted or closed.
+            with self.backend.admit():
+                for delta in guard.stream(lambda: self.backend.stream(input)):
+                    if first:
+                        mark_first_token()
+                        first = False
+                    yield delta
+        finally:
+            record_call("llm", time.perf_counter() - started)
 
-        raise ValueError(f"Unexpected response format: {response}")
+    async def astream(
+        self,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        # The backends are synchronous; pull each chunk on a worker thread
+        # so the event loop keeps serving other sockets between tokens.
+        iterator = self.stream(input, config, **kwargs)
+        done = object()
+        while True:
+            delta = await asyncio.to_thread(next, iterator, done)
+            if delta is done:
+                break
+            yield delta
 
 
-hf_runnable = HuggingFaceRunnable(client=client)
+llm_runnable = LLMRunnable(backend)
@@ -0,0 +1,339 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    BaseMessage,
+    SystemMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from db import DB_PATH, ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "2000"))
+PERSIST = os.getenv("SESSION_PERSIST", "true").lower() == "true"
+# Several server processes (serve.py): reload from SQLite on every turn,
+# since another worker may have answered this session since we cached it.
+SHARED = os.getenv("SESSION_SHARED", "false").lower() == "true"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prompts.
+    return len(text) // 4 + 1
+
+
+class SessionHistory(BaseChatMessageHistory):
+    """Chat history for one session, trimmed to the store's turn/token budget.
+
+    Messages trimmed off the front are not dropped while a compactor is set:
+    they wait in ``unfolded_messages()`` until the summarizer folds them.
+    """
+
+    def __init__(self, session_id: str, store: "SessionStore", messages=None,
+                 summary: str = "", unfolded=None):
+        self.session_id = session_id
+        self.summary = summary
+        self._store = store
+        self._lock = threading.Lock()
+        self._messages: List[BaseMessage] = list(messages or [])
+        self._unfolded: List[BaseMessage] = list(unfolded or [])
+
+    @property
+    def messages(self) -> List[BaseMessage]:  # type: ignore[override]
+        # The running summary of folded turns leads as a system message.
+        with self._lock:
+            if self.summary:
+                return [SystemMessage(content=self.summary), *self._messages]
+            return list(self._messages)
+
+    def recent_messages(self) -> List[BaseMessage]:
+        """The verbatim messages, without the summary."""
+        with self._lock:
+            return list(self._messages)
+
+    def unfolded_messages(self) -> List[BaseMessage]:
+        """Messages trimmed out of the budget but not yet in the summary."""
+        with self._lock:
+            return list(self._unfolded)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            self._messages.extend(messages)
+            kept = self._store.trim(self._messages)
+            dropped = self._messages[: len(self._messages) - len(kept)]
+            self._messages = kept
+            if dropped and self._store.compactor is not None:
+                self._unfolded = self._store.cap_unfolded(self.session_id, self._unfolded + dropped)
+        self._store.persist(self.session_id, messages)
+        if self._store.compactor is not None:
+            self._store.compactor(self)
+
+    def fold(self, folded: Sequence[BaseMessage], summary: str) -> None:
+        """Replace ``folded`` (oldest messages) with an updated running summary."""
+        folded_ids = {id(m) for m in folded}
+        with self._lock:
+            self._unfolded = [m for m in self._unfolded if id(m) not in folded_ids]
+            drop = 0
+            while drop < len(self._messages) and id(self._messages[drop]) in folded_ids:
+                drop += 1
+            self._messages = self._messages[drop:]
+            self.summary = summary
+            keep = len(self._unfolded) + len(self._messages)
+        self._store.persist_summary(self.session_id, summary, keep)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages = []
+            self._unfolded = []
+            self.summary = ""
+        self._store.forget(self.session_id)
+
+
+class SessionStore:
+    """LRU + TTL cache of SessionHistory handles with SQLite write-through.
+
+    Only ``max_sessions`` histories are kept in memory; idle ones expire
+    after ``ttl`` seconds. With persistence on, every message is written to
+    ``chat_history`` in database.db and a session evicted from memory (or
+    lost to a restart) is reloaded from there on its next turn. With
+    ``shared`` on, SQLite is the source of truth and every ``get`` reloads.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL,
+                 max_turns=MAX_TURNS, max_tokens=MAX_TOKENS,
+                 db_path=DB_PATH, persist=PERSIST, shared=SHARED):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.db_path = db_path
+        self.persist_enabled = persist
+        self.shared = shared and persist
+        # The chat tables live in database.db; share the app's pooled setup.
+        self._pool = ConnectionPool(db_path, create=True)
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> (SessionHistory, last_used)
+        # Called with a SessionHistory after each append; see summary_unit.
+        self.compactor = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "loaded": 0,
+            "evicted_lru": 0,
+            "evicted_ttl": 0,
+        }
+        if self.persist_enabled:
+            self._init_db()
+
+    # ---- persistence ----
+    def _init_db(self):
+        with self._pool.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_history_session "
+                "ON chat_history (session_id, id)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_summary (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """
+            )
+
+    def retained(self) -> int:
+        """Rows kept per session: the budget, plus room for unfolded turns."""
+        if not self.max_turns:
+            return -1  # LIMIT -1: no limit
+        return self.max_turns * 2 * (2 if self.compactor is not None else 1)
+
+    def cap_unfolded(self, session_id: str, unfolded: List[BaseMessage]) -> List[BaseMessage]:
+        # Bounded in case the summarizer keeps failing; past this, the oldest go.
+        limit = self.retained()
+        if limit < 0 or len(unfolded) <= limit // 2:
+            return unfolded
+        logger.warning("Summary is behind for %s; dropping the oldest turns", session_id)
+        return unfolded[len(unfolded) - limit // 2:]
+
+    def _load(self, session_id: str):
+        if not self.persist_enabled:
+            return [], "", []
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT message FROM chat_history WHERE session_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (session_id, self.retained()),
+            ).fetchall()
+            summary = conn.execute(
+                "SELECT summary FROM chat_summary WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        # Rows already folded are deleted with the summary update, so what
+        # does not fit the budget here still has to be summarized.
+        messages = messages_from_dict([json.loads(r[0]) for r in reversed(rows)])
+        kept = self.trim(messages)
+        unfolded = messages[: len(messages) - len(kept)] if self.compactor is not None else []
+        return kept, summary[0] if summary else "", unfolded
+
+    def persist(self, session_id: str, messages: Sequence[BaseMessage]):
+        if not self.persist_enabled or not messages:
+            return
+        now = time.time()
+        try:
+            with self._pool.connection() as conn:
+                conn.executemany(
+                    "INSERT INTO chat_history (session_id, message, created_at) "
+                    "VALUES (?, ?, ?)",
+                    [(session_id, json.dumps(message_to_dict(m)), now) for m in messages],
+                )
+                # Keep only what a reload could ever use.
+                conn.execute(
+                    """
+                    DELETE FROM chat_history WHERE session_id = ? AND id NOT IN (
+                        SELECT id FROM chat_history WHERE session_id = ?
+                        ORDER BY id DESC LIMIT ?
+                    )
+                """,
+                    (session_id, session_id, self.retained()),
+                )
+        except sqlite3.Error as e:
+            logger.error("Failed to persist chat history for %s: %s", session_id, e)
+
+    def persist_summary(self, session_id: str, summary: str, keep: int):
+        """Store the running summary and drop all but the newest ``keep`` rows."""
+        if not self.persist_enabled:
+            return
+        try:
+            with self._pool.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO chat_summary (session_id, summary, updated_at) "
+                    "VALUES (?, ?, ?)",
+                    (session_id, summary, time.time()),
+                )
+                conn.execute(
+                    """
+                    DELETE FROM chat_history WHERE session_id = ? AND id NOT IN (
+                        SELECT id FROM chat_history WHERE session_id = ?
+                        ORDER BY id DESC LIMIT ?
+                    )
+                """,
+                    (session_id, session_id, keep),
+                )
+        except sqlite3.Error as e:
+            logger.error("Failed to persist chat summary for %s: %s", session_id, e)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if not self.persist_enabled:
+            return
+        with self._pool.connection() as conn:
+            conn.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM chat_summary WHERE session_id = ?", (session_id,))
+
+    # ---- budget ----
+    def trim(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Drop the oldest messages beyond max_turns exchanges or max_tokens."""
+        messages = messages[-self.max_turns * 2:] if self.max_turns else messages
+        if self.max_tokens:
+            total = 0
+            keep = 0
+            for message in reversed(messages):
+                total += estimate_tokens(str(message.content))
+                if total > self.max_tokens and keep:
+                    break
+                keep += 1
+            messages = messages[len(messages) - keep:]
+        return messages
+
+    # ---- cache ----
+    def _expire(self, now: float):
+        # Caller holds self._lock. Oldest entries are at the front.
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            self._stats["evicted_ttl"] += 1
+
+    def get(self, session_id: str) -> SessionHistory:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None and not self.shared:
+                self._stats["hits"] += 1
+                self._sessions[session_id] = (entry[0], now)
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+            self._stats["misses"] += 1
+
+        # Load outside the lock so one slow read does not block other users.
+        messages, summary, unfolded = self._load(session_id)
+        history = SessionHistory(session_id, self, messages, summary, unfolded)
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and not self.shared:  # another thread loaded it meanwhile
+                return entry[0]
+            if messages or summary:
+                self._stats["loaded"] += 1
+            self._sessions[session_id] = (history, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evicted_lru"] += 1
+        return history
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = (self._stats["hits"] + self._stats["misses"]) or 1
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "shared": self.shared,
+                "hit_rate": round(self._stats["hits"] / lookups, 3),
+                **self._stats,
+            }
+
+
+def with_message_history(chain, store: SessionStore) -> RunnableWithMessageHistory:
+    """Wrap ``chain`` so each turn reads and appends to ``store``.
+
+    ``chain`` takes {"input", "history"} and returns the answer text. A plain
+    string comes back from the tracer as {"output": ...}, so no
+    output_messages_key is set; naming any other key makes every append fail
+    in a callback, which leaves the history silently empty.
+    """
+    return RunnableWithMessageHistory(
+        chain,
+        store.get,
+        input_messages_key="input",
+        history_messages_key="history",
+    )
+
+
+session_store = SessionStore()
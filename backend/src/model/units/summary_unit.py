@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from .runner_unit import llm_runnable
+
+logger = logging.getLogger(__name__)
+
+# Once a session holds more than SUMMARY_AFTER_TURNS exchanges, everything
+# but the last KEEP_TURNS is folded into the running summary.
+SUMMARY_AFTER_TURNS = int(os.getenv("HISTORY_SUMMARY_AFTER_TURNS", "4"))
+KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "2"))
+SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "1200"))
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    """Update the running summary of a conversation between a farmer and a farming advisor.
+Keep the crop, location, season, problems described and advice already given. Drop greetings and small talk.
+Reply with the updated summary only, in under 150 words.
+
+Current summary:
+{summary}
+
+New lines:
+{lines}"""
+)
+
+summarize = SUMMARY_PROMPT | llm_runnable | StrOutputParser()
+
+# One background worker: summaries are cheap to delay and must never compete
+# with live chat turns for the request path.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+_pending_lock = threading.Lock()
+_pending = set()
+
+
+def format_history(messages) -> str:
+    """Render the session's message list as plain ``Role: text`` lines."""
+    if isinstance(messages, str):
+        return messages
+    lines = []
+    for message in messages or []:
+        if message.type == "system":
+            lines.append(f"Summary of earlier conversation: {message.content}")
+            continue
+        role = "Farmer" if message.type == "human" else "Advisor"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+
+def maybe_compact(history):
+    """Queue a summary update for ``history`` if it has grown past the threshold
+    or the store trimmed turns off its budget."""
+    if (
+        len(history.recent_messages()) <= SUMMARY_AFTER_TURNS * 2
+        and not history.unfolded_messages()
+    ):
+        return
+    with _pending_lock:
+        if history.session_id in _pending:
+            return
+        _pending.add(history.session_id)
+    _executor.submit(_compact, history)
+
+
+def _compact(history):
+    try:
+        recent = history.recent_messages()
+        folded = history.unfolded_messages() + recent[: max(0, len(recent) - KEEP_TURNS * 2)]
+        if not folded:
+            return
+        # Incremental: only the newly folded turns are sent, on top of the
+        # previous summary, so the prompt stays small however long the chat.
+        summary = summarize.invoke(
+            {
+                "summary": history.summary or "(none yet)",
+                "lines": format_history(folded),
+            }
+        )
+        history.fold(folded, summary[:SUMMARY_MAX_CHARS])
+    except Exception:
+        logger.exception("History summary failed for %s", history.session_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(history.session_id)
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from metrics import ENABLED as METRICS_ENABLED, chat_ttft, chat_turn_latency, observe_stage
+
+logger = logging.getLogger(__name__)
+
+# The active turn is carried in a ContextVar so LangChain's parallel branches
+# (which copy the context into their worker threads) record into the same trace.
+_current_turn: ContextVar[Optional["TurnTrace"]] = ContextVar(
+    "current_turn", default=None
+)
+
+_totals_lock = threading.Lock()
+_totals = {
+    "turns": 0,
+    "llm_calls": 0,
+    "llm_seconds": 0.0,
+    "turn_seconds": 0.0,
+    "streamed_turns": 0,
+    "ttft_turns": 0,
+    "ttft_seconds": 0.0,
+}
+
+
+class TurnTrace:
+    """Collects the remote calls made while answering a single chat turn."""
+
+    def __init__(self, session_id: str, mode: str = "invoke"):
+        self.session_id = session_id
+        self.mode = mode  # "invoke" or "stream"
+        self.started = time.perf_counter()
+        self.calls = []  # (name, seconds)
+        self.first_token = None  # seconds from turn start, streaming only
+
+    def record(self, name: str, seconds: float):
+        self.calls.append((name, seconds))
+
+    def count(self, name: str) -> int:
+        return sum(1 for n, _ in self.calls if n == name)
+
+    def seconds(self, name: str) -> float:
+        return sum(s for n, s in self.calls if n == name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "llm_calls": self.count("llm"),
+            "llm_ms": round(self.seconds("llm") * 1000, 1),
+            "embed_ms": round(self.seconds("embed") * 1000, 1),
+            "retrieve_ms": round(self.seconds("retrieve") * 1000, 1),
+            "ttft_ms": (
+                round(self.first_token * 1000, 1)
+                if self.first_token is not None
+                else None
+            ),
+            "total_ms": round(self.elapsed() * 1000, 1),
+        }
+
+
+def record_call(name: str, seconds: float):
+    """Attach a timed call to the current turn, if one is being traced.
+
+    Every call also lands in the chat_stage_duration_seconds histogram.
+    """
+    observe_stage(name, seconds)
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.record(name, seconds)
+
+
+def mark_first_token():
+    """Record time-to-first-token for the current turn (first call wins).
+
+    Only streamed turns have one: an invoked turn's answer also runs
+    through the LLM's stream, but nobody sees it before the last token.
+    """
+    turn = _current_turn.get()
+    if turn is not None and turn.mode == "stream" and turn.first_token is None:
+        turn.first_token = turn.elapsed()
+
+
+@contextmanager
+def trace_turn(session_id: str, mode: str = "invoke"):
+    """Trace every call made while answering one turn and log a summary."""
+    turn = TurnTrace(session_id, mode)
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+        summary = turn.summary()
+        with _totals_lock:
+            _totals["turns"] += 1
+            _totals["llm_calls"] += summary["llm_calls"]
+            _totals["llm_seconds"] += turn.seconds("llm")
+            _totals["turn_seconds"] += turn.elapsed()
+            if turn.mode == "stream":
+                _totals["streamed_turns"] += 1
+            if turn.first_token is not None:
+                _totals["ttft_turns"] += 1
+                _totals["ttft_seconds"] += turn.first_token
+        if METRICS_ENABLED:
+            chat_turn_latency.observe(turn.elapsed(), turn.mode)
+            if turn.first_token is not None:
+                chat_ttft.observe(turn.first_token)
+        logger.info(
+            "turn session=%s mode=%s llm_calls=%d llm_ms=%.1f embed_ms=%.1f retrieve_ms=%.1f ttft_ms=%s total_ms=%.1f",
+            summary["session_id"],
+            summary["mode"],
+            summary["llm_calls"],
+            summary["llm_ms"],
+            summary["embed_ms"],
+            summary["retrieve_ms"],
+            summary["ttft_ms"],
+            summary["total_ms"],
+        )
+
+
+def trace_stats() -> dict:
+    """Aggregate call counts across all traced turns since startup."""
+    with _totals_lock:
+        turns = _totals["turns"] or 1
+        timed = _totals["ttft_turns"] or 1
+        return {
+            "turns": _totals["turns"],
+            "llm_calls": _totals["llm_calls"],
+            "llm_calls_per_turn": round(_totals["llm_calls"] / turns, 2),
+            "avg_llm_ms": round(_totals["llm_seconds"] / turns * 1000, 1),
+            "avg_turn_ms": round(_totals["turn_seconds"] / turns * 1000, 1),
+            "streamed_turns": _totals["streamed_turns"],
+            "avg_ttft_ms": round(_totals["ttft_seconds"] / timed * 1000, 1),
+        }
+
+
+# Startup phases (imports, model loading, connections) in completion order.
+_startup_lock = threading.Lock()
+_startup = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    """Time one startup phase; shows up in the log and in startup_stats()."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = round((time.perf_counter() - started) * 1000, 1)
+        with _startup_lock:
+            _startup[name] = ms
+        logger.info("Startup phase %s: %.1f ms", name, ms)
+
+
+def startup_stats() -> dict:
+    with _startup_lock:
+        return dict(_startup)
@@ -1,68 +1,15 @@
 from flask import Blueprint, jsonify, request
 import sqlite3
-import os
 import logging
-from contextlib import contextmanager
-from functools import wraps
+from db import get_db_connection, handle_database_errors
+from http_cache import cached
 
 user_bp = Blueprint("user", __name__)
 
-# Configuration
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database.db")
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections with automatic cleanup"""
-    conn = None
-    try:
-        if not os.path.exists(DB_PATH):
-            logger.error(f"Database file not found: {DB_PATH}")
-            raise FileNotFoundError(f"Database file not found: {DB_PATH}")
-        
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        
-        # Enable foreign key constraints
-        conn.execute("PRAGMA foreign_keys = ON")
-        
-        yield conn
-    except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        if conn:
-            conn.rollback()
-        raise
-    finally:
-        if conn:
-            conn.close()
-
-def handle_database_errors(f):
-    """Decorator to handle database errors gracefully"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            return f(*args, **kwargs)
-        except FileNotFoundError as e:
-            logger.error(f"Database file error: {e}")
-            return jsonify({"error": "Database unavailable"}), 503
-        except sqlite3.Error as e:
-            logger.error(f"Database error: {e}")
-            return jsonify({"error": "Database error occurred"}), 500
-        except Exception as e:
-            logger.error(f"Unexpected error in {f.__name__}: {e}")
-            return jsonify({"error": "Internal server error"}), 500
-    return decorated_function
-
-
-
 # login ep
 @user_bp.route("/login", methods=["POST"])
 @handle_database_errors
@@ -116,6 +63,7 @@ def validate_user_id(user_id):
 
 
 @user_bp.route("/<int:user_id>", methods=["GET"])
+@cached("user", private=True)
 @handle_database_errors
 def get_user(user_id):
     # Input validation
@@ -130,10 +78,11 @@ def get_user(user_id):
             
             if user:
                 user_data = dict(user)
-                logger.info(f"Successfully retrieved user {user_id}")
+                # Hot path: lazy formatting, and only when debug logging is on.
+                logger.debug("Retrieved user %s", user_id)
                 return jsonify(user_data), 200
             else:
-                logger.info(f"User not found: {user_id}")
+                logger.debug("User not found: %s", user_id)
                 return jsonify({"error": "User not found"}), 404
     except sqlite3.Error as e:
         logger.error(f"Database error occurred while retrieving user {user_id}: {e}")
@@ -0,0 +1,228 @@
+"""Video files on disk: the listings served by GET /videos/ and ranged reads.
+
+Layout under ``videos/files`` (HLS and thumbnails are written by
+``package_videos.py``):
+
+    sample1.mp4
+    hls/sample1/master.m3u8, hls/sample1/<rendition>/index.m3u8 + segments
+    hls/sample1/meta.json     renditions, written last
+    thumbs/sample1.jpg
+
+GET /videos/ keeps its original shape, a list of MP4 URLs; the full
+manifest (size, duration, poster, renditions) is GET /videos/manifest.
+Both are rebuilt only when a video, poster or meta.json is added, removed
+or rewritten (name, mtime and size), checked at most every STAT_INTERVAL
+seconds.
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+from flask import Response, request
+
+from http_cache import Entry, make_etag
+from json_provider import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), "files")
+HLS_FOLDER = os.path.join(VIDEO_FOLDER, "hls")
+THUMB_FOLDER = os.path.join(VIDEO_FOLDER, "thumbs")
+URL_PREFIX = "/videos"
+
+STAT_INTERVAL = 2.0
+CHUNK_SIZE = 256 * 1024
+
+MIMETYPES = {
+    ".mp4": "video/mp4",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".jpg": "image/jpeg",
+}
+
+
+def mp4_duration(path: str) -> Optional[float]:
+    """Seconds from the movie header (moov/mvhd); None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset + 8 <= end:
+                f.seek(offset)
+                size, kind = struct.unpack(">I4s", f.read(8))
+                header = 8
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                    header = 16
+                elif size == 0:
+                    size = end - offset
+                if size < header:
+                    return None
+                if kind == b"moov":
+                    # Descend into the movie box.
+                    end = offset + size
+                    offset += header
+                    continue
+                if kind == b"mvhd":
+                    version = f.read(4)[0]
+                    if version == 1:
+                        timescale, duration = struct.unpack(">16xIQ", f.read(28))
+                    else:
+                        timescale, duration = struct.unpack(">8xII", f.read(16))
+                    return round(duration / timescale, 3) if timescale else None
+                offset += size
+    except (OSError, struct.error, IndexError) as e:
+        logger.warning("Could not read duration of %s: %s", path, e)
+    return None
+
+
+class VideoLibrary:
+    """Cached manifest of the video folder."""
+
+    def __init__(self, folder=VIDEO_FOLDER, hls_folder=HLS_FOLDER, thumb_folder=THUMB_FOLDER):
+        self.folder = folder
+        self.hls_folder = hls_folder
+        self.thumb_folder = thumb_folder
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked = 0.0
+        self._entries: Optional[tuple] = None
+
+    def _files(self, folder, suffix):
+        try:
+            with os.scandir(folder) as entries:
+                return sorted(
+                    (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                    for e in entries
+                    if e.name.endswith(suffix) and e.is_file()
+                )
+        except OSError:
+            return []
+
+    def _meta(self, stem):
+        try:
+            stat = os.stat(os.path.join(self.hls_folder, stem, "meta.json"))
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _current_signature(self):
+        # File-level, not directory mtimes: replacing a video in place
+        # changes neither its directory nor the list of names.
+        videos = self._files(self.folder, ".mp4")
+        return (
+            videos,
+            self._files(self.thumb_folder, ".jpg"),
+            tuple(self._meta(name[: -len(".mp4")]) for name, _, _ in videos),
+        )
+
+    def _renditions(self, stem):
+        try:
+            with open(os.path.join(self.hls_folder, stem, "meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, []
+        base = f"{URL_PREFIX}/hls/{stem}"
+        renditions = [
+            {
+                "name": r["name"],
+                "width": r.get("width"),
+                "height": r.get("height"),
+                "bandwidth": r.get("bandwidth"),
+                "url": f"{base}/{r['name']}/index.m3u8",
+            }
+            for r in meta.get("renditions", [])
+        ]
+        return f"{base}/master.m3u8", renditions
+
+    def _build(self) -> list:
+        videos = []
+        with os.scandir(self.folder) as entries:
+            files = sorted(
+                (e for e in entries if e.is_file() and e.name.endswith(".mp4")),
+                key=lambda e: e.name,
+            )
+        for entry in files:
+            stem = entry.name[: -len(".mp4")]
+            hls, renditions = self._renditions(stem)
+            poster = os.path.join(self.thumb_folder, f"{stem}.jpg")
+            videos.append(
+                {
+                    "name": stem,
+                    "url": f"{URL_PREFIX}/{entry.name}",
+                    "size": entry.stat().st_size,
+                    "duration": mp4_duration(entry.path),
+                    "poster": f"{URL_PREFIX}/thumbs/{stem}.jpg" if os.path.isfile(poster) else None,
+                    "hls": hls,
+                    "renditions": renditions,
+                }
+            )
+        return videos
+
+    def _refresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._entries is not None and now - self._checked < STAT_INTERVAL:
+                return self._entries
+            self._checked = now
+            signature = self._current_signature()
+            if self._entries is None or signature != self._signature:
+                videos = self._build()
+                self._signature = signature
+                self._entries = (
+                    self._entry(dumps_bytes([v["url"] for v in videos]), now),
+                    self._entry(dumps_bytes({"videos": videos}), now),
+                )
+                logger.info("Video manifest rebuilt: %s videos", len(videos))
+            return self._entries
+
+    def _entry(self, body: bytes, now: float) -> Entry:
+        return Entry(body, "application/json", make_etag(body), time.time(), now, "videos")
+
+    def listing(self) -> Entry:
+        """The serialized list of MP4 URLs."""
+        return self._refresh()[0]
+
+    def manifest(self) -> Entry:
+        """The serialized manifest, rebuilt only after the files change."""
+        return self._refresh()[1]
+
+
+library = VideoLibrary()
+
+
+def send_range(path: str, start: int, length: int, size: int, mimetype: str, headers: dict) -> Response:
+    """206 for bytes [start, start + length) of ``path``.
+
+    Under gunicorn the body is the server's ``wsgi.file_wrapper`` on a file
+    positioned at ``start``: gunicorn sends exactly Content-Length bytes from
+    there with sendfile(2). Other servers get a bounded chunk generator.
+    """
+    f = open(path, "rb")
+    f.seek(start)
+    headers = {
+        **headers,
+        "Content-Range": f"bytes {start}-{start + length - 1}/{size}",
+        "Content-Length": str(length),
+    }
+    if request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn"):
+        body = request.environ["wsgi.file_wrapper"](f, CHUNK_SIZE)
+    else:
+        def chunks():
+            try:
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            finally:
+                f.close()
+        body = chunks()
+    return Response(body, status=206, mimetype=mimetype, headers=headers, direct_passthrough=True)
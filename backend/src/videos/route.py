@@ -1,17 +1,74 @@
 import os
-from flask import Blueprint, jsonify, send_from_directory
+from flask import Blueprint, Response, jsonify, request, send_file
+from werkzeug.security import safe_join
+from http_cache import conditional_response
+from .library import MIMETYPES, VIDEO_FOLDER, library, send_range
 
 videos_bp = Blueprint('videos', __name__)
 
-VIDEO_FOLDER = os.path.join(os.path.dirname(__file__), "files")
+# Behind nginx, set to an internal location aliased to videos/files (e.g.
+# "/_videos/") and nginx serves the bytes, ranges included, with sendfile.
+ACCEL_REDIRECT = os.getenv("VIDEO_ACCEL_REDIRECT", "")
+SEGMENT_MAX_AGE = int(os.getenv("VIDEO_SEGMENT_MAX_AGE", "86400"))
+
 
 @videos_bp.route("/")
 def list_videos():
-    files = os.listdir(VIDEO_FOLDER)
-    
-    video_files = [f for f in files if os.path.isfile(os.path.join(VIDEO_FOLDER, f)) and f.endswith('.mp4')]
-    return jsonify([f"/videos/{filename}" for filename in video_files])
+    """URL of every MP4, as the app has always read it."""
+    return conditional_response(library.listing(), private=False)
+
+
+@videos_bp.route("/manifest")
+def video_manifest():
+    """Manifest of every video: size, duration, poster and HLS renditions."""
+    return conditional_response(library.manifest(), private=False)
+
 
 @videos_bp.route("/<path:filename>")
 def get_video(filename):
-    return send_from_directory(VIDEO_FOLDER, filename)
\ No newline at end of file
+    path = safe_join(VIDEO_FOLDER, filename)
+    mimetype = MIMETYPES.get(os.path.splitext(filename)[1].lower())
+    if path is None or mimetype is None or not os.path.isfile(path):
+        return jsonify({"error": "Video not found"}), 404
+
+    # Segments and posters only change on repackaging; playlists and MP4s
+    # are revalidated with their ETag.
+    if filename.endswith((".ts", ".jpg")):
+        cache_control = f"public, max-age={SEGMENT_MAX_AGE}"
+    else:
+        cache_control = "public, no-cache"
+
+    if ACCEL_REDIRECT:
+        response = Response(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = ACCEL_REDIRECT.rstrip("/") + "/" + filename
+        response.headers["Cache-Control"] = cache_control
+        return response
+
+    stat = os.stat(path)
+    etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    byte_range = request.range
+    if_range = request.if_range
+    # Multiple ranges would need a multipart/byteranges body; RFC 7233 lets
+    # a server ignore Range instead, so those get the whole file.
+    if (
+        byte_range is not None
+        and len(byte_range.ranges) == 1
+        and request.method == "GET"
+        and (if_range.etag is None or if_range.etag == etag)
+        and if_range.date is None
+    ):
+        span = byte_range.range_for_length(stat.st_size)
+        if span is None:
+            return Response(status=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+        start, stop = span
+        headers = {"ETag": f'"{etag}"', "Accept-Ranges": "bytes", "Cache-Control": cache_control}
+        return send_range(path, start, stop - start, stat.st_size, mimetype, headers)
+
+    if byte_range is not None and len(byte_range.ranges) > 1:
+        # send_file parses Range itself and would answer 416.
+        request.environ.pop("HTTP_RANGE", None)
+    # Whole file: conditional GET and HEAD handled by send_file, which hands
+    # the file to the server's wsgi.file_wrapper (sendfile under gunicorn).
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,22 @@
+"""Run from backend/: ``python -m pytest tests``.
+
+The modules under test read their settings from the environment at import
+time, so the overrides below are set before anything from src/ is imported:
+a throwaway database.db, and a local LLM backend pointed at a port nothing
+listens on, so no test can reach a real endpoint.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+_tmp = tempfile.mkdtemp(prefix="farmers-delight-tests-")
+os.environ.update(
+    DATABASE_PATH=os.path.join(_tmp, "database.db"),
+    LLM_BACKEND="openai",
+    LLM_BASE_URL="http://127.0.0.1:9/v1",
+    CHAT_WARMUP="false",
+)
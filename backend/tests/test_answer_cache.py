@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from model.units import cache_unit
+from model.units.cache_unit import SemanticCache
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Two processes' caches over one database.db, as under serve.py."""
+    monkeypatch.setattr(cache_unit, "SYNC_INTERVAL", 0.0)
+    monkeypatch.setattr(cache_unit, "STAMP_CHECK_INTERVAL", 0.0)
+
+    def make(**kwargs):
+        return SemanticCache(
+            stamp_path=str(tmp_path / "index_version"), shared=True,
+            db_path=str(tmp_path / "shared.db"), **kwargs,
+        )
+
+    return make
+
+
+def test_answer_stored_by_one_worker_serves_another(workers):
+    a, b = workers(), workers()
+    a.store([1.0, 0.0], "Spray neem oil.", scope="District=Nadia")
+
+    assert b.lookup([1.0, 0.0], scope="District=Nadia") == "Spray neem oil."
+    assert b.lookup([1.0, 0.0], scope="District=Puri") is None
+    assert b.stats()["pulled"] == 1
+
+
+def test_own_answers_are_not_pulled_back(workers):
+    a = workers()
+    a.store([1.0, 0.0], "a")
+    a.store([0.0, 1.0], "b")
+    a.lookup([1.0, 0.0])
+    assert a.stats()["entries"] == 2
+    assert a.stats()["pulled"] == 0
+
+
+def test_new_worker_starts_warm(workers):
+    workers().store([1.0, 0.0], "a")
+    assert workers().lookup([1.0, 0.0]) == "a"
+
+
+def test_expired_rows_are_not_pulled(workers):
+    a, b = workers(ttl=0.05), workers(ttl=0.05)
+    a.store([1.0, 0.0], "a")
+    time.sleep(0.06)
+    assert b.lookup([1.0, 0.0]) is None
+    assert b.stats()["pulled"] == 0
+
+
+def test_invalidate_clears_every_worker(workers):
+    a, b = workers(), workers()
+    a.store([1.0, 0.0], "old")
+    assert b.lookup([1.0, 0.0]) == "old"
+
+    time.sleep(0.01)  # the stamp's mtime must move past the row
+    a.invalidate()
+
+    assert b.lookup([1.0, 0.0]) is None
+    assert workers().lookup([1.0, 0.0]) is None
+
+
+def test_table_is_bounded(workers):
+    a = workers(max_entries=3)
+    for i in range(10):
+        a.store([1.0, float(i)], str(i))
+    with a._pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] == 3
@@ -0,0 +1,54 @@
+from langchain_core.runnables import RunnableGenerator, RunnablePassthrough
+
+from model.units.session_store import SessionStore, with_message_history
+
+
+def echo_chain(seen):
+    """Stands in for memory_unit.chain: records the history, answers with text."""
+
+    def answer(inputs):
+        x = {}
+        for chunk in inputs:
+            x.update(chunk)
+        seen.append([(m.type, m.content) for m in x["history"]])
+        yield "answer to "
+        yield x["input"]
+
+    return RunnablePassthrough() | RunnableGenerator(answer)
+
+
+def make_store(tmp_path, **kwargs):
+    return SessionStore(db_path=str(tmp_path / "chat.db"), **kwargs)
+
+
+def test_second_turn_sees_first_turn(tmp_path):
+    seen = []
+    chat = with_message_history(echo_chain(seen), make_store(tmp_path))
+    config = {"configurable": {"session_id": "s1"}}
+
+    assert chat.invoke({"input": "my okra has aphids"}, config=config) == "answer to my okra has aphids"
+    chat.invoke({"input": "what should I spray?"}, config=config)
+
+    assert seen[0] == []
+    assert seen[1] == [("human", "my okra has aphids"), ("ai", "answer to my okra has aphids")]
+
+
+def test_streamed_turn_is_recorded(tmp_path):
+    seen = []
+    chat = with_message_history(echo_chain(seen), make_store(tmp_path))
+    config = {"configurable": {"session_id": "s1"}}
+
+    assert "".join(chat.stream({"input": "hello"}, config=config)) == "answer to hello"
+    chat.invoke({"input": "again"}, config=config)
+
+    assert seen[1] == [("human", "hello"), ("ai", "answer to hello")]
+
+
+def test_sessions_are_kept_apart(tmp_path):
+    seen = []
+    chat = with_message_history(echo_chain(seen), make_store(tmp_path))
+
+    chat.invoke({"input": "paddy"}, config={"configurable": {"session_id": "a"}})
+    chat.invoke({"input": "tomato"}, config={"configurable": {"session_id": "b"}})
+
+    assert seen[1] == []
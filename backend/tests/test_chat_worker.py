@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from chat import route
+from chat.worker import ChatWorkerPool
+
+
+def wait_idle(pool, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["completed"] + pool.stats()["failed"] < pool.stats()["submitted"]:
+        assert time.monotonic() < deadline, pool.stats()
+        time.sleep(0.01)
+
+
+def test_turns_of_one_user_run_in_order():
+    pool = ChatWorkerPool(max_workers=4, max_pending=100, max_pending_per_user=100)
+    done = []
+    lock = threading.Lock()
+
+    def turn(user, n):
+        time.sleep(0.002 * (n % 3))  # later turns must not overtake slower earlier ones
+        with lock:
+            done.append((user, n))
+
+    for n in range(20):
+        for user in ("a", "b", "c"):
+            assert pool.submit(user, turn, user, n)
+    wait_idle(pool)
+
+    for user in ("a", "b", "c"):
+        assert [n for u, n in done if u == user] == list(range(20))
+
+
+def test_one_turn_per_user_at_a_time():
+    pool = ChatWorkerPool(max_workers=4, max_pending=100, max_pending_per_user=100)
+    running = {"a": 0}
+    overlap = []
+    lock = threading.Lock()
+
+    def turn():
+        with lock:
+            running["a"] += 1
+            overlap.append(running["a"])
+        time.sleep(0.005)
+        with lock:
+            running["a"] -= 1
+
+    for _ in range(8):
+        pool.submit("a", turn)
+    wait_idle(pool)
+
+    assert max(overlap) == 1
+
+
+def test_full_queues_reject():
+    pool = ChatWorkerPool(max_workers=1, max_pending=2, max_pending_per_user=1)
+    release = threading.Event()
+    pool.submit("a", release.wait)
+    time.sleep(0.05)  # "a" is running, its queue is empty again
+
+    assert pool.submit("a", lambda: None)
+    assert not pool.submit("a", lambda: None)  # per-user limit
+    assert pool.submit("b", lambda: None)
+    assert not pool.submit("c", lambda: None)  # pool limit
+    release.set()
+    wait_idle(pool)
+
+    assert pool.stats()["rejected"] == 2
+    assert pool.stats()["completed"] == 3
+
+
+def test_failed_turn_does_not_block_the_user():
+    pool = ChatWorkerPool(max_workers=1, max_pending=10, max_pending_per_user=10)
+    done = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    pool.submit("a", fail)
+    pool.submit("a", done.append, 1)
+    wait_idle(pool)
+
+    assert done == [1]
+    assert pool.stats()["failed"] == 1
+
+
+@pytest.fixture
+def chat_client(monkeypatch):
+    app = Flask(__name__)
+    route.socketio.init_app(app)
+    # Nothing may be queued: every turn is refused.
+    monkeypatch.setattr(route, "chat_pool", ChatWorkerPool(max_workers=1, max_pending=0))
+    client = route.socketio.test_client(app, namespace="/chat")
+    yield client
+    client.disconnect(namespace="/chat")
+
+
+def test_busy_turn_is_answered_as_a_message(chat_client):
+    chat_client.emit("message", {"userID": "u1", "context": "hi"}, namespace="/chat")
+
+    [reply] = chat_client.get_received("/chat")
+    assert reply["name"] == "message"
+    assert reply["args"]["status"] == "busy"
+    assert reply["args"]["answer"] == route.BUSY_MESSAGE
+
+
+def test_busy_streamed_turn_is_closed(chat_client):
+    chat_client.emit(
+        "message", {"userID": "u1", "context": "hi", "stream": True, "messageID": "m1"},
+        namespace="/chat",
+    )
+
+    [reply] = chat_client.get_received("/chat")
+    assert reply["name"] == "answer_done"
+    [done] = reply["args"]
+    assert done["status"] == "busy"
+    assert done["messageID"] == "m1"
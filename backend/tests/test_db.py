@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def test_empty_database_path_means_the_default():
+    result = subprocess.run(
+        [sys.executable, "-c", "import db; print(db.DB_PATH)"],
+        cwd=os.path.join(BACKEND_DIR, "src"),
+        env={**os.environ, "DATABASE_PATH": ""},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    path = result.stdout.strip()
+    assert os.path.basename(path) == "database.db"
+    assert os.path.samefile(os.path.dirname(path), BACKEND_DIR)
@@ -0,0 +1,116 @@
+import pytest
+from flask import Flask, jsonify
+
+import cache_stamps
+import http_cache
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "cache", http_cache.ResponseCache(stamp_dir=str(tmp_path)))
+    monkeypatch.setattr(http_cache, "STAMP_CHECK_INTERVAL", 0.0)
+    app = Flask(__name__)
+    app.calls = {"items": 0}
+    app.stock = ["seed"]
+
+    @app.route("/items")
+    @http_cache.cached("items")
+    def items():
+        app.calls["items"] += 1
+        return jsonify(app.stock)
+
+    @app.route("/me")
+    @http_cache.cached("user", private=True)
+    def me():
+        return jsonify({"name": "Jit"})
+
+    @app.route("/missing")
+    @http_cache.cached("items")
+    def missing():
+        app.calls["items"] += 1
+        return jsonify({"error": "not found"}), 404
+
+    return app
+
+
+def test_response_has_validators(app):
+    response = app.test_client().get("/items")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+
+def test_matching_etag_gets_304(app):
+    client = app.test_client()
+    etag = client.get("/items").headers["ETag"]
+
+    response = client.get("/items", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_stale_etag_gets_the_body(app):
+    response = app.test_client().get("/items", headers={"If-None-Match": '"nope"'})
+
+    assert response.status_code == 200
+    assert response.json == ["seed"]
+
+
+def test_if_modified_since_gets_304(app):
+    client = app.test_client()
+    last_modified = client.get("/items").headers["Last-Modified"]
+
+    response = client.get("/items", headers={"If-Modified-Since": last_modified})
+
+    assert response.status_code == 304
+
+
+def test_repeat_requests_are_served_from_cache(app):
+    client = app.test_client()
+    client.get("/items")
+    client.get("/items")
+
+    assert app.calls["items"] == 1
+
+
+def test_invalidate_drops_the_tag(app):
+    client = app.test_client()
+    first = client.get("/items")
+    app.stock.append("fertilizer")
+
+    http_cache.invalidate("items")
+    second = client.get("/items")
+
+    assert app.calls["items"] == 2
+    assert second.json == ["seed", "fertilizer"]
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_stamp_from_another_process_drops_the_tag(app, tmp_path):
+    client = app.test_client()
+    client.get("/items")
+
+    cache_stamps.touch("items", str(tmp_path))  # what add_products.py does
+    client.get("/items")
+
+    assert app.calls["items"] == 2
+
+
+def test_private_responses(app):
+    response = app.test_client().get("/me")
+
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_errors_are_not_cached(app):
+    client = app.test_client()
+    client.get("/missing")
+    response = client.get("/missing")
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+    assert app.calls["items"] == 2
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+from openpyxl import Workbook  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "model", "qdrant"))
+import processor  # noqa: E402
+
+
+class FakeEmbeddings:
+    """Deterministic vectors from a text hash; no model download."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [b / 255 for b in digest[:8]] * 4
+
+
+class CountingClient(QdrantClient):
+    def __init__(self):
+        super().__init__(location=":memory:")
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def create_collection(self, *args, **kwargs):
+        self._count("create_collection")
+        return super().create_collection(*args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        self._count("upsert")
+        return super().upsert(*args, **kwargs)
+
+
+def row(n, answer="water twice a week"):
+    return [n, 2024, 7, 1, "Odisha", "Puri", "Agri", "Kharif", f"crop{n}", n,
+            f"question {n}", n, answer]
+
+
+def workbook(path, rows):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(processor.COLUMN_NAMES)
+    for values in rows:
+        sheet.append(values)
+    book.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(processor, "make_client", lambda: client)
+    monkeypatch.setattr(processor, "load_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(processor, "embedding_dimension", lambda embeddings: 32)
+    monkeypatch.setattr(processor, "RETRIEVAL_MODE", "dense")
+    monkeypatch.setattr(processor, "INDEX_STAMP_PATH", str(tmp_path / "index_version"))
+
+    def run(rows, full=False):
+        client.calls.clear()
+        path = workbook(tmp_path / "knowledge.xlsx", rows)
+        processor.main(path, chunk_rows=2, batch_size=2, workers=0, full=full)
+        return client
+
+    return run
+
+
+def stamp(tmp_path):
+    path = tmp_path / "index_version"
+    return path.read_text() if path.exists() else None
+
+
+def point_count(client):
+    return client.count(processor.COLLECTION_NAME, exact=True).count
+
+
+def test_first_build_creates_the_alias(index):
+    client = index([row(n) for n in range(5)])
+
+    assert processor.live_collection(client) != processor.COLLECTION_NAME
+    assert point_count(client) == 5
+
+
+def test_unchanged_run_writes_nothing(index, tmp_path):
+    client = index([row(n) for n in range(5)])
+    live = processor.live_collection(client)
+    (tmp_path / "index_version").unlink()
+
+    index([row(n) for n in range(5)])
+
+    assert client.calls == {}
+    assert processor.live_collection(client) == live
+    assert stamp(tmp_path) is None
+
+
+def test_changes_are_applied_in_place(index, tmp_path):
+    client = index([row(n) for n in range(5)])
+    live = processor.live_collection(client)
+
+    index([row(0, answer="spray neem oil")] + [row(n) for n in range(1, 4)] + [row(9)])
+
+    assert set(client.calls) == {"upsert"}
+    assert processor.live_collection(client) == live
+    assert point_count(client) == 5
+    answers = [
+        r.payload["page_content"]
+        for r in client.scroll(processor.COLLECTION_NAME, limit=10)[0]
+    ]
+    assert any("spray neem oil" in a for a in answers)
+    assert not any("crop4" in a for a in answers)
+    assert stamp(tmp_path) is not None
+
+
+def test_duplicate_rows_are_embedded_once(index):
+    client = index([row(1), row(1), row(2)])
+
+    assert point_count(client) == 2
+
+
+def test_full_rebuild_swaps_the_alias(index):
+    client = index([row(n) for n in range(3)])
+    old = processor.live_collection(client)
+
+    index([row(n) for n in range(3)], full=True)
+
+    new = processor.live_collection(client)
+    assert new != old
+    assert not client.collection_exists(old)
+    assert point_count(client) == 3
+
+
+def make_plain(client):
+    """Turn the aliased index into one from before aliases: a plain collection."""
+    live = processor.live_collection(client)
+    client.update_collection_aliases(change_aliases_operations=[
+        processor.DeleteAliasOperation(
+            delete_alias=processor.DeleteAlias(alias_name=processor.COLLECTION_NAME)
+        )
+    ])
+    records = client.scroll(live, limit=10, with_vectors=True)[0]
+    client.create_collection(
+        processor.COLLECTION_NAME, vectors_config=client.get_collection(live).config.params.vectors
+    )
+    client.upsert(processor.COLLECTION_NAME, points=[
+        processor.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records
+    ])
+
+
+def test_plain_collection_is_updated_in_place(index):
+    client = index([row(n) for n in range(3)])
+    make_plain(client)
+
+    index([row(n) for n in range(4)])
+
+    assert processor.live_collection(client) == processor.COLLECTION_NAME
+    assert point_count(client) == 4
+    assert "create_collection" not in client.calls
+
+
+def test_plain_collection_is_migrated_on_rebuild(index):
+    client = index([row(n) for n in range(3)])
+    make_plain(client)
+
+    index([row(n) for n in range(3)], full=True)
+
+    assert processor.live_collection(client) != processor.COLLECTION_NAME
+    assert point_count(client) == 3
+
+
+def test_empty_workbook_keeps_the_index(index):
+    client = index([row(n) for n in range(3)])
+
+    index([])
+
+    assert point_count(client) == 3
+
+
+def test_seen_ids():
+    seen = processor.SeenIds()
+    assert seen.add(["a", "b", "a"]) == ["a", "b"]
+    assert seen.add(["b", "c"]) == ["c"]
+    assert seen.count == 3
+    assert seen.missing(["a", "x", "c", "y"]) == ["x", "y"]
+    seen.close()
@@ -0,0 +1,120 @@
+import json
+import sqlite3
+
+import pytest
+
+import db
+from marketplace import route, search
+from marketplace.indexes import create_indexes, index_exists
+from test_products import SCHEMA, PRODUCTS
+
+
+def insert(conn, products):
+    conn.executemany(
+        "INSERT INTO products (name, price, description, image_url, rating, reviews, sold) "
+        "VALUES (?, ?, ?, '', ?, ?, ?)",
+        products,
+    )
+    conn.commit()
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SCHEMA)
+    insert(conn, PRODUCTS)
+    create_indexes(conn)
+    vocabulary = search.Vocabulary()
+    vocabulary.load(conn)
+    monkeypatch.setattr(search, "vocabulary", vocabulary)
+    yield conn
+    conn.close()
+
+
+def find(conn, query, limit=20):
+    rows, corrected = search.search(conn, query, ["name"], limit)
+    return [json.loads(row[0])["name"] for row in rows], corrected
+
+
+def test_words_match_as_prefixes_and_all_are_required(conn):
+    assert find(conn, "toma") == (["Tomato Seeds"], None)
+    assert sorted(find(conn, "seeds")[0]) == ["Tomato Seeds", "Wheat Seeds"]
+    assert find(conn, "wheat seed") == (["Wheat Seeds"], None)
+
+
+def test_name_matches_rank_above_description_matches(conn):
+    hits, _ = find(conn, "pump")
+    # "Solar Water Pump" and "Irrigation Pump" name it; nothing else does.
+    assert set(hits[:2]) == {"Solar Water Pump", "Irrigation Pump"}
+
+
+def test_only_the_newest_candidates_are_ranked(conn, monkeypatch):
+    monkeypatch.setattr(search, "CANDIDATES", 50)
+    insert(conn, [(f"Bag {i}", 10.0, "sack that once held a pump", 4.0, 1, 1) for i in range(100)])
+    insert(conn, [("Pump Pump Pump", 10.0, "", 4.0, 1, 1)])
+    conn.execute("UPDATE products SET name = 'Pump Pump Pump' WHERE id = 1")
+    conn.commit()
+    hits, _ = find(conn, "pump", limit=100)
+    # The new strong match ranks first; the old one is past the newest 50.
+    assert hits[0] == "Pump Pump Pump"
+    assert hits.count("Pump Pump Pump") == 1
+    assert len(hits) == 50
+
+
+def test_long_prefixes_expand_to_indexed_terms(conn, monkeypatch):
+    insert(conn, [("Tomatillo Seeds", 120.0, "Husk tomato", 4.0, 1, 1)])
+    search.vocabulary.load(conn)
+    assert search.compile_word(conn, "toma").terms == {"tomatillo", "tomato"}
+    assert sorted(find(conn, "toma")[0]) == ["Tomatillo Seeds", "Tomato Seeds"]
+    # Too many terms, or none the vocabulary knows yet: FTS5 matches the prefix.
+    monkeypatch.setattr(search, "MAX_EXPANSIONS", 1)
+    assert search.compile_word(conn, "toma").prefix == "toma"
+    assert search.compile_word(conn, "mango").prefix == "mango"
+
+
+def test_typos_are_corrected_to_indexed_terms(conn):
+    assert find(conn, "tomatoe") == (["Tomato Seeds"], "tomato")
+    assert find(conn, "fertilzer organic")[1] == "fertilizer organic"
+
+
+def test_unknown_words_without_suggestions_return_nothing(conn):
+    assert find(conn, "zzzz") == ([], None)
+    assert find(conn, "") == ([], None)
+
+
+def test_triggers_keep_the_index_in_sync(conn):
+    insert(conn, [("Mango Saplings", 150.0, "Grafted mango plants", 4.5, 10, 5)])
+    assert find(conn, "mango")[0] == ["Mango Saplings"]
+    conn.execute("UPDATE products SET name = 'Litchi Saplings' WHERE name = 'Mango Saplings'")
+    conn.execute("DELETE FROM products WHERE name = 'Tractor'")
+    conn.commit()
+    assert find(conn, "litchi")[0] == ["Litchi Saplings"]
+    assert find(conn, "tractor")[0] == []
+
+
+def test_stale_vocabulary_refreshes_without_blocking(conn, monkeypatch):
+    insert(conn, [("Mustard Oil", 180.0, "Cold pressed", 4.2, 30, 12)])
+    # Still the preloaded terms: "mustard" is unknown, so no correction.
+    assert not search.vocabulary.has_prefix(conn, "mustard")
+    monkeypatch.setattr(search.vocabulary, "ttl", 0.0)
+    assert search.vocabulary.has_prefix(conn, "mustard")
+    # A refresh in progress elsewhere: this caller keeps the old terms.
+    with search.vocabulary._lock:
+        assert search.vocabulary.buckets(conn) is search.vocabulary._buckets
+
+
+def test_prepare_indexes_builds_everything_at_startup(monkeypatch):
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("DROP TABLE IF EXISTS products_fts")
+    conn.execute("DROP TABLE IF EXISTS products")
+    conn.execute(SCHEMA)
+    insert(conn, PRODUCTS)
+    monkeypatch.setattr(search, "vocabulary", search.Vocabulary())
+
+    route.prepare_indexes()
+
+    assert index_exists(conn)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_products_price", "idx_products_rating", "idx_products_sold"} <= indexes
+    assert search.vocabulary._loaded_at
+    conn.close()
@@ -0,0 +1,140 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+import db
+import http_cache
+from json_provider import OrjsonProvider
+from marketplace.route import products_bp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    description TEXT,
+    image_url TEXT,
+    rating REAL NOT NULL,
+    reviews REAL NOT NULL,
+    sold INTEGER NOT NULL
+)
+"""
+
+PRODUCTS = [
+    ("Tractor", 1199999.0, "Heavy-duty tractor for plowing and hauling", 4.5, 127, 23),
+    ("Irrigation Pump", 19999.0, "Electric water pump for field irrigation", 4.2, 89, 156),
+    ("Fertilizer - Organic", 249.5, "20kg organic fertilizer for crop growth", 4.8, 203, 342),
+    ("Wheat Seeds", 99.0, "High-yield wheat seeds, 10kg pack", 4.6, 156, 278),
+    ("Pesticide Spray Kit", 1759.0, "Handheld pesticide sprayer, 15L capacity", 3.9, 67, 89),
+    ("Solar Water Pump", 96499.0, "Eco-friendly solar-powered water pump", 4.7, 98, 45),
+    ("Harvesting Sickle", 59.0, "Traditional sickle for manual harvesting", 4.3, 134, 234),
+    ("Tomato Seeds", 99.0, "Hybrid tomato seeds for greenhouse and field", 4.4, 76, 67),
+    ("Cow Feed", 239.0, "Balanced diet mix for dairy cows, 25kg bag", 4.6, 145, 189),
+    ("Greenhouse Film", 1599.0, "UV-protected greenhouse covering film", 4.1, 54, 98),
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("DROP TABLE IF EXISTS products")
+    conn.execute(SCHEMA)
+    conn.executemany(
+        "INSERT INTO products (name, price, description, image_url, rating, reviews, sold) "
+        "VALUES (?, ?, ?, 'https://picsum.photos/200/300', ?, ?, ?)",
+        PRODUCTS,
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(http_cache, "cache", http_cache.ResponseCache(enabled=False, stamp_dir=str(tmp_path)))
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(products_bp, url_prefix="/products")
+    return app.test_client()
+
+
+def walk(client, query):
+    """Every page of a listing; returns (items, pages)."""
+    items, pages, cursor = [], 0, None
+    while True:
+        url = f"/products/?{query}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(url).get_json()
+        items += body["items"]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_pages_cover_every_product_once(client):
+    items, pages = walk(client, "limit=3")
+    assert [item["id"] for item in items] == list(range(1, len(PRODUCTS) + 1))
+    assert pages == 4
+
+
+@pytest.mark.parametrize("sort", ["price", "-price", "rating", "-sold"])
+def test_sorted_pages_match_a_full_sort(client, sort):
+    column = sort.lstrip("-")
+    items, _ = walk(client, f"limit=4&sort={sort}")
+    expected = sorted(
+        ((row[column], row["id"]) for row in items), reverse=sort.startswith("-")
+    )
+    assert [(item[column], item["id"]) for item in items] == expected
+    assert len({item["id"] for item in items}) == len(PRODUCTS)
+
+
+def test_ties_on_the_sort_column_do_not_skip_rows(client):
+    # Wheat Seeds and Tomato Seeds share a price; a page boundary between them
+    # must still return both.
+    items, _ = walk(client, "limit=1&sort=price&max_price=99")
+    assert [item["name"] for item in items] == ["Harvesting Sickle", "Wheat Seeds", "Tomato Seeds"]
+
+
+def test_fields_and_range_filters(client):
+    body = client.get("/products/?fields=name,price&min_price=1000&max_price=20000").get_json()
+    assert body["items"] == [
+        {"name": "Irrigation Pump", "price": 19999.0},
+        {"name": "Pesticide Spray Kit", "price": 1759.0},
+        {"name": "Greenhouse Film", "price": 1599.0},
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("cursor=not-base64!", "Invalid cursor"),
+        ("sort=price&cursor=WzFd", "Cursor does not match sort order"),
+        ("cursor=W3t9XQ", "Invalid cursor"),  # [{}]
+        ("cursor=W1sxXV0", "Invalid cursor"),  # [[1]]
+        ("cursor=W3RydWVd", "Invalid cursor"),  # [true]
+        ("cursor=WzEuNV0", "Invalid cursor"),  # [1.5]: ids are integers
+        ("sort=price&cursor=WyI5OSIsIDFd", "Invalid cursor"),  # ["99", 1]
+        ("cursor=Wzk5OTk5OTk5OTk5OTk5OTk5OTk5OTld", "Invalid cursor"),  # [999...]: over int64
+        ("sort=name", "sort must be one of"),
+        ("fields=name,secret", "Unknown fields: secret"),
+        ("limit=ten", "limit must be an integer"),
+        ("min_price=cheap", "min_price must be a number"),
+        ("min_price=nan", "min_price must be a finite number"),
+        ("max_rating=inf", "max_rating must be a finite number"),
+    ],
+)
+def test_bad_parameters_are_rejected(client, query, message):
+    response = client.get(f"/products/?{query}")
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_get_product(client):
+    assert client.get("/products/4").get_json()["name"] == "Wheat Seeds"
+    assert client.get("/products/999").status_code == 404
+
+
+def test_get_product_reports_database_errors(client, monkeypatch):
+    def broken():
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(db.pool, "acquire", broken)
+    response = client.get("/products/4")
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Database error occurred"}
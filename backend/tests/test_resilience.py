@@ -0,0 +1,254 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from flask import Flask
+
+from chat import route
+from chat.worker import ChatWorkerPool
+from model.units import runner_unit
+from model.units.llm_backend import ChatBackend, OpenAICompatibleBackend
+from model.units.resilience_unit import CircuitBreaker, LLMBusy, LLMGuard, LLMUnavailable
+from test_chat_worker import wait_idle
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def flaky(*outcomes):
+    """An attempt that raises or returns each outcome in turn; counts calls."""
+    calls = []
+
+    def attempt():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if callable(outcome):
+            return outcome()
+        return outcome
+
+    return attempt, calls
+
+
+def make_guard(**kwargs):
+    options = dict(deadline=2.0, max_retries=2, backoff=0.0, hedge=False,
+                   breaker=CircuitBreaker(failures=2, reset_seconds=0.05), threads=4)
+    options.update(kwargs)
+    return LLMGuard(**options)
+
+
+# ---- circuit breaker ----
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.allow()
+    breaker.success()  # resets the run
+    for _ in range(3):
+        breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.opened == 1
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_time():
+    breaker = CircuitBreaker(failures=1, reset_seconds=0.05)
+    breaker.failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failures=1, reset_seconds=0.05)
+    breaker.failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.opened == 1  # still the same outage
+
+
+# ---- guarded calls ----
+
+def test_retryable_errors_are_retried():
+    guard = make_guard()
+    attempt, calls = flaky(requests.ConnectionError("reset"), http_error(503), "answer")
+    assert guard.call(attempt) == "answer"
+    assert len(calls) == 3
+    assert guard.stats()["retries"] == 2
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_are_not_retried_and_are_not_an_outage():
+    guard = make_guard()
+    attempt, calls = flaky(http_error(400))
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            guard.call(attempt)
+    assert len(calls) == 3
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_exhausted_retries_raise_unavailable_and_open_the_breaker():
+    guard = make_guard()
+    attempt, calls = flaky(requests.Timeout("slow"))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            guard.call(attempt)
+    assert len(calls) == 2 * 3
+    with pytest.raises(LLMUnavailable, match="circuit breaker is open"):
+        guard.call(attempt)
+    assert len(calls) == 6  # rejected without reaching the endpoint
+    assert guard.stats()["rejected"] == 1
+
+
+def test_deadline_bounds_a_hanging_call():
+    guard = make_guard(deadline=0.1, max_retries=0)
+    attempt, _ = flaky(lambda: time.sleep(0.5))
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable, match="TimeoutError"):
+        guard.call(attempt)
+    assert time.monotonic() - started < 0.4
+    assert guard.stats()["timeouts"] == 1
+
+
+def test_hedged_request_wins_over_a_slow_one():
+    guard = make_guard(hedge=True, hedge_min_delay=0.05)
+    attempt, calls = flaky(lambda: time.sleep(1) or "slow", "fast")
+    started = time.monotonic()
+    assert guard.call(attempt) == "fast"
+    assert time.monotonic() - started < 0.5
+    assert len(calls) == 2
+    assert guard.stats()["hedge_wins"] == 1
+
+
+def test_stream_is_retried_before_its_first_token():
+    guard = make_guard()
+    attempt, calls = flaky(requests.ConnectionError("reset"), lambda: (d for d in ["Use ", "neem."]))
+    assert "".join(guard.stream(attempt)) == "Use neem."
+    assert len(calls) == 2
+
+
+def test_stream_broken_after_its_first_token_ends_the_answer():
+    def deltas():
+        yield "Use "
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+    guard = make_guard()
+    attempt, calls = flaky(deltas)
+    assert "".join(guard.stream(attempt)) == "Use "
+    assert len(calls) == 1  # not retried: the client already has "Use "
+    assert guard.stats()["truncated_streams"] == 1
+
+
+# ---- local LLM slots ----
+
+def test_more_turns_than_slots_do_not_open_the_breaker(monkeypatch):
+    backend = OpenAICompatibleBackend(slots=1, slot_wait=0.3)
+    completions = []
+
+    def post(prompt, stream):
+        completions.append(prompt)
+        time.sleep(0.2)
+        return SimpleNamespace(json=lambda: {"choices": [{"message": {"content": "ok"}}]})
+
+    monkeypatch.setattr(backend, "_post", post)
+    # A deadline shorter than the queue: waiting for the slot must not count.
+    guard = make_guard(deadline=0.25, breaker=CircuitBreaker(failures=1, reset_seconds=60))
+    monkeypatch.setattr(runner_unit, "guard", guard)
+    runnable = runner_unit.LLMRunnable(backend)
+    outcomes = []
+
+    def turn():
+        try:
+            outcomes.append(runnable.invoke("aphids on okra?"))
+        except LLMBusy:
+            outcomes.append("busy")
+
+    threads = [threading.Thread(target=turn) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    answered = outcomes.count("ok")
+    assert answered >= 2  # the second turn waited for the slot, past the deadline
+    assert answered + outcomes.count("busy") == 5
+    assert len(completions) == answered  # turns that gave up never reached the server
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+    assert guard.stats()["failed"] == 0
+    assert backend.scheduler.stats()["busy"] == 5 - answered
+    assert backend.scheduler.stats()["in_flight"] == 0
+
+
+def test_backend_missing_a_method_fails_at_creation():
+    class CompleteOnly(ChatBackend):
+        def complete(self, prompt):
+            return "ok"
+
+    with pytest.raises(TypeError, match="stream"):
+        CompleteOnly()
+
+
+# ---- fallback answers ----
+
+@pytest.fixture
+def chat_client(monkeypatch):
+    app = Flask(__name__)
+    route.socketio.init_app(app)
+    monkeypatch.setattr(route, "chat_pool", ChatWorkerPool(max_workers=1, max_pending=10))
+    client = route.socketio.test_client(app, namespace="/chat")
+    yield client
+    client.disconnect(namespace="/chat")
+
+
+def broken_stack(monkeypatch):
+    def model(context, session_id):
+        raise LLMUnavailable("LLM circuit breaker is open")
+
+    def stream_model(context, session_id):
+        raise LLMUnavailable("LLM circuit breaker is open")
+        yield  # a generator, like model.stream_model
+
+    monkeypatch.setattr(route, "chat_stack", lambda: SimpleNamespace(model=model, stream_model=stream_model))
+
+
+def test_failed_turn_gets_the_fallback_message(chat_client, monkeypatch):
+    broken_stack(monkeypatch)
+    chat_client.emit("message", {"userID": "u1", "context": "hi"}, namespace="/chat")
+    wait_idle(route.chat_pool)
+
+    [reply] = chat_client.get_received("/chat")
+    assert reply["name"] == "message"
+    assert reply["args"]["status"] == "error"
+    assert reply["args"]["answer"] == route.fallback_message()
+
+
+def test_failed_streamed_turn_is_closed_with_the_fallback_message(chat_client, monkeypatch):
+    broken_stack(monkeypatch)
+    chat_client.emit(
+        "message", {"userID": "u1", "context": "hi", "stream": True, "messageID": "m1"},
+        namespace="/chat",
+    )
+    wait_idle(route.chat_pool)
+
+    [reply] = chat_client.get_received("/chat")
+    assert reply["name"] == "answer_done"
+    [done] = reply["args"]
+    assert done["status"] == "error"
+    assert done["messageID"] == "m1"
+    assert done["answer"] == route.fallback_message()
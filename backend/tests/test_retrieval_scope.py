@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache_stamps
+from model.units import filter_unit
+from model.units.cache_unit import SemanticCache, scope_key
+from model.units.filter_unit import UserLocations
+
+
+class Profiles:
+    def __init__(self, **locations):
+        self.locations = locations
+        self.reads = 0
+        self.fail = False
+
+    def __call__(self, user_id):
+        self.reads += 1
+        if self.fail:
+            raise sqlite3.OperationalError("database is locked")
+        return self.locations.get(user_id)
+
+
+@pytest.fixture
+def stamp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(filter_unit, "STAMP_CHECK_INTERVAL", 0.0)
+    return str(tmp_path)
+
+
+def test_locations_are_cached(stamp_dir):
+    profiles = Profiles(TEST001="Nadia")
+    locations = UserLocations(load=profiles, stamp_dir=stamp_dir)
+
+    assert locations.get("TEST001") == "Nadia"
+    assert locations.get("TEST001") == "Nadia"
+    assert profiles.reads == 1
+
+
+def test_locations_expire(stamp_dir):
+    profiles = Profiles(TEST001="Nadia")
+    locations = UserLocations(ttl=0.0, load=profiles, stamp_dir=stamp_dir)
+    locations.get("TEST001")
+    profiles.locations["TEST001"] = "Puri"
+
+    assert locations.get("TEST001") == "Puri"
+
+
+def test_failed_reads_are_not_cached(stamp_dir):
+    profiles = Profiles(TEST001="Nadia")
+    locations = UserLocations(load=profiles, stamp_dir=stamp_dir)
+    profiles.fail = True
+
+    assert locations.get("TEST001") is None
+    profiles.fail = False
+    assert locations.get("TEST001") == "Nadia"
+
+
+def test_user_stamp_clears_locations(stamp_dir):
+    profiles = Profiles(TEST001="Nadia")
+    locations = UserLocations(load=profiles, stamp_dir=stamp_dir)
+    locations.get("TEST001")
+    profiles.locations["TEST001"] = "Puri"
+
+    cache_stamps.touch("user", stamp_dir)  # what create_user.py does
+
+    assert locations.get("TEST001") == "Puri"
+
+
+def test_forget(stamp_dir):
+    profiles = Profiles(TEST001="Nadia")
+    locations = UserLocations(load=profiles, stamp_dir=stamp_dir)
+    locations.get("TEST001")
+    locations.forget("TEST001")
+    locations.get("TEST001")
+
+    assert profiles.reads == 2
+
+
+def test_cache_size_is_bounded(stamp_dir):
+    locations = UserLocations(max_entries=2, load=Profiles(), stamp_dir=stamp_dir)
+    for user in ("a", "b", "c"):
+        locations.get(user)
+
+    assert list(locations._entries) == ["b", "c"]
+
+
+@pytest.fixture
+def answers(tmp_path):
+    return SemanticCache(stamp_path=str(tmp_path / "index_version"))
+
+
+def test_answers_are_scoped_by_hints(answers):
+    nadia = scope_key({"Crop": "Paddy", "District": "Nadia"})
+    puri = scope_key({"District": "Puri", "Crop": "Paddy"})
+    answers.store([1.0, 0.0], "Nadia answer", scope=nadia)
+
+    assert answers.lookup([1.0, 0.0], scope=nadia) == "Nadia answer"
+    assert answers.lookup([1.0, 0.0], scope=puri) is None
+    assert answers.lookup([1.0, 0.0]) is None
+
+
+def test_scope_key_ignores_hint_order():
+    assert scope_key({"Crop": "Okra", "Season": "Rabi"}) == scope_key({"Season": "Rabi", "Crop": "Okra"})
+    assert scope_key({}) == ""
+
+
+def test_same_scope_finds_the_closest_answer(answers):
+    answers.store([1.0, 0.0], "a", scope="District=Puri")
+    answers.store([0.0, 1.0], "b", scope="District=Puri")
+
+    assert answers.lookup([0.01, 1.0], scope="District=Puri") == "b"
+
+
+class SlowFacets:
+    """Qdrant stand-in whose facet calls block until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def facet(self, collection, key, limit):
+        self.calls += 1
+        self.release.wait(5)
+        return SimpleNamespace(hits=[SimpleNamespace(value="Nadia")] if key.endswith("District") else [])
+
+
+def test_slow_facet_load_does_not_block_other_turns(monkeypatch):
+    client = SlowFacets()
+    hints = filter_unit.MetadataHints(client, "knowledge")
+    loader = threading.Thread(target=hints.patterns)
+    loader.start()
+    while not client.calls:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    assert hints.extract("jute in nadia") == {}  # nothing loaded yet, no waiting
+    assert time.monotonic() - started < 0.5
+
+    client.release.set()
+    loader.join()
+    assert hints.extract("jute in nadia") == {"District": "Nadia"}
+    # A stale set is served while one caller reloads it.
+    monkeypatch.setattr(filter_unit, "VOCABULARY_TTL", 0.0)
+    client.release.clear()
+    loader = threading.Thread(target=hints.patterns)
+    loader.start()
+    while client.calls <= len(filter_unit.HINT_FIELDS):
+        time.sleep(0.001)
+    assert hints.extract("jute in nadia") == {"District": "Nadia"}
+    client.release.set()
+    loader.join()
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+import serve  # noqa: E402
+
+
+def test_nginx_config_pins_socketio_by_client_id():
+    conf = serve.nginx_config("0.0.0.0", 5000, [5101, 5102])
+    assert "listen 5000;" in conf
+    assert conf.count("server 127.0.0.1:5101;") == 2  # both upstreams
+    assert "hash $farmers_socketio_key consistent;" in conf
+    assert "default $arg_client;" in conf
+    assert "least_conn;" in conf
+    assert "X-Forwarded-For" in conf
+
+
+def test_nginx_config_listens_on_given_host():
+    assert "listen 127.0.0.1:8080;" in serve.nginx_config("127.0.0.1", 8080, [5101])
+
+
+def test_refuses_local_vectors_with_several_workers():
+    result = subprocess.run(
+        [sys.executable, "serve.py", "--workers", "2"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "VECTOR_BACKEND": "local"},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 2
+    assert "VECTOR_BACKEND=local" in result.stderr
+
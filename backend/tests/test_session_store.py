@@ -0,0 +1,90 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from model.units.session_store import SessionStore, with_message_history
+
+
+def turn(n):
+    return [HumanMessage(content=f"question {n}"), AIMessage(content=f"answer {n}")]
+
+
+def contents(messages):
+    return [m.content for m in messages]
+
+
+def test_history_survives_restart(tmp_path):
+    path = str(tmp_path / "chat.db")
+    store = SessionStore(db_path=path)
+    store.get("s1").add_messages(turn(1))
+    store.get("s1").add_messages(turn(2))
+
+    restarted = SessionStore(db_path=path)
+    history = restarted.get("s1")
+
+    assert contents(history.messages) == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert restarted.stats()["loaded"] == 1
+
+
+def test_chain_turns_are_written_through(tmp_path):
+    path = str(tmp_path / "chat.db")
+    chat = with_message_history(RunnableLambda(lambda x: "noted"), SessionStore(db_path=path))
+    chat.invoke({"input": "sowing date for paddy?"}, config={"configurable": {"session_id": "s1"}})
+
+    history = SessionStore(db_path=path).get("s1")
+
+    assert contents(history.messages) == ["sowing date for paddy?", "noted"]
+
+
+def test_summary_survives_restart(tmp_path):
+    path = str(tmp_path / "chat.db")
+    history = SessionStore(db_path=path).get("s1")
+    for n in range(3):
+        history.add_messages(turn(n))
+    history.fold(history.recent_messages()[:4], "farmer grows okra")
+
+    reloaded = SessionStore(db_path=path).get("s1")
+
+    assert reloaded.summary == "farmer grows okra"
+    assert contents(reloaded.recent_messages()) == ["question 2", "answer 2"]
+    assert reloaded.messages[0].type == "system"
+
+
+def test_trimmed_turns_wait_for_the_summarizer(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "chat.db"), max_turns=2, max_tokens=0)
+    compacted = []
+    store.compactor = compacted.append
+    history = store.get("s1")
+    for n in range(3):
+        history.add_messages(turn(n))
+
+    assert contents(history.recent_messages()) == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert contents(history.unfolded_messages()) == ["question 0", "answer 0"]
+    assert compacted[-1] is history
+
+    history.fold(history.unfolded_messages(), "summary")
+    assert history.unfolded_messages() == []
+    assert len(history.recent_messages()) == 4
+
+
+def test_unfolded_turns_survive_restart(tmp_path):
+    path = str(tmp_path / "chat.db")
+    store = SessionStore(db_path=path, max_turns=1, max_tokens=0)
+    store.compactor = lambda history: None
+    for n in range(2):
+        store.get("s1").add_messages(turn(n))
+
+    restarted = SessionStore(db_path=path, max_turns=1, max_tokens=0)
+    restarted.compactor = lambda history: None
+    history = restarted.get("s1")
+
+    assert contents(history.recent_messages()) == ["question 1", "answer 1"]
+    assert contents(history.unfolded_messages()) == ["question 0", "answer 0"]
+
+
+def test_token_budget_trims_without_a_compactor(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "chat.db"), max_turns=10, max_tokens=5)
+    history = store.get("s1")
+    history.add_messages([HumanMessage(content="x" * 40), AIMessage(content="short")])
+
+    assert contents(history.messages) == ["short"]
+    assert history.unfolded_messages() == []
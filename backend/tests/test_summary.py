@@ -0,0 +1,95 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from model.units import summary_unit
+from model.units.session_store import SessionStore
+
+
+def turn(n):
+    return [HumanMessage(content=f"question {n}"), AIMessage(content=f"answer {n}")]
+
+
+def drain():
+    # The summary worker is a single thread: once this runs, earlier jobs are done.
+    summary_unit._executor.submit(lambda: None).result()
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    seen = []
+
+    def summarize(x):
+        seen.append(x)
+        return f"summary {len(seen)}"
+
+    monkeypatch.setattr(summary_unit, "summarize", RunnableLambda(summarize))
+    return seen
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "chat.db"), max_tokens=0)
+    store.compactor = summary_unit.maybe_compact
+    return store
+
+
+def test_older_turns_are_folded(prompts, store):
+    history = store.get("s1")
+    for n in range(summary_unit.SUMMARY_AFTER_TURNS + 1):
+        history.add_messages(turn(n))
+    drain()
+
+    keep = summary_unit.KEEP_TURNS * 2
+    assert history.summary == "summary 1"
+    assert len(history.recent_messages()) == keep
+    assert prompts[0]["summary"] == "(none yet)"
+    assert "Farmer: question 0" in prompts[0]["lines"]
+    assert f"question {summary_unit.SUMMARY_AFTER_TURNS}" not in prompts[0]["lines"]
+
+
+def test_summary_is_incremental(prompts, store):
+    history = store.get("s1")
+    for n in range(2 * (summary_unit.SUMMARY_AFTER_TURNS + 1)):
+        history.add_messages(turn(n))
+        drain()
+
+    assert len(prompts) >= 2
+    assert prompts[-1]["summary"] == f"summary {len(prompts) - 1}"
+    assert "question 0" not in prompts[-1]["lines"]
+
+
+def test_short_history_is_left_alone(prompts, store):
+    history = store.get("s1")
+    history.add_messages(turn(0))
+    drain()
+
+    assert prompts == []
+    assert history.summary == ""
+
+
+def test_trimmed_turns_are_folded(prompts, tmp_path):
+    store = SessionStore(db_path=str(tmp_path / "chat.db"), max_turns=10, max_tokens=5)
+    store.compactor = summary_unit.maybe_compact
+    history = store.get("s1")
+    history.add_messages(turn(0))
+    history.add_messages(turn(1))
+    drain()
+
+    assert "question 0" in prompts[0]["lines"]
+    assert history.unfolded_messages() == []
+    assert history.summary == "summary 1"
+
+
+def test_failed_summary_keeps_the_turns(monkeypatch, store):
+    def fail(x):
+        raise RuntimeError("endpoint down")
+
+    monkeypatch.setattr(summary_unit, "summarize", RunnableLambda(fail))
+    history = store.get("s1")
+    for n in range(summary_unit.SUMMARY_AFTER_TURNS + 1):
+        history.add_messages(turn(n))
+    drain()
+
+    assert history.summary == ""
+    assert len(history.recent_messages()) == 2 * (summary_unit.SUMMARY_AFTER_TURNS + 1)
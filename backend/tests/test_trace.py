@@ -0,0 +1,71 @@
+from langchain_core.output_parsers import StrOutputParser
+
+import metrics
+from model.units.llm_backend import ChatBackend, SlotScheduler
+from model.units.runner_unit import LLMRunnable, scheduler
+from model.units.trace import trace_turn
+
+
+class TokenBackend(ChatBackend):
+    def stream(self, prompt):
+        yield from ["Use ", "neem ", "oil."]
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt))
+
+
+def run_turn(mode):
+    # memory_unit.answer streams the LLM for both kinds of turn.
+    chain = LLMRunnable(TokenBackend()) | StrOutputParser()
+    with trace_turn("s1", mode) as turn:
+        answer = "".join(chain.stream("aphids on okra?"))
+    assert answer == "Use neem oil."
+    return turn
+
+
+def test_invoked_turn_has_no_first_token():
+    before = metrics.chat_turn_latency.snapshot("invoke")["count"]
+    turn = run_turn("invoke")
+    assert turn.first_token is None
+    assert turn.summary()["mode"] == "invoke"
+    if metrics.ENABLED:
+        assert metrics.chat_turn_latency.snapshot("invoke")["count"] == before + 1
+
+
+def test_streamed_turn_records_first_token():
+    before = metrics.chat_turn_latency.snapshot("stream")["count"]
+    turn = run_turn("stream")
+    assert 0 < turn.first_token <= turn.elapsed()
+    assert turn.summary()["ttft_ms"] is not None
+    if metrics.ENABLED:
+        assert metrics.chat_turn_latency.snapshot("stream")["count"] == before + 1
+
+
+def test_histogram_snapshot():
+    histogram = metrics.Histogram("h", "test", buckets=[1, 2, 4])
+    assert histogram.snapshot() == {
+        "count": 0, "sum": 0.0, "avg": 0.0, "buckets": {"1": 0, "2": 0, "4": 0, "+Inf": 0},
+    }
+    for value in (1, 3, 3, 9):
+        histogram.observe(value)
+    assert histogram.snapshot() == {
+        "count": 4, "sum": 16.0, "avg": 4.0, "buckets": {"1": 1, "2": 1, "4": 3, "+Inf": 4},
+    }
+
+
+def test_scheduler_stats_keep_their_shape():
+    scheduler = SlotScheduler(slots=2)
+    scheduler.acquire()
+    scheduler.release()
+    stats = scheduler.stats()
+    assert stats["batch_size"]["count"] == 1
+    assert stats["batch_size"]["avg"] == 1.0
+    assert set(stats["wait_seconds"]) == {"count", "sum", "avg", "buckets"}
+
+
+def test_scheduler_histograms_are_exported():
+    scheduler.acquire()
+    scheduler.release()
+    text = metrics.registry.render()
+    assert "# TYPE llm_batch_size histogram" in text
+    assert "llm_slot_wait_seconds_count" in text
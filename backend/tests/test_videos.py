@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from flask import Flask
+
+from json_provider import OrjsonProvider
+from videos import library as video_library
+from videos import route as video_route
+
+BODY = bytes(range(256)) * 4  # 1 KiB, no MP4 boxes
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    (tmp_path / "hls").mkdir()
+    (tmp_path / "thumbs").mkdir()
+    (tmp_path / "clip.mp4").write_bytes(BODY)
+    monkeypatch.setattr(video_library, "STAT_INTERVAL", 0.0)
+    monkeypatch.setattr(video_route, "VIDEO_FOLDER", str(tmp_path))
+    monkeypatch.setattr(
+        video_route, "library",
+        video_library.VideoLibrary(str(tmp_path), str(tmp_path / "hls"), str(tmp_path / "thumbs")),
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def client(folder):
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(video_route.videos_bp, url_prefix="/videos")
+    return app.test_client()
+
+
+def test_listing_keeps_its_original_shape(client):
+    assert client.get("/videos/").get_json() == ["/videos/clip.mp4"]
+
+
+def test_manifest_describes_each_video(client, folder):
+    (folder / "thumbs" / "clip.jpg").write_bytes(b"jpeg")
+    video, = client.get("/videos/manifest").get_json()["videos"]
+    assert video["name"] == "clip"
+    assert video["size"] == len(BODY)
+    assert video["poster"] == "/videos/thumbs/clip.jpg"
+    assert video["hls"] is None
+
+
+def test_manifest_notices_a_video_rewritten_in_place(client, folder):
+    first = client.get("/videos/manifest")
+    path = folder / "clip.mp4"
+    directory = os.stat(folder).st_mtime_ns
+    with open(path, "ab") as f:  # same name: the directory does not change
+        f.write(b"\x01" * 10)
+    assert os.stat(folder).st_mtime_ns == directory
+    second = client.get("/videos/manifest")
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.get_json()["videos"][0]["size"] == len(BODY) + 10
+
+
+def test_single_range(client):
+    response = client.get("/videos/clip.mp4", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == BODY[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_suffix_range(client):
+    response = client.get("/videos/clip.mp4", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.data == BODY[-4:]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/videos/clip.mp4", headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(BODY)}"
+
+
+def test_multiple_ranges_get_the_whole_file(client):
+    response = client.get("/videos/clip.mp4", headers={"Range": "bytes=0-1,5-9"})
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_stale_if_range_gets_the_whole_file(client):
+    response = client.get(
+        "/videos/clip.mp4", headers={"Range": "bytes=0-9", "If-Range": '"not-the-etag"'}
+    )
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_matching_if_range_gets_the_range(client):
+    etag = client.get("/videos/clip.mp4").headers["ETag"]
+    response = client.get("/videos/clip.mp4", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.data == BODY[:10]
+
+
+@pytest.mark.parametrize("name", ["missing.mp4", "clip.txt", "../clip.mp4"])
+def test_unknown_files_are_not_found(client, name):
+    assert client.get(f"/videos/{name}").status_code == 404
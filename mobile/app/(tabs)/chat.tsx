@@ -27,6 +27,9 @@ interface Message {
 }
 
 const API_BASE = process.env.EXPO_PUBLIC_BASE_URL;
+// Sent on every Socket.IO request so the server's balancer can keep this
+// client on one worker even when many phones share an IP (carrier NAT).
+const CLIENT_ID = Math.random().toString(36).slice(2);
 
 // Socket connection
 let socket: Socket | null = null;
@@ -37,6 +40,7 @@ const initializeSocket = () => {
     socket = io(`${API_BASE}/chat`, {
       transports: ["polling", "websocket"], // Fallback to polling if websocket fails
       upgrade: false,
+      query: { client: CLIENT_ID },
       rememberUpgrade: false,
       forceNew: true,
       autoConnect: true,
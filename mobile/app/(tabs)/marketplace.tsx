@@ -24,6 +24,21 @@ interface Product {
   // Optional property for new products
 }
 
+interface ProductPage {
+  items: Product[];
+  next_cursor: string | null;
+}
+
+interface SearchResult {
+  items: Product[];
+  corrected: string | null;
+}
+
+// Pages are fetched as the list scrolls; only the fields the cards show.
+const PAGE_SIZE = 20;
+const LIST_FIELDS = "id,name,price,image_url";
+const SEARCH_DEBOUNCE_MS = 250;
+
 const { width } = Dimensions.get("window");
 const CARD_WIDTH = (width - 48) / 2;
 
@@ -32,28 +47,42 @@ const Marketplace = () => {
   const [filteredProducts, setFilteredProducts] = useState<Product[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [searchQuery, setSearchQuery] = useState("");
   const [error, setError] = useState<string | null>(null);
   const router = useRouter();
 
-  const fetchProducts = async () => {
+  const fetchProducts = async (cursor: string | null = null) => {
     try {
       setError(null);
-      const response = await fetch(`${process.env.EXPO_PUBLIC_BASE_URL}/products`);
+      const params = new URLSearchParams({
+        limit: String(PAGE_SIZE),
+        fields: LIST_FIELDS,
+      });
+      if (cursor) {
+        params.set("cursor", cursor);
+      }
+      const response = await fetch(
+        `${process.env.EXPO_PUBLIC_BASE_URL}/products/?${params.toString()}`
+      );
 
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
-      setProducts(data);
-      setFilteredProducts(data);
+      const data: ProductPage = await response.json();
+      setProducts(prev => (cursor ? [...prev, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error("Error fetching products:", error);
-      setError("Failed to load products. Please try again.");
+      if (!cursor) {
+        setError("Failed to load products. Please try again.");
+      }
     } finally {
       setLoading(false);
       setRefreshing(false);
+      setLoadingMore(false);
     }
   };
 
@@ -61,15 +90,44 @@ const Marketplace = () => {
     fetchProducts();
   }, []);
 
+  const loadMore = useCallback(() => {
+    // Only one page request at a time; stop once the server has no next page.
+    if (!nextCursor || loadingMore || refreshing || searchQuery.trim() !== "") {
+      return;
+    }
+    setLoadingMore(true);
+    fetchProducts(nextCursor);
+  }, [nextCursor, loadingMore, refreshing, searchQuery]);
+
   useEffect(() => {
-    if (searchQuery.trim() === "") {
+    const query = searchQuery.trim();
+    if (query === "") {
       setFilteredProducts(products);
-    } else {
-      const filtered = products.filter(product =>
-        product.name.toLowerCase().includes(searchQuery.toLowerCase())
-      );
-      setFilteredProducts(filtered);
+      return;
     }
+    // Server-side full-text search, debounced while the user is typing.
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q: query, fields: LIST_FIELDS });
+        const response = await fetch(
+          `${process.env.EXPO_PUBLIC_BASE_URL}/products/search?${params.toString()}`
+        );
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data: SearchResult = await response.json();
+        if (!cancelled) {
+          setFilteredProducts(data.items);
+        }
+      } catch (error) {
+        console.error("Error searching products:", error);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [searchQuery, products]);
 
   const onRefresh = useCallback(() => {
@@ -330,7 +388,7 @@ const Marketplace = () => {
         {error}
       </Text>
       <TouchableOpacity
-        onPress={fetchProducts}
+        onPress={() => fetchProducts()}
         style={{
           backgroundColor: "#4CAF50",
           paddingHorizontal: 20,
@@ -392,6 +450,13 @@ const Marketplace = () => {
           justifyContent: "space-between",
         }}
         ListHeaderComponent={HeaderComponent}
+        onEndReached={loadMore}
+        onEndReachedThreshold={0.5}
+        ListFooterComponent={
+          loadingMore ? (
+            <ActivityIndicator size="small" color="#4CAF50" style={{ marginVertical: 16 }} />
+          ) : null
+        }
         refreshControl={
           <RefreshControl
             refreshing={refreshing}